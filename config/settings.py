@@ -25,6 +25,8 @@ class DatabaseConfig:
     password: str = os.getenv("DB_PASSWORD", "")
     database: str = os.getenv("DB_NAME", "stock_analysis")
     charset: str = "utf8mb4"
+    pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
     
     @property
     def connection_string(self) -> str:
@@ -47,6 +49,8 @@ class GroqConfig:
     api_key: str = os.getenv("GROQ_API_KEY", "")
     model: str = "llama-3.1-8b-instant"
     max_tokens: int = 1024
+    # 使用JSON模式 (不支持response_format的旧模型设为0，解析时回退为正则提取)
+    json_mode: bool = os.getenv("GROQ_JSON_MODE", "1") != "0"
 
 
 @dataclass
@@ -92,6 +96,12 @@ class Settings:
     # 数据目录
     DATA_DIR = os.path.join(BASE_DIR, "data")
     
+    # 本地行情磁盘缓存目录 (Parquet)
+    DISK_CACHE_DIR = os.path.expanduser(os.getenv("STOCK_CACHE_DIR", "~/.stockcache"))
+    
+    # 日线历史列式存储目录 (按 stock_code/year 分区的Parquet)
+    DAILY_PARQUET_DIR = os.getenv("DAILY_PARQUET_DIR", os.path.join(DATA_DIR, "daily"))
+    
     # 配置实例
     database = DatabaseConfig()
     itick = ITickConfig()
@@ -116,6 +116,11 @@ def cmd_init_db(args):
     db = get_db_manager()
     db.init_tables()
     print("数据库表初始化完成")
+    
+    if args.migrate:
+        print("迁移行情价格列为单精度...")
+        db.migrate_price_precision()
+        print("迁移完成")
 
 
 def main():
@@ -152,6 +157,7 @@ def main():
     
     # initdb 命令
     initdb_parser = subparsers.add_parser('initdb', help='初始化数据库')
+    initdb_parser.add_argument('--migrate', action='store_true', help='迁移已有行情表的价格列为单精度')
     
     args = parser.parse_args()
     
@@ -227,6 +227,8 @@ if q:
             support_level=support_level,
             resistance_level=resistance_level
         )
+        # 等待后台写入线程提交
+        saved = saved and db_service.flush(timeout=10)
         
         if saved:
             print(f"   分析记录已保存到数据库")
@@ -76,7 +76,7 @@ def analyze_chan(stock_code: str, days: int = 120):
             print(f"    {start} -> {end}: {direction} 力度:{format_number(bi.power*100)}%")
     
     # 买卖点信号
-    bs_result = chan_analyzer.get_bs_point(df)
+    bs_result = chan_analyzer.get_bs_point(df, analysis=result)
     
     print(f"\n[买卖点判断]")
     if bs_result['latest_bi']:
@@ -120,7 +120,7 @@ def analyze_comprehensive(stock_code: str, days: int = 120):
         direction = '上涨' if chan_result['latest_bi'].direction.value == 'up' else '下跌'
         print(f"  最新笔: {direction}")
     
-    bs = chan_analyzer.get_bs_point(df_indexed)
+    bs = chan_analyzer.get_bs_point(df_indexed, analysis=chan_result)
     if bs['signal'] == 1:
         print(f"  买卖点: 买入信号 ({bs['signal_type']})")
     elif bs['signal'] == -1:
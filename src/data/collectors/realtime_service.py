@@ -7,6 +7,7 @@ import requests
 import pandas as pd
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass
+from functools import cached_property
 import time
 import threading
 
@@ -37,6 +38,16 @@ class RealtimeQuote:
             return (self.price / self.pre_close - 1) * 100
         return 0.0
     
+    @cached_property
+    def bid_total(self) -> int:
+        """买1-5挂单总量 (首次访问时计算)"""
+        return sum(self.bid_volumes)
+    
+    @cached_property
+    def ask_total(self) -> int:
+        """卖1-5挂单总量 (首次访问时计算)"""
+        return sum(self.ask_volumes)
+    
     @property
     def change_amount(self) -> float:
         """涨跌额"""
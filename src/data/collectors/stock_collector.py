@@ -4,11 +4,17 @@ Stock Analysis System - iTick Stock Data Collector
 iTick API数据收集器
 """
 
+import hashlib
+import threading
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from typing import Optional, List, Dict, Any
+import numpy as np
 import pandas as pd
-import time
 
 import sys
 import os
@@ -21,6 +27,24 @@ from src.utils.helpers import normalize_stock_code
 logger = get_logger(__name__)
 
 
+def _identity(code: str) -> str:
+    return code
+
+
+def _strip_leading_zeros(code: str) -> str:
+    """去掉前导0 (00700 -> 700)"""
+    return code.lstrip('0') or '0'
+
+
+# 各市场代码转换表，未登记的市场保持原样
+_CODE_TRANSFORMS = {
+    'HK': _strip_leading_zeros,  # 港股需要去掉前导0
+}
+
+# Baostock的login/logout和查询共用进程内唯一的socket，多线程调用必须串行
+_baostock_lock = threading.Lock()
+
+
 class ITickCollector:
     """iTick API数据收集器"""
     
@@ -41,6 +65,22 @@ class ITickCollector:
             'token': self.api_token,
             'Content-Type': 'application/json'
         })
+        
+        # 由urllib3负责重试 (指数退避，遵守Retry-After)，连接池供批量请求复用
+        # max_retries为总尝试次数，重试次数比其少1
+        retries = max(self.max_retries - 1, 0)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=128)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def _request(self, endpoint: str, params: Dict = None) -> Dict:
         """
@@ -55,29 +95,30 @@ class ITickCollector:
         """
         url = f"{self.base_url}{endpoint}"
         
-        for attempt in range(self.max_retries):
-            try:
-                response = self.session.get(url, params=params, timeout=self.timeout)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get('code') == 0 or data.get('ret') == 0:
-                    return data.get('data', data)
-                else:
-                    logger.warning(f"API返回错误: {data.get('msg', 'Unknown error')}")
-                    return data
-                    
-            except requests.exceptions.Timeout:
-                logger.warning(f"请求超时，重试 {attempt + 1}/{self.max_retries}")
-                time.sleep(1)
-            except requests.exceptions.RequestException as e:
-                logger.error(f"请求失败: {e}")
-                if attempt == self.max_retries - 1:
-                    raise
-                time.sleep(1)
-        
-        return {}
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            logger.warning(f"请求超时 (已尝试{self.max_retries}次)")
+            return {}
+        except requests.exceptions.ConnectionError as e:
+            # 读超时重试耗尽后urllib3抛出MaxRetryError，requests将其包装为ConnectionError
+            if isinstance(getattr(e.args[0] if e.args else None, 'reason', None), ReadTimeoutError):
+                logger.warning(f"请求超时 (已尝试{self.max_retries}次)")
+                return {}
+            logger.error(f"请求失败: {e}")
+            raise
+        except requests.exceptions.RequestException as e:
+            logger.error(f"请求失败: {e}")
+            raise
+        
+        data = response.json()
+        
+        if data.get('code') == 0 or data.get('ret') == 0:
+            return data.get('data', data)
+        
+        logger.warning(f"API返回错误: {data.get('msg', 'Unknown error')}")
+        return data
     
     def get_stock_list(self, market: str = "CN") -> pd.DataFrame:
         """
@@ -131,9 +172,7 @@ class ITickCollector:
             region = stock_code.split('.')[0] if '.' in stock_code else "CN"
             code = stock_code.split('.')[-1] if '.' in stock_code else stock_code
             
-            # 港股需要去掉前导0 (00700 -> 700)
-            if region == "HK":
-                code = code.lstrip('0') or '0'
+            code = _CODE_TRANSFORMS.get(region, _identity)(code)
             
             params = {
                 "region": region,
@@ -187,7 +226,10 @@ class ITickCollector:
         try:
             endpoint = "/stock/quote"
             
-            all_data = []
+            # 按列预分配数组 (SoA)，逐只按位置填充，避免list-of-dict构建DataFrame
+            n = len(stock_codes)
+            columns: Dict[str, np.ndarray] = {'stock_code': np.empty(n, dtype=object)}
+            filled = 0
             for code in stock_codes:
                 params = {
                     "region": code.split('.')[0] if '.' in code else "CN",
@@ -196,12 +238,14 @@ class ITickCollector:
                 
                 data = self._request(endpoint, params)
                 
-                if data:
-                    data['stock_code'] = code
-                    all_data.append(data)
-            
-            if all_data:
-                df = pd.DataFrame(all_data)
+                if data and isinstance(data, dict):
+                    columns['stock_code'][filled] = code
+                    for key, value in data.items():
+                        self._fill_column(columns, key, n, filled, value)
+                    filled += 1
+            
+            if filled:
+                df = pd.DataFrame({k: v[:filled] for k, v in columns.items()}, copy=False)
                 logger.info(f"获取实时行情 {len(df)}只")
                 return df
             
@@ -210,6 +254,23 @@ class ITickCollector:
             logger.error(f"获取实时行情失败: {e}")
             return pd.DataFrame()
     
+    @staticmethod
+    def _fill_column(columns: Dict[str, np.ndarray], key: str, n: int, row: int, value: Any):
+        """向列数组写入一个值，首次出现的字段按值类型分配float64或object列"""
+        col = columns.get(key)
+        if col is None:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                col = np.full(n, np.nan)
+            else:
+                col = np.full(n, None, dtype=object)
+            columns[key] = col
+        try:
+            col[row] = value
+        except (TypeError, ValueError):
+            # 数值列中出现非数值，退化为object列
+            col = columns[key] = col.astype(object)
+            col[row] = value
+    
     def get_trade_date(self, market: str = "CN") -> List[str]:
         """
         获取交易日历
@@ -276,13 +337,15 @@ class StockCollector:
         """
         self.itick = ITickCollector()
         self.source = source
+        self._disk_cache_dir = Path(settings.DISK_CACHE_DIR)
         
         # 尝试加载AKShare
         try:
             from src.data.collectors.akshare_collector import akshare_collector
             self.akshare = akshare_collector
             self.akshare_available = akshare_collector.available
-        except:
+        except ImportError as e:
+            logger.debug(f"AKShare采集器不可用: {type(e).__name__}: {e}")
             self.akshare = None
             self.akshare_available = False
         
@@ -291,7 +354,7 @@ class StockCollector:
             import baostock as bs
             self.baostock = bs
             self.baostock_available = True
-        except:
+        except ImportError:
             self.baostock = None
             self.baostock_available = False
     
@@ -306,8 +369,17 @@ class StockCollector:
         """
         获取日线数据
         
-        优先级: 数据库缓存 → AKShare → Baostock → iTick
+        优先级: 磁盘缓存 → 数据库缓存 → AKShare → Baostock → iTick
         """
+        disk_path = self._disk_cache_path(stock_code, start_date, end_date)
+        
+        # 优先级0: 本地Parquet缓存（当天有效）
+        if use_cache:
+            cached_df = self._read_disk_cache(disk_path)
+            if cached_df is not None and len(cached_df) >= days * 0.8:
+                logger.info(f"[磁盘缓存命中] {stock_code} 日K线数据 ({len(cached_df)}条)")
+                return cached_df
+        
         # 优先级1: 数据库缓存
         if use_cache:
             try:
@@ -356,15 +428,15 @@ class StockCollector:
         if df is None or df.empty:
             return pd.DataFrame()
         
-        if start_date:
-            start_dt = pd.Timestamp(start_date)
-            df = df[df['trade_date'] >= start_dt]
+        # 数据源通常已按日期升序返回，此时跳过排序
+        if not df['trade_date'].is_monotonic_increasing:
+            df = df.sort_values('trade_date', ignore_index=True)
         
-        if end_date:
-            end_dt = pd.Timestamp(end_date)
-            df = df[df['trade_date'] <= end_dt]
-        
-        df = df.sort_values('trade_date').reset_index(drop=True)
+        # 日期有序，二分查找起止位置后一次切片
+        trade_dates = df['trade_date']
+        lo = trade_dates.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+        hi = trade_dates.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+        df = df.iloc[lo:hi].reset_index(drop=True)
         
         # 缓存到数据库
         if use_cache and not df.empty:
@@ -374,12 +446,44 @@ class StockCollector:
                 logger.info(f"[缓存更新] {stock_code} 日K线数据已缓存")
             except Exception as e:
                 logger.debug(f"缓存保存失败: {e}")
+            self._write_disk_cache(disk_path, df)
         
         return df
     
+    def _disk_cache_path(self, stock_code: str, start_date: str = None, end_date: str = None) -> Path:
+        """磁盘缓存文件路径，按 (代码, 起止日期) 生成键"""
+        key = f"{stock_code}:{start_date}:{end_date or date.today().isoformat()}"
+        return self._disk_cache_dir / f"{hashlib.md5(key.encode()).hexdigest()}.parquet"
+    
+    def _read_disk_cache(self, path: Path) -> Optional[pd.DataFrame]:
+        """读取磁盘缓存，仅当天写入的文件有效"""
+        try:
+            if not path.exists():
+                return None
+            if date.fromtimestamp(path.stat().st_mtime) != date.today():
+                return None
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.debug(f"磁盘缓存读取失败: {e}")
+            return None
+    
+    def _write_disk_cache(self, path: Path, df: pd.DataFrame):
+        """写入磁盘缓存 (需要pyarrow)"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(path, compression='zstd', index=False)
+        except Exception as e:
+            logger.debug(f"磁盘缓存保存失败: {e}")
+    
     def _get_baostock_data(self, stock_code: str, start_date: str = None, 
                           end_date: str = None, days: int = 100) -> pd.DataFrame:
-        """使用Baostock获取日K线数据"""
+        """使用Baostock获取日K线数据 (进程内串行执行)"""
+        with _baostock_lock:
+            return self._query_baostock(stock_code, start_date, end_date, days)
+    
+    def _query_baostock(self, stock_code: str, start_date: str = None,
+                        end_date: str = None, days: int = 100) -> pd.DataFrame:
+        """Baostock登录、查询、登出 (调用方需持有 _baostock_lock)"""
         bs = self.baostock
         
         # 登录
@@ -426,7 +530,8 @@ class StockCollector:
                 if col in df.columns:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
             
-            df['trade_date'] = pd.to_datetime(df['trade_date'])
+            # Baostock返回ISO日期字符串，指定format走快速解析路径
+            df['trade_date'] = pd.to_datetime(df['trade_date'], format='%Y-%m-%d', cache=True)
             df = df.dropna(subset=['close']).tail(days)
             
             return df.reset_index(drop=True)
@@ -461,8 +566,9 @@ class StockCollector:
                 df = self.akshare.get_stock_minute(stock_code, period, days=5)
                 if not df.empty:
                     return df
-            except:
-                pass
+            except Exception as e:
+                # akshare内部异常类型不固定，任何失败都回退到iTick
+                logger.debug(f"AKShare分钟数据获取失败: {type(e).__name__}: {e}")
         
         return self.itick.get_stock_kline(
             stock_code=stock_code,
@@ -6,12 +6,18 @@ SQLAlchemy数据模型定义
 
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Date, Text, Boolean, Index
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Date, Text, Boolean, Index, LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 Base = declarative_base()
 
+# 行情价格列使用单精度浮点 (4字节)，价格有效位数远小于7位，可使行情表体积减半
+PRICE_FLOAT = Float(precision=24)
+# 单精度价格读回时保留的小数位数 (A股价格最多3位小数，在单精度有效位数内可还原为原值)
+PRICE_DECIMALS = 3
+
 
 class Stock(Base):
     """股票基本信息表"""
@@ -41,19 +47,22 @@ class DailyPrice(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     stock_code = Column(String(20), nullable=False, comment='股票代码')
     trade_date = Column(Date, nullable=False, comment='交易日期')
-    open = Column(Float, comment='开盘价')
-    high = Column(Float, comment='最高价')
-    low = Column(Float, comment='最低价')
-    close = Column(Float, comment='收盘价')
+    open = Column(PRICE_FLOAT, comment='开盘价')
+    high = Column(PRICE_FLOAT, comment='最高价')
+    low = Column(PRICE_FLOAT, comment='最低价')
+    close = Column(PRICE_FLOAT, comment='收盘价')
     volume = Column(Float, comment='成交量')
     amount = Column(Float, comment='成交额')
     turnover = Column(Float, comment='换手率')
     pct_change = Column(Float, comment='涨跌幅')
-    pre_close = Column(Float, comment='昨收价')
+    pre_close = Column(PRICE_FLOAT, comment='昨收价')
     created_at = Column(DateTime, default=datetime.now)
     
     __table_args__ = (
         Index('idx_daily_stock_date', 'stock_code', 'trade_date', unique=True),
+        # 按日期倒序取最近N条的覆盖索引 (PostgreSQL使用INCLUDE，其他数据库退化为普通复合索引)
+        Index('idx_daily_stock_date_desc', stock_code, trade_date.desc(),
+              postgresql_include=['open', 'high', 'low', 'close', 'volume', 'amount']),
         Index('idx_daily_date', 'trade_date'),
         {'comment': '日线行情数据表'}
     )
@@ -66,16 +75,18 @@ class MinutePrice(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     stock_code = Column(String(20), nullable=False, comment='股票代码')
     trade_time = Column(DateTime, nullable=False, comment='交易时间')
-    open = Column(Float, comment='开盘价')
-    high = Column(Float, comment='最高价')
-    low = Column(Float, comment='最低价')
-    close = Column(Float, comment='收盘价')
+    open = Column(PRICE_FLOAT, comment='开盘价')
+    high = Column(PRICE_FLOAT, comment='最高价')
+    low = Column(PRICE_FLOAT, comment='最低价')
+    close = Column(PRICE_FLOAT, comment='收盘价')
     volume = Column(Float, comment='成交量')
     amount = Column(Float, comment='成交额')
     created_at = Column(DateTime, default=datetime.now)
     
     __table_args__ = (
         Index('idx_minute_stock_time', 'stock_code', 'trade_time', unique=True),
+        Index('idx_minute_stock_time_desc', stock_code, trade_time.desc(),
+              postgresql_include=['open', 'high', 'low', 'close', 'volume', 'amount']),
         {'comment': '分钟线行情数据表'}
     )
 
@@ -283,6 +294,10 @@ class AnalysisHistory(Base):
         Index('idx_analysis_stock_date', 'stock_code', 'analysis_date'),
         Index('idx_analysis_time', 'analysis_time'),
         Index('idx_analysis_verified', 'verified'),
+        # 待验证扫描 (verified=False AND analysis_time<=?) 与胜率统计 (verified=True AND analysis_time>=?)
+        Index('idx_analysis_verified_time', 'verified', 'analysis_time'),
+        # 胜率统计按信号分组
+        Index('idx_analysis_signal_verdict', 'aggregated_signal', 'verdict_correct'),
         {'comment': 'AI分析历史记录表'}
     )
 
@@ -296,6 +311,8 @@ class DataCache(Base):
     cache_type = Column(String(50), comment='缓存类型')
     stock_code = Column(String(20), comment='股票代码')
     data_json = Column(Text, comment='缓存的JSON数据')
+    data_blob = Column(LargeBinary().with_variant(LONGBLOB(), 'mysql'), comment='缓存的Feather二进制数据')
+    data_hash = Column(String(64), comment='缓存数据的SHA256')
     expires_at = Column(DateTime, comment='过期时间')
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -4,6 +4,8 @@ Stock Analysis System - Data Processor
 数据处理器
 """
 
+import hashlib
+import warnings
 from typing import Optional, List, Dict, Any, Union
 import pandas as pd
 import numpy as np
@@ -14,20 +16,113 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from src.utils.logger import get_logger
+from src.utils.jit import njit, NUMBA_AVAILABLE
 
 logger = get_logger(__name__)
 
+# 尝试导入duckdb (用于重采样加速)
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# 重采样频率 -> DuckDB分桶表达式，标签与pandas一致取周期末日期
+_DUCKDB_BUCKETS = {
+    'W': "CAST(date_trunc('week', _ts) AS TIMESTAMP) + INTERVAL 6 DAY",
+    'M': "CAST(last_day(_ts) AS TIMESTAMP)",
+    'Q': "CAST(date_trunc('quarter', _ts) AS TIMESTAMP) + INTERVAL 3 MONTH - INTERVAL 1 DAY",
+}
+_DUCKDB_BUCKETS.update({'W-SUN': _DUCKDB_BUCKETS['W'], 'ME': _DUCKDB_BUCKETS['M'], 'QE': _DUCKDB_BUCKETS['Q']})
+
+# OHLCV聚合方式 -> DuckDB聚合函数，与pandas一致跳过缺失值:
+# first/last取时间上首个/末个非空值，全为空时求和为0
+_DUCKDB_AGGS = {
+    'first': 'arg_min("{col}", _ts) FILTER (WHERE "{col}" IS NOT NULL)',
+    'max': 'max("{col}")',
+    'min': 'min("{col}")',
+    'last': 'arg_max("{col}", _ts) FILTER (WHERE "{col}" IS NOT NULL)',
+    'sum': 'CAST(coalesce(sum("{col}"), 0) AS DOUBLE)',
+}
+
+
+@njit(cache=True, boundscheck=False)
+def _rolling_zscore_nb(x, window):
+    """
+    滚动Z分数: 单次遍历维护窗口内的和、平方和与有效值个数
+    
+    与pandas rolling(window)一致，窗口内含NaN时结果为NaN
+    """
+    n = len(x)
+    z = np.full(n, np.nan)
+    s = 0.0
+    ss = 0.0
+    count = 0
+    for i in range(n):
+        if not np.isnan(x[i]):
+            s += x[i]
+            ss += x[i] * x[i]
+            count += 1
+        if i >= window:
+            old = x[i - window]
+            if not np.isnan(old):
+                s -= old
+                ss -= old * old
+                count -= 1
+        if i >= window - 1 and count == window:
+            mu = s / window
+            var = ss / window - mu * mu
+            if var > 0:
+                z[i] = (x[i] - mu) / np.sqrt(var)
+    return z
+
+
+def _outlier_bounds(arr: np.ndarray, threshold: float):
+    """按列计算均值±threshold倍样本标准差的上下界 (忽略NaN，标准差为0时按1计)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全空列/单行
+        mean = np.nanmean(arr, axis=0)
+        std = np.nanstd(arr, axis=0, ddof=1)
+    std = np.where(std == 0, 1.0, std)
+    return mean - threshold * std, mean + threshold * std
+
+
+def _frame_digest(df: pd.DataFrame) -> str:
+    """DataFrame内容 (含索引) 摘要"""
+    hashed = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+def _load_resampled(stock_code: str, freq: str, digest: str) -> Optional[pd.DataFrame]:
+    """读取持久化的周期K线，缓存不可用时返回None"""
+    try:
+        from src.data.services.db_service import db_service
+        return db_service.get_cached_resampled(stock_code, freq, digest)
+    except Exception as e:
+        logger.debug(f"周期K线缓存读取失败: {e}")
+        return None
+
+
+def _store_resampled(stock_code: str, freq: str, digest: str, df: pd.DataFrame):
+    """持久化周期K线，失败时只记录日志"""
+    try:
+        from src.data.services.db_service import db_service
+        db_service.cache_resampled(stock_code, freq, digest, df)
+    except Exception as e:
+        logger.debug(f"周期K线缓存保存失败: {e}")
+
 
 class DataProcessor:
     """数据处理器类"""
     
     @staticmethod
-    def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    def clean_data(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
         """
         数据清洗
         
         Args:
             df: 原始数据DataFrame
+            inplace: 是否直接修改传入的DataFrame (调用方不再使用原数据时可省去一次复制)
             
         Returns:
             清洗后的DataFrame
@@ -35,22 +130,19 @@ class DataProcessor:
         if df.empty:
             return df
         
-        # 复制数据
-        df = df.copy()
+        # 后续会就地写入已有列，不修改传入数据时先复制
+        if not inplace:
+            df = df.copy()
         
         # 删除完全重复的行
-        df = df.drop_duplicates()
+        df.drop_duplicates(inplace=True)
         
-        # 处理缺失值
+        # 处理缺失值: 所有数值列一次性前向填充，剩余的用后向填充
         numeric_columns = df.select_dtypes(include=[np.number]).columns
-        for col in numeric_columns:
-            # 使用前向填充
-            df[col] = df[col].ffill()
-            # 剩余的用后向填充
-            df[col] = df[col].bfill()
+        df[numeric_columns] = df[numeric_columns].ffill().bfill()
         
         # 删除仍有缺失值的行
-        df = df.dropna(subset=['close'] if 'close' in df.columns else None)
+        df.dropna(subset=['close'] if 'close' in df.columns else None, inplace=True)
         
         logger.debug(f"数据清洗完成，剩余{len(df)}条")
         return df
@@ -77,27 +169,42 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
-        
         if columns is None:
             columns = df.select_dtypes(include=[np.number]).columns.tolist()
         
-        for col in columns:
-            if col not in df.columns:
-                continue
-            
-            mean = df[col].mean()
-            std = df[col].std()
-            lower = mean - threshold * std
-            upper = mean + threshold * std
-            
+        columns = [col for col in columns if col in df.columns]
+        if not columns:
+            return df.copy()
+        
+        arr = df[columns].to_numpy(dtype=np.float64)
+        
+        if method == 'remove':
+            # 逐列筛选: 每列的上下界按前面各列筛选后剩余的行计算，
+            # 无法计算统计量 (剩余不足2行) 时该列不保留任何行
+            keep = np.ones(len(arr), dtype=bool)
+            for j in range(arr.shape[1]):
+                values = arr[keep, j]
+                lower, upper = _outlier_bounds(values, threshold)
+                keep[keep] = (values >= lower) & (values <= upper)
+            df = df[keep]
+        elif method in ('clip', 'replace'):
+            # 截断/替换不改变行，所有列一次按列向量化计算上下界
+            lower, upper = _outlier_bounds(arr, threshold)
+            # 无法计算统计量的列不做处理
+            lower = np.where(np.isnan(lower), -np.inf, lower)
+            upper = np.where(np.isnan(upper), np.inf, upper)
             if method == 'clip':
-                df[col] = df[col].clip(lower=lower, upper=upper)
-            elif method == 'remove':
-                df = df[(df[col] >= lower) & (df[col] <= upper)]
-            elif method == 'replace':
-                median = df[col].median()
-                df.loc[(df[col] < lower) | (df[col] > upper), col] = median
+                replaced = np.clip(arr, lower, upper)
+            else:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    median = np.nanmedian(arr, axis=0)
+                replaced = np.where((arr < lower) | (arr > upper), median, arr)
+            # 改写已有列，先复制
+            df = df.copy()
+            df[columns] = replaced
+        else:
+            df = df.copy()
         
         logger.debug(f"异常值处理完成，使用{method}方法")
         return df
@@ -106,7 +213,8 @@ class DataProcessor:
     def resample_data(
         df: pd.DataFrame, 
         freq: str = 'W',
-        date_column: str = None
+        date_column: str = None,
+        stock_code: str = None
     ) -> pd.DataFrame:
         """
         数据重采样（如日线转周线）
@@ -115,6 +223,8 @@ class DataProcessor:
             df: 数据DataFrame
             freq: 采样频率 'W'-周 'M'-月 'Q'-季度
             date_column: 日期列名
+            stock_code: 股票代码，传入时结果按 (代码, 频率, 日线内容摘要) 持久化缓存，
+                        相同日线再次重采样直接读取缓存
             
         Returns:
             重采样后的DataFrame
@@ -122,14 +232,12 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
-        
-        # 设置日期索引
+        # 设置日期索引 (set_index/set_axis均返回新对象，无需预先复制)
         if date_column and date_column in df.columns:
-            df[date_column] = pd.to_datetime(df[date_column])
-            df = df.set_index(date_column)
+            df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df[date_column]), name=date_column))
+            df = df.drop(columns=date_column)
         elif not isinstance(df.index, pd.DatetimeIndex):
-            df.index = pd.to_datetime(df.index)
+            df = df.set_axis(pd.to_datetime(df.index), axis=0)
         
         # OHLCV重采样规则
         agg_rules = {
@@ -144,12 +252,48 @@ class DataProcessor:
         # 只使用存在的列
         agg_rules = {k: v for k, v in agg_rules.items() if k in df.columns}
         
-        resampled = df.resample(freq).agg(agg_rules)
+        digest = None
+        if stock_code and agg_rules:
+            digest = _frame_digest(df[list(agg_rules)])
+            cached = _load_resampled(stock_code, freq, digest)
+            if cached is not None:
+                return cached.rename_axis(df.index.name)
+        
+        bucket = _DUCKDB_BUCKETS.get(freq)
+        if DUCKDB_AVAILABLE and bucket and agg_rules:
+            resampled = DataProcessor._resample_duckdb(df, bucket, agg_rules)
+        else:
+            resampled = df.resample(freq).agg(agg_rules)
         resampled = resampled.dropna()
         
+        if digest is not None:
+            _store_resampled(stock_code, freq, digest, resampled)
+        
         logger.debug(f"数据重采样完成，频率: {freq}")
         return resampled
     
+    @staticmethod
+    def _resample_duckdb(df: pd.DataFrame, bucket: str, agg_rules: Dict[str, str]) -> pd.DataFrame:
+        """使用DuckDB按时间分桶聚合 (列式、多线程)"""
+        src = df[list(agg_rules)].rename_axis('_ts').reset_index()
+        select = ", ".join(
+            f'{_DUCKDB_AGGS[how].format(col=col)} AS "{col}"' for col, how in agg_rules.items()
+        )
+        sql = (
+            f"SELECT {bucket} AS _bucket, {select} FROM src "
+            f"GROUP BY _bucket HAVING count(*) > 0 ORDER BY _bucket"
+        )
+        
+        con = duckdb.connect()
+        try:
+            con.register('src', src)
+            result = con.execute(sql).df()
+        finally:
+            con.close()
+        
+        result.index = pd.DatetimeIndex(result.pop('_bucket')).rename(df.index.name)
+        return result
+    
     @staticmethod
     def normalize(
         df: pd.DataFrame, 
@@ -175,24 +319,62 @@ class DataProcessor:
         if columns is None:
             columns = df.select_dtypes(include=[np.number]).columns.tolist()
         
-        for col in columns:
-            if col not in df.columns:
-                continue
-            
+        columns = [col for col in columns if col in df.columns]
+        if not columns:
+            return df
+        
+        # 一次取出二维数组，按列统计后广播计算；常数列保持不变
+        arr = df[columns].to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # 全空列/单行
             if method == 'minmax':
-                min_val = df[col].min()
-                max_val = df[col].max()
-                if max_val != min_val:
-                    df[col] = (df[col] - min_val) / (max_val - min_val)
+                lo = np.nanmin(arr, axis=0)
+                hi = np.nanmax(arr, axis=0)
+                scale = hi - lo
+                valid = scale != 0
             elif method == 'zscore':
-                mean = df[col].mean()
-                std = df[col].std()
-                if std != 0:
-                    df[col] = (df[col] - mean) / std
+                lo = np.nanmean(arr, axis=0)
+                scale = np.nanstd(arr, axis=0, ddof=1)
+                valid = (scale != 0) & ~np.isnan(scale)
+            else:
+                return df
+        
+        if valid.any():
+            out = (arr - lo) / np.where(valid, scale, 1.0)
+            df[columns] = np.where(valid, out, arr)
         
         logger.debug(f"数据标准化完成，使用{method}方法")
         return df
     
+    @staticmethod
+    def rolling_zscore(df: pd.DataFrame, column: str = 'close', window: int = 20) -> pd.DataFrame:
+        """
+        计算滚动Z分数 (总体标准差)
+        
+        Args:
+            df: 数据DataFrame (窗口内含缺失值时该行结果为NaN)
+            column: 计算列名
+            window: 滚动窗口大小
+            
+        Returns:
+            添加 {column}_zscore 列的DataFrame，前window-1行为NaN
+        """
+        if df.empty or column not in df.columns:
+            return df
+        
+        # 只新增列，浅拷贝即可 (不改写传入数据已有的列)
+        df = df.copy(deep=False)
+        
+        if NUMBA_AVAILABLE:
+            values = df[column].to_numpy(dtype=np.float64)
+            df[f'{column}_zscore'] = _rolling_zscore_nb(values, window)
+        else:
+            rolling = df[column].rolling(window)
+            std = rolling.std(ddof=0)
+            df[f'{column}_zscore'] = ((df[column] - rolling.mean()) / std.where(std > 0)).astype(np.float64)
+        
+        return df
+    
     @staticmethod
     def calculate_returns(df: pd.DataFrame, price_column: str = 'close') -> pd.DataFrame:
         """
@@ -208,16 +390,27 @@ class DataProcessor:
         if df.empty or price_column not in df.columns:
             return df
         
-        df = df.copy()
-        
-        # 简单收益率
-        df['return'] = df[price_column].pct_change()
-        
-        # 对数收益率
-        df['log_return'] = np.log(df[price_column] / df[price_column].shift(1))
-        
-        # 累计收益率
-        df['cum_return'] = (1 + df['return']).cumprod() - 1
+        # 结果列整列替换写入，浅拷贝即可 (不就地改写传入数据)
+        df = df.copy(deep=False)
+        
+        # 一次读取价格数组，三列收益率共用同一次移位相除的结果 (首行保持NaN)
+        close = df[price_column].to_numpy(dtype=np.float64)
+        out = np.full((len(close), 3), np.nan)
+        if len(close) > 1:
+            ret = out[1:, 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # 简单收益率
+                np.divide(close[1:], close[:-1], out=ret)
+                ret -= 1
+                # 对数收益率 log(p1/p0) = log1p(r)
+                np.log1p(ret, out=out[1:, 1])
+            # 累计收益率: 与pandas cumprod一致，缺失的收益率跳过累乘且该位置保持NaN
+            nan_ret = np.isnan(ret)
+            np.cumprod(1 + np.where(nan_ret, 0.0, ret), out=out[1:, 2])
+            out[1:, 2] -= 1
+            out[1:, 2][nan_ret] = np.nan
+        
+        df[['return', 'log_return', 'cum_return']] = out
         
         return df
     
@@ -262,26 +455,49 @@ class DataProcessor:
         if df.empty:
             return df
         
-        df = df.copy()
-        
         # 获取日期索引
         if date_column and date_column in df.columns:
-            dates = pd.to_datetime(df[date_column])
+            dates = pd.DatetimeIndex(pd.to_datetime(df[date_column]))
         elif isinstance(df.index, pd.DatetimeIndex):
             dates = df.index
         else:
             return df
         
-        # 添加时间特征
-        df['year'] = dates.year
-        df['month'] = dates.month
-        df['day'] = dates.day
-        df['weekday'] = dates.weekday
-        df['quarter'] = dates.quarter
-        df['is_month_start'] = dates.is_month_start.astype(int)
-        df['is_month_end'] = dates.is_month_end.astype(int)
-        df['is_quarter_start'] = dates.is_quarter_start.astype(int)
-        df['is_quarter_end'] = dates.is_quarter_end.astype(int)
+        # 本地时间的日历字段
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        
+        # 转为datetime64[D]后用日期算术一次推导全部日历字段，避免逐个属性各扫描一遍
+        d = dates.values.astype('datetime64[D]')
+        m = d.astype('datetime64[M]')
+        month_index = m.astype(np.int64)
+        month = (month_index % 12 + 1).astype(np.int8)
+        day = ((d - m).astype(np.int64) + 1).astype(np.int8)
+        is_month_start = day == 1
+        is_month_end = (d + 1).astype('datetime64[M]') != m
+        is_quarter_month_end = month % 3 == 0
+        
+        # 年份用int16，其余取值范围很小的特征用int8，一次性assign
+        features = {
+            'year': (month_index // 12 + 1970).astype(np.int16),
+            'month': month,
+            'day': day,
+            # 1970-01-01为周四，周一记为0
+            'weekday': ((d.astype(np.int64) + 3) % 7).astype(np.int8),
+            'quarter': ((month - 1) // 3 + 1).astype(np.int8),
+            'is_month_start': is_month_start.view(np.int8),
+            'is_month_end': is_month_end.view(np.int8),
+            'is_quarter_start': (is_month_start & (month % 3 == 1)).view(np.int8),
+            'is_quarter_end': (is_month_end & is_quarter_month_end).view(np.int8),
+        }
+        # NaT按整数参与运算会得到无意义的值: 日历字段置为NaN (与.dt访问器一致)，标志位置0
+        nat = np.isnat(d)
+        if nat.any():
+            for key in ('year', 'month', 'day', 'weekday', 'quarter'):
+                features[key] = np.where(nat, np.nan, features[key])
+            for key in ('is_month_start', 'is_month_end', 'is_quarter_start', 'is_quarter_end'):
+                features[key] = np.where(nat, 0, features[key]).astype(np.int8)
+        df = df.assign(**features)
         
         logger.debug("时间特征添加完成")
         return df
@@ -4,13 +4,79 @@
 提供API数据缓存和AI分析历史记录功能
 """
 
+import atexit
+import hashlib
+import io
 import json
+import os
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator
+import numpy as np
 import pandas as pd
+from sqlalchemy import insert, select
 
-from src.data.models import AnalysisHistory, DataCache, DailyPrice
+from config.settings import settings
+from src.data.models import PRICE_DECIMALS, AnalysisHistory, DataCache, DailyPrice
 from src.data.storage import get_db_manager
+from src.utils.cache import TTLCache
+
+# 尝试导入pyarrow (用于日线Parquet分区存储)
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 尝试导入duckdb (用于Parquet下推查询)
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# 分析记录后台批量写入: 每批最多条数 / 凑批最长等待(秒)
+_WRITE_BATCH_SIZE = 100
+_WRITE_BATCH_WAIT = 0.5
+# 进程退出时等待写入队列清空的最长时间(秒)
+_EXIT_FLUSH_TIMEOUT = 5.0
+
+# 周期K线缓存: 频率 -> DataCache.cache_type，有效期(小时，日线写入时提前清理)
+_RESAMPLE_CACHE_TYPES = {
+    'W': 'weekly_kline', 'W-SUN': 'weekly_kline',
+    'M': 'monthly_kline', 'ME': 'monthly_kline',
+    'Q': 'quarterly_kline', 'QE': 'quarterly_kline',
+}
+_RESAMPLE_TTL_HOURS = 24
+
+_PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+# Parquet存储的列类型: 价格列与数据库一致使用单精度
+_PRICE_DTYPES = {
+    'open': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'close': np.float32,
+    'volume': np.float64,
+    'amount': np.float64
+}
+_PRICE_FLOAT_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+def _restore_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """读回的单精度价格转为float64并按PRICE_DECIMALS取整 (10.229999542 -> 10.23)"""
+    df = df.astype(dict.fromkeys(_PRICE_COLUMNS, np.float64))
+    df[_PRICE_FLOAT_COLUMNS] = df[_PRICE_FLOAT_COLUMNS].round(PRICE_DECIMALS)
+    return df
+
+
+def _encode_frame(df: pd.DataFrame) -> bytes:
+    """DataFrame编码为zstd压缩的Feather (Arrow IPC) 字节，需要pyarrow"""
+    buf = io.BytesIO()
+    df.reset_index(drop=True).to_feather(buf, compression='zstd')
+    return buf.getvalue()
 
 
 class DatabaseService:
@@ -18,6 +84,14 @@ class DatabaseService:
     
     def __init__(self):
         self.db = None
+        # 进程内缓存已解码的DataFrame，热点股票无需每次查询数据库
+        self._mem = TTLCache(maxsize=512, ttl=300)
+        # 分析记录写入队列，由后台线程批量提交
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # 上次flush()以来写入失败的记录数
+        self._failed_writes = 0
         self._init_db()
     
     def _init_db(self):
@@ -47,77 +121,179 @@ class DatabaseService:
         support_level: float = 0.0,
         resistance_level: float = 0.0
     ) -> bool:
-        """保存分析历史记录"""
+        """
+        保存分析历史记录 (非阻塞)
+        
+        记录放入写入队列后立即返回，由后台线程批量提交；需要确保落库时调用flush()，
+        写入失败由flush()返回False报告
+        
+        Returns:
+            是否成功加入写入队列
+        """
         if not self.db:
             return False
         
+        now = datetime.now()
         try:
-            session = self.db.get_session()
+            self._ensure_writer()
+        except Exception as e:
+            print(f"启动分析历史写入线程失败: {e}")
+            return False
+        
+        self._write_queue.put({
+            'stock_code': stock_code,
+            'stock_name': stock_name,
+            'analysis_date': now.date(),
+            'analysis_time': now,
+            'price': price,
+            'change_pct': change_pct,
+            'aggregated_signal': aggregated_signal,
+            'signal_confidence': signal_confidence,
+            'buy_score': buy_score,
+            'sell_score': sell_score,
+            'hold_score': hold_score,
+            'ai_full_response': ai_response,
+            'ma_trend': ma_trend,
+            'macd_signal_str': macd_signal,
+            'rsi_value': rsi_value,
+            'support_level': support_level,
+            'resistance_level': resistance_level
+        })
+        return True
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待写入队列中的分析记录全部提交
+        
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
             
-            record = AnalysisHistory(
-                stock_code=stock_code,
-                stock_name=stock_name,
-                analysis_date=datetime.now().date(),
-                analysis_time=datetime.now(),
-                price=price,
-                change_pct=change_pct,
-                aggregated_signal=aggregated_signal,
-                signal_confidence=signal_confidence,
-                buy_score=buy_score,
-                sell_score=sell_score,
-                hold_score=hold_score,
-                ai_full_response=ai_response,
-                ma_trend=ma_trend,
-                macd_signal_str=macd_signal,
-                rsi_value=rsi_value,
-                support_level=support_level,
-                resistance_level=resistance_level
-            )
+        Returns:
+            队列是否已清空且上次flush()以来的记录全部写入成功
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._write_queue.all_tasks_done:
+            while self._write_queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._write_queue.all_tasks_done.wait(remaining)
+        
+        with self._writer_lock:
+            failed, self._failed_writes = self._failed_writes, 0
+        return failed == 0
+    
+    def _ensure_writer(self):
+        """首次写入时启动后台写入线程"""
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._drain_writes, name='analysis-writer', daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.flush, timeout=_EXIT_FLUSH_TIMEOUT)
+    
+    def _drain_writes(self):
+        """后台线程: 凑满一批或等待超时后一次性插入并提交"""
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + _WRITE_BATCH_WAIT
+            while len(batch) < _WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
             
-            session.add(record)
-            session.commit()
+            session = None
+            failed = False
+            try:
+                session = self.db.get_session()
+                session.execute(insert(AnalysisHistory), batch)
+                session.commit()
+            except Exception as e:
+                failed = True
+                with self._writer_lock:
+                    self._failed_writes += len(batch)
+                print(f"保存分析历史失败: {e}")
+            finally:
+                if session is not None:
+                    self._discard_session(session, rollback=failed)
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    @staticmethod
+    def _discard_session(session, rollback: bool = False):
+        """回滚(可选)并关闭会话，出错时不影响写入线程继续运行"""
+        try:
+            if rollback:
+                session.rollback()
             session.close()
-            return True
-            
         except Exception as e:
-            print(f"保存分析历史失败: {e}")
-            return False
+            print(f"关闭数据库会话失败: {e}")
     
     def get_analysis_history(
         self,
         stock_code: str,
-        days: int = 30
+        days: int = 30,
+        limit: Optional[int] = None,
+        include_response: bool = True
     ) -> List[Dict]:
-        """获取股票的分析历史"""
+        """获取股票的分析历史 (按时间倒序)"""
+        return list(self.iter_analysis_history(stock_code, days, limit, include_response))
+    
+    def iter_analysis_history(
+        self,
+        stock_code: str,
+        days: int = 30,
+        limit: Optional[int] = None,
+        include_response: bool = True
+    ) -> Iterator[Dict]:
+        """
+        流式读取股票的分析历史 (服务端游标，按时间倒序)
+        
+        Args:
+            stock_code: 股票代码
+            days: 查询最近天数
+            limit: 最多返回条数
+            include_response: 是否读取AI完整回复 (大文本，不需要时可跳过)
+        """
         if not self.db:
-            return []
+            return
         
+        columns = [
+            AnalysisHistory.analysis_date.label('date'),
+            AnalysisHistory.analysis_time.label('time'),
+            AnalysisHistory.price,
+            AnalysisHistory.aggregated_signal.label('signal'),
+            AnalysisHistory.signal_confidence.label('confidence')
+        ]
+        if include_response:
+            columns.append(AnalysisHistory.ai_full_response.label('ai_response'))
+        
+        cutoff_date = datetime.now() - timedelta(days=days)
+        stmt = select(*columns).where(
+            AnalysisHistory.stock_code == stock_code,
+            AnalysisHistory.analysis_time >= cutoff_date
+        ).order_by(AnalysisHistory.analysis_time.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+        
+        session = self.db.get_session()
         try:
-            session = self.db.get_session()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            records = session.query(AnalysisHistory).filter(
-                AnalysisHistory.stock_code == stock_code,
-                AnalysisHistory.analysis_time >= cutoff_date
-            ).order_by(AnalysisHistory.analysis_time.desc()).all()
-            
-            session.close()
-            
-            return [
-                {
-                    'date': r.analysis_date,
-                    'time': r.analysis_time,
-                    'price': r.price,
-                    'signal': r.aggregated_signal,
-                    'confidence': r.signal_confidence,
-                    'ai_response': r.ai_full_response
-                }
-                for r in records
-            ]
-            
+            result = session.execute(
+                stmt.execution_options(stream_results=True, yield_per=500)
+            ).mappings()
+            for row in result:
+                yield dict(row)
         except Exception as e:
             print(f"获取分析历史失败: {e}")
-            return []
+        finally:
+            session.close()
     
     # ==================== 数据缓存 ====================
     
@@ -131,69 +307,167 @@ class DatabaseService:
         if not self.db or df.empty:
             return False
         
+        cache_key = f"daily_{stock_code}_{datetime.now().strftime('%Y%m%d')}"
+        try:
+            self._store_frame(cache_key, 'daily_kline', stock_code, df, ttl_hours)
+            return True
+        except Exception as e:
+            print(f"缓存数据失败: {e}")
+            return False
+    
+    def get_cached_daily_data(self, stock_code: str) -> Optional[pd.DataFrame]:
+        """获取缓存的日K线数据"""
+        if not self.db:
+            return None
+        
+        cache_key = f"daily_{stock_code}_{datetime.now().strftime('%Y%m%d')}"
+        try:
+            df = self._load_frame(cache_key)
+        except Exception as e:
+            print(f"获取缓存失败: {e}")
+            return None
+        
+        if df is None:
+            return None
+        print(f"[缓存命中] {stock_code} 日K线数据")
+        return df
+    
+    def _store_frame(
+        self,
+        cache_key: str,
+        cache_type: str,
+        stock_code: str,
+        df: pd.DataFrame,
+        ttl_hours: float
+    ):
+        """DataFrame写入DataCache (内容未变化时只刷新过期时间)"""
+        expires_at = datetime.now() + timedelta(hours=ttl_hours)
+        
+        # 转换DataFrame为Feather二进制，未安装pyarrow时退回JSON
+        try:
+            data_blob, data_json = _encode_frame(df), None
+            data_hash = hashlib.sha256(data_blob).hexdigest()
+        except ImportError:
+            data_blob, data_json = None, df.to_json(orient='records', date_format='iso')
+            data_hash = hashlib.sha256(data_json.encode()).hexdigest()
+        
+        session = self.db.get_session()
         try:
-            session = self.db.get_session()
-            
-            cache_key = f"daily_{stock_code}_{datetime.now().strftime('%Y%m%d')}"
-            expires_at = datetime.now() + timedelta(hours=ttl_hours)
-            
-            # 转换DataFrame为JSON
-            data_json = df.to_json(orient='records', date_format='iso')
-            
             # 查找或创建
             existing = session.query(DataCache).filter(
                 DataCache.cache_key == cache_key
             ).first()
             
             if existing:
-                existing.data_json = data_json
+                if existing.data_hash != data_hash:
+                    existing.data_blob = data_blob
+                    existing.data_json = data_json
+                    existing.data_hash = data_hash
                 existing.expires_at = expires_at
                 existing.updated_at = datetime.now()
             else:
                 cache = DataCache(
                     cache_key=cache_key,
-                    cache_type='daily_kline',
+                    cache_type=cache_type,
                     stock_code=stock_code,
                     data_json=data_json,
+                    data_blob=data_blob,
+                    data_hash=data_hash,
                     expires_at=expires_at
                 )
                 session.add(cache)
             
             session.commit()
+        finally:
             session.close()
-            return True
-            
-        except Exception as e:
-            print(f"缓存数据失败: {e}")
-            return False
+        self._mem.pop(cache_key)
     
-    def get_cached_daily_data(self, stock_code: str) -> Optional[pd.DataFrame]:
-        """获取缓存的日K线数据"""
-        if not self.db:
-            return None
+    def _load_frame(self, cache_key: str) -> Optional[pd.DataFrame]:
+        """从内存/DataCache读取未过期的DataFrame，返回副本"""
+        cached_df = self._mem.get(cache_key)
+        if cached_df is not None:
+            return cached_df.copy()
         
+        session = self.db.get_session()
         try:
-            session = self.db.get_session()
-            
-            cache_key = f"daily_{stock_code}_{datetime.now().strftime('%Y%m%d')}"
-            
             cache = session.query(DataCache).filter(
                 DataCache.cache_key == cache_key,
                 DataCache.expires_at > datetime.now()
             ).first()
-            
+        finally:
             session.close()
-            
-            if cache and cache.data_json:
-                df = pd.read_json(cache.data_json, orient='records')
-                print(f"[缓存命中] {stock_code} 日K线数据")
-                return df
-            
+        
+        if cache and cache.data_blob:
+            df = pd.read_feather(io.BytesIO(cache.data_blob))
+        elif cache and cache.data_json:
+            # 兼容迁移前的JSON缓存
+            df = pd.read_json(io.StringIO(cache.data_json), orient='records')
+        else:
             return None
-            
+        
+        self._mem.set(cache_key, df)
+        return df.copy()
+    
+    # ==================== 周期K线聚合 ====================
+    
+    def get_cached_resampled(self, stock_code: str, freq: str, digest: str) -> Optional[pd.DataFrame]:
+        """
+        读取缓存的周/月/季K线
+        
+        Args:
+            stock_code: 股票代码
+            freq: 采样频率
+            digest: 输入日线的内容摘要 (日线变化后不再命中旧结果)
+        
+        Returns:
+            以周期末日期为索引的DataFrame，未命中时返回None
+        """
+        if not self.db:
+            return None
+        
+        try:
+            df = self._load_frame(f"kline_{freq}_{stock_code}_{digest}")
         except Exception as e:
             print(f"获取缓存失败: {e}")
             return None
+        
+        if df is None:
+            return None
+        return df.set_index(pd.DatetimeIndex(pd.to_datetime(df.pop('_period'))))
+    
+    def cache_resampled(self, stock_code: str, freq: str, digest: str, df: pd.DataFrame) -> bool:
+        """缓存周/月/季K线 (以周期末日期为索引)"""
+        if not self.db or df.empty:
+            return False
+        
+        cache_type = _RESAMPLE_CACHE_TYPES.get(freq, 'resampled_kline')
+        try:
+            self._store_frame(
+                f"kline_{freq}_{stock_code}_{digest}", cache_type, stock_code,
+                df.reset_index(names='_period'), _RESAMPLE_TTL_HOURS
+            )
+            return True
+        except Exception as e:
+            print(f"缓存数据失败: {e}")
+            return False
+    
+    def invalidate_resampled(self, stock_code: str):
+        """日线写入后删除该股票已缓存的周期K线 (旧摘要的结果不会再被读取)"""
+        if not self.db:
+            return
+        
+        session = self.db.get_session()
+        try:
+            session.query(DataCache).filter(
+                DataCache.stock_code == stock_code,
+                DataCache.cache_type.in_(set(_RESAMPLE_CACHE_TYPES.values()) | {'resampled_kline'})
+            ).delete(synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"清理缓存失败: {e}")
+        finally:
+            session.close()
     
     def clear_expired_cache(self) -> int:
         """清理过期缓存"""
@@ -220,86 +494,146 @@ class DatabaseService:
     # ==================== 日线数据存储 ====================
     
     def save_daily_prices(self, stock_code: str, df: pd.DataFrame) -> bool:
-        """保存日线数据到数据库 (upsert模式)"""
-        if not self.db or df.empty:
+        """
+        保存日线数据
+        
+        pyarrow可用时写入按股票/年份分区的Parquet存储 (唯一数据源)，
+        否则upsert到数据库daily_prices表
+        """
+        if df.empty:
             return False
         
         try:
-            session = self.db.get_session()
+            # 日期列优先取date，缺失时用trade_date补齐
+            if 'date' in df.columns and 'trade_date' in df.columns:
+                dates = df['date'].fillna(df['trade_date'])
+            else:
+                dates = df['date'] if 'date' in df.columns else df['trade_date']
+            
+            data = df.reindex(columns=_PRICE_COLUMNS).assign(
+                trade_date=pd.to_datetime(dates).dt.date
+            )
+            data = data[data['trade_date'].notna()]
+            if data.empty:
+                return False
             
-            for _, row in df.iterrows():
-                trade_date = row.get('date') or row.get('trade_date')
-                if pd.isna(trade_date):
-                    continue
+            if PYARROW_AVAILABLE:
+                self._write_parquet_prices(stock_code, data)
+            elif self.db:
+                # NaN转为None写入NULL
+                data = data.assign(stock_code=stock_code)
+                data = data.astype(object).where(data.notna(), None)
+                records = data.to_dict(orient='records')
                 
-                # 查找是否存在
-                existing = session.query(DailyPrice).filter(
-                    DailyPrice.stock_code == stock_code,
-                    DailyPrice.trade_date == trade_date
-                ).first()
+                stmt = self.db.build_upsert(DailyPrice, ['stock_code', 'trade_date'], _PRICE_COLUMNS)
                 
-                if existing:
-                    # 更新
-                    existing.open = row.get('open')
-                    existing.high = row.get('high')
-                    existing.low = row.get('low')
-                    existing.close = row.get('close')
-                    existing.volume = row.get('volume')
-                    existing.amount = row.get('amount')
-                else:
-                    # 新增
-                    price = DailyPrice(
-                        stock_code=stock_code,
-                        trade_date=trade_date,
-                        open=row.get('open'),
-                        high=row.get('high'),
-                        low=row.get('low'),
-                        close=row.get('close'),
-                        volume=row.get('volume'),
-                        amount=row.get('amount')
-                    )
-                    session.add(price)
+                session = self.db.get_session()
+                session.execute(stmt, records)
+                session.commit()
+                session.close()
+            else:
+                return False
             
-            session.commit()
-            session.close()
+            # 基于旧日线计算的周期K线不会再命中，写入后一并清理
+            self.invalidate_resampled(stock_code)
             return True
             
         except Exception as e:
             print(f"保存日线数据失败: {e}")
             return False
     
-    def get_daily_prices(self, stock_code: str, days: int = 30) -> Optional[pd.DataFrame]:
-        """从数据库获取日线数据"""
-        if not self.db:
+    @staticmethod
+    def _parquet_dir(stock_code: str) -> str:
+        """单只股票的Parquet分区目录"""
+        return os.path.join(settings.DAILY_PARQUET_DIR, f"stock_code={stock_code}")
+    
+    def _write_parquet_prices(self, stock_code: str, data: pd.DataFrame) -> bool:
+        """合并已有年份分区后整区重写 (year=YYYY/part-0.parquet)"""
+        stock_dir = self._parquet_dir(stock_code)
+        data = data.astype(_PRICE_DTYPES)
+        data['year'] = pd.to_datetime(data['trade_date']).dt.year.astype(np.int32)
+        years = data['year'].unique().tolist()
+        
+        if os.path.isdir(stock_dir):
+            existing = ds.dataset(stock_dir, format='parquet', partitioning='hive').to_table(
+                filter=ds.field('year').isin(years)
+            ).to_pandas()
+            if not existing.empty:
+                existing = existing.astype(_PRICE_DTYPES).assign(
+                    year=existing['year'].astype(np.int32)
+                )
+                data = pd.concat([existing, data], ignore_index=True)
+                data = data.drop_duplicates('trade_date', keep='last')
+        
+        data = data.sort_values('trade_date', ignore_index=True)
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        ds.write_dataset(
+            table,
+            stock_dir,
+            format='parquet',
+            partitioning=['year'],
+            partitioning_flavor='hive',
+            basename_template='part-{i}.parquet',
+            existing_data_behavior='delete_matching'
+        )
+        return True
+    
+    def _read_parquet_prices(self, stock_code: str, cutoff_date) -> Optional[pd.DataFrame]:
+        """从Parquet分区读取日线，DuckDB可用时按年份分区裁剪并下推日期过滤"""
+        stock_dir = self._parquet_dir(stock_code)
+        if not PYARROW_AVAILABLE or not os.path.isdir(stock_dir):
             return None
         
+        if DUCKDB_AVAILABLE:
+            pattern = os.path.join(stock_dir, '*', '*.parquet')
+            con = duckdb.connect()
+            try:
+                df = con.execute(
+                    "SELECT trade_date AS date, open, high, low, close, volume, amount "
+                    "FROM read_parquet(?, hive_partitioning = true) "
+                    "WHERE year >= ? AND trade_date >= ? ORDER BY trade_date",
+                    [pattern, cutoff_date.year, cutoff_date]
+                ).df()
+            finally:
+                con.close()
+        else:
+            df = ds.dataset(stock_dir, format='parquet', partitioning='hive').to_table(
+                columns=['trade_date'] + _PRICE_COLUMNS,
+                filter=ds.field('trade_date') >= cutoff_date
+            ).to_pandas().rename(columns={'trade_date': 'date'})
+        
+        if df.empty:
+            return None
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        return _restore_prices(df)
+    
+    def get_daily_prices(self, stock_code: str, days: int = 30) -> Optional[pd.DataFrame]:
+        """获取日线数据 (pyarrow可用时只读Parquet存储，否则读数据库)"""
+        cutoff_date = datetime.now().date() - timedelta(days=days)
+        
         try:
-            session = self.db.get_session()
+            if PYARROW_AVAILABLE:
+                return self._read_parquet_prices(stock_code, cutoff_date)
+            
+            if not self.db:
+                return None
             
-            cutoff_date = datetime.now().date() - timedelta(days=days)
-            records = session.query(DailyPrice).filter(
+            stmt = select(
+                DailyPrice.trade_date.label('date'),
+                DailyPrice.open,
+                DailyPrice.high,
+                DailyPrice.low,
+                DailyPrice.close,
+                DailyPrice.volume,
+                DailyPrice.amount
+            ).where(
                 DailyPrice.stock_code == stock_code,
                 DailyPrice.trade_date >= cutoff_date
-            ).order_by(DailyPrice.trade_date).all()
+            ).order_by(DailyPrice.trade_date)
             
-            session.close()
-            
-            if records:
-                data = [
-                    {
-                        'date': r.trade_date,
-                        'open': r.open,
-                        'high': r.high,
-                        'low': r.low,
-                        'close': r.close,
-                        'volume': r.volume,
-                        'amount': r.amount
-                    }
-                    for r in records
-                ]
-                return pd.DataFrame(data)
-            
-            return None
+            # 结果集直接构建列式DataFrame
+            df = pd.read_sql(stmt, self.db.engine)
+            return None if df.empty else _restore_prices(df)
             
         except Exception as e:
             print(f"获取日线数据失败: {e}")
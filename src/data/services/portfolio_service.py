@@ -8,30 +8,55 @@ from typing import List, Optional, Dict
 from contextlib import contextmanager
 import logging
 
+from sqlalchemy import bindparam, select
+
 from src.data.storage.db_manager import get_db_manager
 from src.data.models import Watchlist, Position, TradeRecord
+from src.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# 盈亏计算只需的持仓字段 (绑定参数语句，编译结果由SQLAlchemy缓存复用)
+_PNL_STMT = select(
+    Position.shares,
+    Position.avg_cost,
+    Position.total_cost,
+    Position.stock_name
+).where(
+    Position.stock_code == bindparam('code'),
+    Position.is_active == True
+).limit(1)
+
 
 @contextmanager
 def get_session():
-    """获取数据库会话的上下文管理器"""
-    db = get_db_manager()
-    session = db.get_session()
+    """
+    获取数据库会话的上下文管理器
+    
+    使用线程内复用的scoped会话，提交后连接归还连接池，会话本身保留供下次调用；
+    线程的一轮工作结束时调用release_session()释放
+    """
+    session = get_db_manager().get_scoped_session()
     try:
         yield session
         session.commit()
     except Exception:
         session.rollback()
         raise
-    finally:
-        session.close()
+
+
+def release_session():
+    """关闭并移除当前线程的复用会话 (工作线程或一次页面渲染结束时调用)"""
+    get_db_manager().remove_scoped_session()
 
 
 class PortfolioService:
     """持仓与自选股管理服务"""
     
+    def __init__(self):
+        # 单只持仓查询的短期缓存，持仓写入时失效
+        self._position_cache = TTLCache(maxsize=256, ttl=3)
+    
     # ===== 自选股管理 =====
     
     def add_to_watchlist(
@@ -129,45 +154,85 @@ class PortfolioService:
         notes: str = ""
     ) -> bool:
         """添加/更新持仓"""
+        count = self.add_positions([{
+            'stock_code': stock_code,
+            'stock_name': stock_name,
+            'shares': shares,
+            'avg_cost': avg_cost,
+            'buy_date': buy_date,
+            'strategy_tag': strategy_tag,
+            'notes': notes
+        }])
+        return count > 0
+    
+    def add_positions(self, positions: List[Dict]) -> int:
+        """
+        批量添加/更新持仓 (单次查询 + 单事务提交)
+        
+        Args:
+            positions: 持仓字典列表，键同add_position参数
+            
+        Returns:
+            成功写入的条数
+        """
+        if not positions:
+            return 0
+        
+        codes = {p['stock_code'] for p in positions}
         try:
             with get_session() as session:
-                # 检查是否已有持仓
-                pos = session.query(Position).filter(
-                    Position.stock_code == stock_code,
-                    Position.is_active == True
-                ).first()
-                
-                if pos:
-                    # 更新持仓 (加仓逻辑)
-                    total_shares = pos.shares + shares
-                    total_cost = pos.total_cost + (shares * avg_cost)
-                    pos.shares = total_shares
-                    pos.total_cost = total_cost
-                    pos.avg_cost = total_cost / total_shares if total_shares > 0 else 0
-                    pos.last_trade_date = buy_date or date.today()
-                    pos.updated_at = datetime.now()
-                else:
-                    # 新建持仓
-                    pos = Position(
-                        stock_code=stock_code,
-                        stock_name=stock_name,
-                        shares=shares,
-                        avg_cost=avg_cost,
-                        total_cost=shares * avg_cost,
-                        buy_date=buy_date or date.today(),
-                        last_trade_date=buy_date or date.today(),
-                        strategy_tag=strategy_tag,
-                        notes=notes,
-                        is_active=True
+                # 一次性加载所有相关的活跃持仓
+                active = {
+                    pos.stock_code: pos
+                    for pos in session.query(Position).filter(
+                        Position.stock_code.in_(codes),
+                        Position.is_active == True
                     )
-                    session.add(pos)
+                }
+                
+                for item in positions:
+                    stock_code = item['stock_code']
+                    shares = item['shares']
+                    avg_cost = item['avg_cost']
+                    trade_date = item.get('buy_date') or date.today()
+                    
+                    pos = active.get(stock_code)
+                    if pos:
+                        # 更新持仓 (加仓逻辑)
+                        total_shares = pos.shares + shares
+                        total_cost = pos.total_cost + (shares * avg_cost)
+                        pos.shares = total_shares
+                        pos.total_cost = total_cost
+                        pos.avg_cost = total_cost / total_shares if total_shares > 0 else 0
+                        pos.last_trade_date = trade_date
+                        pos.updated_at = datetime.now()
+                    else:
+                        # 新建持仓
+                        pos = Position(
+                            stock_code=stock_code,
+                            stock_name=item.get('stock_name', ''),
+                            shares=shares,
+                            avg_cost=avg_cost,
+                            total_cost=shares * avg_cost,
+                            buy_date=trade_date,
+                            last_trade_date=trade_date,
+                            strategy_tag=item.get('strategy_tag', ''),
+                            notes=item.get('notes', ''),
+                            is_active=True
+                        )
+                        session.add(pos)
+                        active[stock_code] = pos
+                    
+                    logger.info(f"更新持仓: {stock_code} {shares}股 @ {avg_cost}")
                 
                 session.commit()
-                logger.info(f"更新持仓: {stock_code} {shares}股 @ {avg_cost}")
-                return True
+            
+            for stock_code in codes:
+                self._position_cache.pop(stock_code)
+            return len(positions)
         except Exception as e:
             logger.error(f"添加持仓失败: {e}")
-            return False
+            return 0
     
     def sell_position(
         self,
@@ -221,6 +286,7 @@ class PortfolioService:
                 )
                 session.add(trade)
                 session.commit()
+                self._position_cache.pop(stock_code)
                 
                 result = {
                     'code': stock_code,
@@ -264,6 +330,10 @@ class PortfolioService:
     
     def get_position(self, stock_code: str) -> Optional[Dict]:
         """获取单只股票的持仓信息"""
+        cached = self._position_cache.get(stock_code)
+        if cached is not None:
+            return dict(cached)
+        
         try:
             with get_session() as session:
                 pos = session.query(Position).filter(
@@ -274,7 +344,7 @@ class PortfolioService:
                 if not pos:
                     return None
                 
-                return {
+                result = {
                     'code': pos.stock_code,
                     'name': pos.stock_name,
                     'shares': pos.shares,
@@ -283,28 +353,40 @@ class PortfolioService:
                     'buy_date': pos.buy_date,
                     'strategy': pos.strategy_tag
                 }
+                self._position_cache.set(stock_code, result)
+                return dict(result)
         except Exception as e:
             logger.error(f"获取持仓信息失败: {e}")
             return None
     
     def calculate_pnl(self, stock_code: str, current_price: float) -> Optional[Dict]:
         """计算持仓盈亏"""
-        pos = self.get_position(stock_code)
-        if not pos:
-            return None
+        pos = self._position_cache.get(stock_code)
+        if pos is not None:
+            name, shares, avg_cost, total_cost = pos['name'], pos['shares'], pos['avg_cost'], pos['total_cost']
+        else:
+            try:
+                with get_session() as session:
+                    row = session.execute(_PNL_STMT, {'code': stock_code}).first()
+            except Exception as e:
+                logger.error(f"获取持仓信息失败: {e}")
+                return None
+            if row is None:
+                return None
+            shares, avg_cost, total_cost, name = row
         
-        market_value = pos['shares'] * current_price
-        profit = market_value - pos['total_cost']
-        profit_pct = (current_price / pos['avg_cost'] - 1) * 100 if pos['avg_cost'] > 0 else 0
+        market_value = shares * current_price
+        profit = market_value - total_cost
+        profit_pct = (current_price / avg_cost - 1) * 100 if avg_cost > 0 else 0
         
         return {
             'code': stock_code,
-            'name': pos['name'],
-            'shares': pos['shares'],
-            'avg_cost': pos['avg_cost'],
+            'name': name,
+            'shares': shares,
+            'avg_cost': avg_cost,
             'current_price': current_price,
             'market_value': market_value,
-            'total_cost': pos['total_cost'],
+            'total_cost': total_cost,
             'profit': profit,
             'profit_pct': profit_pct
         }
@@ -4,16 +4,66 @@
 验证AI分析建议的准确性
 """
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import load_only
+
 from src.data.storage.db_manager import get_db_manager
 from src.data.models import AnalysisHistory
 from src.data.collectors import stock_collector
+from src.utils.jit import njit
 
 logger = logging.getLogger(__name__)
 
+# 并发拉取行情的线程数 (限制对上游数据源的并发)
+FETCH_WORKERS = 8
+
+# 待验证记录每批读取并提交的条数
+VERIFY_BATCH_SIZE = 200
+
+# 判定涨跌的价格比值容差: 行情价格以单精度存储，未变动的价格比值可能偏离1约1e-7
+PRICE_RATIO_TOLERANCE = 1e-6
+
+# 信号编码
+VERDICT_BUY = 1
+VERDICT_SELL = -1
+VERDICT_HOLD = 0
+
+
+@njit(cache=True)
+def _classify_verdicts(analysis, after, verdict, tol):
+    """
+    批量判定信号是否正确
+    
+    BUY后上涨、SELL后下跌、HOLD涨跌幅在±3%内为正确；比值偏离1不超过tol视为价格未变
+    
+    Returns:
+        (是否正确数组, 收益率%数组)
+    """
+    n = len(analysis)
+    correct = np.empty(n, np.bool_)
+    returns = np.empty(n, np.float64)
+    for i in range(n):
+        # 判定直接比较价格比值，收益率仅用于写回
+        ratio = after[i] / analysis[i]
+        v = verdict[i]
+        if v == 1:
+            correct[i] = ratio > 1.0 + tol
+        elif v == -1:
+            correct[i] = ratio < 1.0 - tol
+        else:
+            correct[i] = 0.97 < ratio < 1.03
+        returns[i] = (ratio - 1.0) * 100.0
+    return correct, returns
+
 
 class WinRateVerifier:
     """胜率验证服务"""
@@ -26,9 +76,15 @@ class WinRateVerifier:
         self.verify_days = verify_days
         self.db = get_db_manager()
     
-    def verify_pending_records(self) -> Dict:
+    def verify_pending_records(self, limit: Optional[int] = 50, batch_size: int = VERIFY_BATCH_SIZE) -> Dict:
         """
-        验证所有待验证的历史记录
+        验证待验证的历史记录
+        
+        按主键分批读取待验证记录，每批处理完即提交，积压再多内存占用也保持恒定
+        
+        Args:
+            limit: 本次最多处理的记录数 (默认50)，显式传None表示处理全部积压
+            batch_size: 每批读取并提交的记录数
         
         Returns:
             验证结果统计
@@ -40,98 +96,202 @@ class WinRateVerifier:
             # 查找N天前未验证的记录
             cutoff_date = datetime.now() - timedelta(days=self.verify_days + 2)
             
-            pending = session.query(AnalysisHistory).filter(
+            # 只加载验证所需的列 (不读取AI完整回复等大字段)
+            base = select(AnalysisHistory).options(load_only(
+                AnalysisHistory.id,
+                AnalysisHistory.stock_code,
+                AnalysisHistory.price,
+                AnalysisHistory.analysis_date,
+                AnalysisHistory.aggregated_signal,
+                AnalysisHistory.ai_verdict
+            )).where(
                 AnalysisHistory.verified == False,
                 AnalysisHistory.analysis_time <= cutoff_date
-            ).limit(50).all()
-            
-            stats["total"] = len(pending)
+            ).order_by(AnalysisHistory.id)
             
-            for record in pending:
-                try:
-                    result = self._verify_single(record, session)
-                    if result is not None:
-                        stats["verified"] += 1
-                        if result:
-                            stats["correct"] += 1
-                except Exception as e:
-                    logger.error(f"验证失败 {record.stock_code}: {e}")
-                    stats["errors"] += 1
+            # 按主键续读下一批: 提交时不保留打开的游标，未能验证的记录也不会被重复读取
+            last_id = 0
+            while limit is None or stats["total"] < limit:
+                size = batch_size if limit is None else min(batch_size, limit - stats["total"])
+                batch = session.execute(
+                    base.where(AnalysisHistory.id > last_id).limit(size)
+                ).scalars().all()
+                if not batch:
+                    break
+                
+                last_id = batch[-1].id
+                stats["total"] += len(batch)
+                self._verify_batch(session, batch, stats)
+                session.commit()
+                # 已提交的对象不再需要，释放会话中的引用
+                session.expunge_all()
             
-            session.commit()
             logger.info(f"胜率验证完成: {stats}")
             return stats
             
         finally:
             session.close()
     
-    def _verify_single(self, record: AnalysisHistory, session) -> Optional[bool]:
+    def _verify_batch(self, session, pending: List[AnalysisHistory], stats: Dict):
+        """
+        验证一批记录并写回结果 (由调用方提交)
+        
+        Args:
+            session: 数据库会话
+            pending: 待验证记录
+            stats: 累计的验证结果统计
+        """
+        # 按股票分组，每只股票只拉取一次行情
+        by_code: Dict[str, List[AnalysisHistory]] = defaultdict(list)
+        for record in pending:
+            by_code[record.stock_code].append(record)
+        
+        # 行情拉取为网络I/O，多只股票并发请求 (Baostock回退在采集器内加锁串行)；数据库更新仍在当前会话串行执行
+        prices: Dict[str, Optional[pd.DataFrame]] = {}
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(by_code))) as executor:
+            futures = {
+                executor.submit(self._fetch_prices, code, records): code
+                for code, records in by_code.items()
+            }
+            for future in as_completed(futures):
+                prices[futures[future]] = future.result()
+        
+        # 逐条定位验证价格，收益率与判定批量计算
+        matched = []
+        for code, records in by_code.items():
+            series = self._price_series(prices.get(code))
+            for record in records:
+                try:
+                    item = self._prepare_single(record, series)
+                    if item is not None:
+                        matched.append((record,) + item)
+                except Exception as e:
+                    logger.error(f"验证失败 {record.stock_code}: {e}")
+                    stats["errors"] += 1
+        
+        if matched:
+            updates = self._apply_verdicts(matched)
+            # 按主键批量UPDATE (executemany)，不经过ORM逐对象flush
+            session.execute(update(AnalysisHistory), updates)
+            stats["verified"] += len(updates)
+            stats["correct"] += sum(1 for u in updates if u['verdict_correct'])
+    
+    def _fetch_prices(self, stock_code: str, records: List[AnalysisHistory]) -> Optional[pd.DataFrame]:
+        """
+        拉取一只股票覆盖所有待验证记录的日线数据
+        
+        Args:
+            stock_code: 股票代码
+            records: 该股票的待验证记录
+        """
+        # 天数覆盖最早一条记录的分析日期至今
+        earliest = min(r.analysis_date for r in records)
+        days = max((date.today() - earliest).days + 1, 10)
+        
+        try:
+            return stock_collector.get_daily_data(stock_code, days=days, use_cache=True)
+        except Exception as e:
+            logger.error(f"获取后续价格失败: {e}")
+            return None
+    
+    @staticmethod
+    def _price_series(df: Optional[pd.DataFrame]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        日线数据转为 (交易日int64纳秒数组, 收盘价数组)，按日期升序
+        
+        每只股票只转换一次，逐条记录查找时用searchsorted二分定位
+        """
+        if df is None or df.empty or 'close' not in df.columns:
+            return None
+        
+        dates = df['trade_date'] if 'trade_date' in df.columns else df.index
+        dates_ns = pd.DatetimeIndex(pd.to_datetime(dates)).values.astype('datetime64[ns]').view('i8')
+        closes = df['close'].to_numpy(dtype=np.float64)
+        
+        if len(dates_ns) > 1 and not (np.diff(dates_ns) >= 0).all():
+            order = np.argsort(dates_ns, kind='stable')
+            dates_ns, closes = dates_ns[order], closes[order]
+        return dates_ns, closes
+    
+    def _prepare_single(
+        self,
+        record: AnalysisHistory,
+        series: Optional[Tuple[np.ndarray, np.ndarray]]
+    ) -> Optional[Tuple[int, float]]:
         """
-        验证单条记录
+        定位单条记录的验证价格
+        
+        Args:
+            record: 待验证记录
+            series: 该股票预先转换的 (交易日, 收盘价) 数组
         
         Returns:
-            True=判断正确, False=判断错误, None=无法验证
+            (信号编码, N天后价格)，无法验证时返回None
         """
         # 获取分析时的价格
         analysis_price = record.price
         if not analysis_price or analysis_price <= 0:
             return None
         
+        verdict_code = self._encode_verdict(record.aggregated_signal or record.ai_verdict)
+        if verdict_code is None or series is None:
+            return None
+        dates_ns, closes = series
+        
         # 计算N天后的日期
         target_date = record.analysis_date + timedelta(days=self.verify_days)
         
-        # 获取N天后的价格
-        try:
-            df = stock_collector.get_daily_data(
-                record.stock_code, 
-                days=10,
-                use_cache=False  # 强制刷新
-            )
-            
-            if df is None or df.empty:
-                return None
-            
-            # 找到目标日期之后最近的交易日收盘价
-            df_after = df[df.index >= target_date.strftime('%Y-%m-%d')]
-            if df_after.empty:
-                return None
-            
-            price_after = df_after.iloc[0]['close']
-            
-        except Exception as e:
-            logger.error(f"获取后续价格失败: {e}")
+        # 目标日期当天或之后最近的交易日收盘价
+        key = np.datetime64(target_date, 'ns').view('i8')
+        pos = np.searchsorted(dates_ns, key)
+        if pos >= len(dates_ns):
             return None
-        
-        # 计算收益率
-        return_pct = (price_after / analysis_price - 1) * 100
-        
-        # 判断AI是否正确
-        verdict = record.aggregated_signal or record.ai_verdict
+        return verdict_code, float(closes[pos])
+    
+    @staticmethod
+    def _encode_verdict(verdict: Optional[str]) -> Optional[int]:
+        """信号文本编码为 BUY=1 / SELL=-1 / 其他=0 (HOLD)，空信号返回None"""
         if not verdict:
             return None
-        
         verdict_upper = verdict.upper()
-        
         if "BUY" in verdict_upper:
-            # AI说买入，后续涨了就是正确
-            is_correct = return_pct > 0
-        elif "SELL" in verdict_upper:
-            # AI说卖出，后续跌了就是正确
-            is_correct = return_pct < 0
-        else:
-            # HOLD，涨跌幅在±3%内算正确
-            is_correct = abs(return_pct) < 3
+            return VERDICT_BUY
+        if "SELL" in verdict_upper:
+            return VERDICT_SELL
+        return VERDICT_HOLD
+    
+    def _apply_verdicts(self, matched: List[Tuple[AnalysisHistory, int, float]]) -> List[Dict]:
+        """
+        批量计算收益率和判定结果
+        
+        Args:
+            matched: (记录, 信号编码, N天后价格) 列表
+        
+        Returns:
+            按主键更新的字段字典列表 (不修改ORM对象)
+        """
+        analysis = np.array([m[0].price for m in matched], dtype=np.float64)
+        verdicts = np.array([m[1] for m in matched], dtype=np.int8)
+        after = np.array([m[2] for m in matched], dtype=np.float64)
         
-        # 更新记录
-        record.verified = True
-        record.verified_at = datetime.now()
-        record.price_after_5d = price_after
-        record.actual_return_5d = return_pct
-        record.verdict_correct = is_correct
+        correct, returns = _classify_verdicts(analysis, after, verdicts, PRICE_RATIO_TOLERANCE)
         
-        logger.info(f"验证 {record.stock_code}: {verdict} -> {return_pct:.2f}% -> {'✓' if is_correct else '✗'}")
+        now = datetime.now()
+        updates = []
+        for (record, _, price_after), is_correct, return_pct in zip(matched, correct.tolist(), returns.tolist()):
+            updates.append({
+                'id': record.id,
+                'verified': True,
+                'verified_at': now,
+                'price_after_5d': price_after,
+                'actual_return_5d': return_pct,
+                'verdict_correct': is_correct
+            })
+            
+            verdict = record.aggregated_signal or record.ai_verdict
+            logger.info(f"验证 {record.stock_code}: {verdict} -> {return_pct:.2f}% -> {'✓' if is_correct else '✗'}")
         
-        return is_correct
+        return updates
     
     def get_win_rate_stats(self, days: int = 30) -> Dict:
         """
@@ -147,50 +307,133 @@ class WinRateVerifier:
         
         try:
             cutoff = datetime.now() - timedelta(days=days)
-            
-            records = session.query(AnalysisHistory).filter(
+            try:
+                return self._aggregate_stats_sql(session, cutoff)
+            except SQLAlchemyError as e:
+                # 数据库不支持分组聚合表达式时退回Python单次遍历
+                logger.warning(f"SQL聚合统计失败，改用逐行统计: {e}")
+                session.rollback()
+                return self._aggregate_stats_rows(session, cutoff)
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _aggregate_stats_sql(session, cutoff: datetime) -> Dict:
+        """按信号类别分组，在数据库中完成计数/求和/极值聚合"""
+        signal = func.upper(AnalysisHistory.aggregated_signal)
+        kind = case(
+            (signal.like('%BUY%'), 'BUY'),
+            (signal.like('%SELL%'), 'SELL'),
+            else_='OTHER'
+        ).label('kind')
+        ret = AnalysisHistory.actual_return_5d
+        stmt = select(
+            kind,
+            func.count(),
+            func.sum(case((AnalysisHistory.verdict_correct == True, 1), else_=0)),
+            func.count(ret),
+            func.sum(ret),
+            func.max(ret),
+            func.min(ret)
+        ).where(
+            AnalysisHistory.verified == True,
+            AnalysisHistory.analysis_time >= cutoff
+        ).group_by(kind)
+        
+        groups = {row[0]: row[1:] for row in session.execute(stmt)}
+        
+        buy = groups.get('BUY', (0, 0))
+        sell = groups.get('SELL', (0, 0))
+        bests = [g[4] for g in groups.values() if g[4] is not None]
+        worsts = [g[5] for g in groups.values() if g[5] is not None]
+        
+        return WinRateVerifier._format_stats(
+            total=sum(g[0] for g in groups.values()),
+            correct=sum(g[1] or 0 for g in groups.values()),
+            buy=buy[0], buy_ok=buy[1] or 0,
+            sell=sell[0], sell_ok=sell[1] or 0,
+            ret_n=sum(g[2] for g in groups.values()),
+            ret_sum=sum(g[3] or 0 for g in groups.values()),
+            best=max(bests) if bests else 0,
+            worst=min(worsts) if worsts else 0
+        )
+    
+    @staticmethod
+    def _aggregate_stats_rows(session, cutoff: datetime) -> Dict:
+        """只取统计所需的三列，一次遍历累计全部计数 (不构建中间列表)"""
+        rows = session.execute(
+            select(
+                AnalysisHistory.aggregated_signal,
+                AnalysisHistory.verdict_correct,
+                AnalysisHistory.actual_return_5d
+            ).where(
                 AnalysisHistory.verified == True,
                 AnalysisHistory.analysis_time >= cutoff
-            ).all()
-            
-            if not records:
-                return {
-                    "total_verified": 0,
-                    "win_rate": 0,
-                    "buy_win_rate": 0,
-                    "sell_win_rate": 0,
-                    "avg_return": 0,
-                    "message": "暂无验证数据"
-                }
-            
-            total = len(records)
-            correct = sum(1 for r in records if r.verdict_correct)
-            
-            # 分类统计
-            buy_records = [r for r in records if r.aggregated_signal and 'BUY' in r.aggregated_signal.upper()]
-            sell_records = [r for r in records if r.aggregated_signal and 'SELL' in r.aggregated_signal.upper()]
-            
-            buy_correct = sum(1 for r in buy_records if r.verdict_correct)
-            sell_correct = sum(1 for r in sell_records if r.verdict_correct)
-            
-            # 平均收益
-            returns = [r.actual_return_5d for r in records if r.actual_return_5d is not None]
-            avg_return = sum(returns) / len(returns) if returns else 0
-            
+            )
+        )
+        
+        total = correct = buy = buy_ok = sell = sell_ok = ret_n = 0
+        ret_sum = 0.0
+        best = float('-inf')
+        worst = float('inf')
+        for signal, verdict_correct, ret in rows:
+            total += 1
+            ok = 1 if verdict_correct else 0
+            correct += ok
+            sig = (signal or '').upper()
+            if 'BUY' in sig:
+                buy += 1
+                buy_ok += ok
+            elif 'SELL' in sig:
+                sell += 1
+                sell_ok += ok
+            if ret is not None:
+                ret_sum += ret
+                ret_n += 1
+                if ret > best:
+                    best = ret
+                if ret < worst:
+                    worst = ret
+        
+        return WinRateVerifier._format_stats(
+            total=total, correct=correct,
+            buy=buy, buy_ok=buy_ok,
+            sell=sell, sell_ok=sell_ok,
+            ret_n=ret_n, ret_sum=ret_sum,
+            best=best if ret_n else 0,
+            worst=worst if ret_n else 0
+        )
+    
+    @staticmethod
+    def _format_stats(
+        total: int, correct: int,
+        buy: int, buy_ok: int,
+        sell: int, sell_ok: int,
+        ret_n: int, ret_sum: float,
+        best: float, worst: float
+    ) -> Dict:
+        """由累计计数组装胜率统计结果"""
+        if not total:
             return {
-                "total_verified": total,
-                "win_rate": correct / total * 100 if total > 0 else 0,
-                "buy_count": len(buy_records),
-                "buy_win_rate": buy_correct / len(buy_records) * 100 if buy_records else 0,
-                "sell_count": len(sell_records),
-                "sell_win_rate": sell_correct / len(sell_records) * 100 if sell_records else 0,
-                "avg_return": avg_return,
-                "best_return": max(returns) if returns else 0,
-                "worst_return": min(returns) if returns else 0
+                "total_verified": 0,
+                "win_rate": 0,
+                "buy_win_rate": 0,
+                "sell_win_rate": 0,
+                "avg_return": 0,
+                "message": "暂无验证数据"
             }
-            
-        finally:
-            session.close()
+        
+        return {
+            "total_verified": total,
+            "win_rate": correct / total * 100,
+            "buy_count": buy,
+            "buy_win_rate": buy_ok / buy * 100 if buy else 0,
+            "sell_count": sell,
+            "sell_win_rate": sell_ok / sell * 100 if sell else 0,
+            "avg_return": ret_sum / ret_n if ret_n else 0,
+            "best_return": best,
+            "worst_return": worst
+        }
 
 
 # 全局实例
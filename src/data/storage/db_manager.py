@@ -4,11 +4,15 @@ Stock Analysis System - Database Manager
 数据库操作管理器
 """
 
-from typing import List, Optional, Dict, Any
+import atexit
+import threading
+from typing import List, Optional, Dict, Any, Iterator, Union
 from datetime import datetime, date
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, inspect, select, text, update
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.exc import SQLAlchemyError
 
 import sys
@@ -16,11 +20,39 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from config.settings import settings
-from src.data.models import Base, Stock, DailyPrice, FinancialData, TechnicalIndicator, Alert, BacktestResult, TradeRecord
+from src.data.models import PRICE_DECIMALS, Base, Stock, DailyPrice, MinutePrice, FinancialData, TechnicalIndicator, Alert, BacktestResult, TradeRecord
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 尝试导入pyarrow (查询结果使用Arrow列存储)
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 日线表中由行情数据写入的列
+DAILY_PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'turnover', 'pct_change', 'pre_close']
+
+# 日线中以单精度存储的价格列
+_DAILY_PRICE_FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close']
+
+# 日线读取的列类型: 统一读为float64，价格列再按PRICE_DECIMALS还原单精度存储带来的误差
+_DAILY_PRICE_DTYPES = {
+    'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64, 'pre_close': np.float64,
+    'amount': np.float64, 'turnover': np.float64, 'pct_change': np.float64
+}
+
+# 技术指标表中由指标计算结果写入的列
+TECHNICAL_INDICATOR_COLUMNS = [
+    'ma5', 'ma10', 'ma20', 'ma60',
+    'macd', 'macd_signal', 'macd_hist',
+    'rsi_6', 'rsi_12', 'rsi_14',
+    'boll_upper', 'boll_middle', 'boll_lower',
+    'kdj_k', 'kdj_d', 'kdj_j'
+]
+
 
 class DatabaseManager:
     """数据库管理器"""
@@ -35,6 +67,7 @@ class DatabaseManager:
         self.connection_string = connection_string or settings.database.connection_string
         self.engine = None
         self.Session = None
+        self.ScopedSession = None
         self._connect()
     
     def _connect(self):
@@ -42,30 +75,154 @@ class DatabaseManager:
         try:
             self.engine = create_engine(
                 self.connection_string,
-                pool_size=10,
-                max_overflow=20,
+                pool_size=settings.database.pool_size,
+                max_overflow=settings.database.max_overflow,
                 pool_recycle=3600,
+                pool_pre_ping=True,
+                query_cache_size=1200,
                 echo=False
             )
             self.Session = sessionmaker(bind=self.engine)
+            # 线程内复用的会话，高频短操作无需每次新建会话
+            self.ScopedSession = scoped_session(self.Session)
+            atexit.register(self.ScopedSession.remove)
             logger.info("数据库连接成功")
         except Exception as e:
             logger.error(f"数据库连接失败: {e}")
             raise
+        
+        # 已有数据库在连接时补齐新增列，不依赖手动执行initdb；失败时只记录日志
+        try:
+            self._add_missing_columns()
+        except SQLAlchemyError as e:
+            logger.warning(f"补齐新增列失败: {e}")
     
     def init_tables(self):
         """初始化数据库表"""
         try:
             Base.metadata.create_all(self.engine)
+            self._add_missing_columns()
+            self._add_missing_indexes()
             logger.info("数据库表初始化完成")
         except Exception as e:
             logger.error(f"数据库表初始化失败: {e}")
             raise
     
+    def _add_missing_columns(self):
+        """
+        为已存在的表补齐模型中新增的列 (create_all不会修改已有表)
+        
+        列定义由CreateColumn按当前方言编译 (标识符引用、类型变体、MySQL列注释)
+        """
+        dialect = self.engine.dialect
+        preparer = dialect.identifier_preparer
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {c['name'] for c in inspector.get_columns(table.name)}
+                for col in table.columns:
+                    if col.name in existing:
+                        continue
+                    col_spec = CreateColumn(col).compile(dialect=dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {col_spec}")
+                    logger.info(f"表{table.name}新增列: {col.name}")
+    
+    def _add_missing_indexes(self):
+        """为已存在的表补建模型中新增的索引 (create_all不会修改已有表)"""
+        inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {idx['name'] for idx in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(self.engine)
+                logger.info(f"表{table.name}新增索引: {index.name}")
+    
+    def migrate_price_precision(self):
+        """
+        将已有行情表的价格列迁移为单精度浮点
+        
+        旧表价格列为DOUBLE，新模型使用FLOAT(24)。SQLite为动态类型，无需迁移。
+        """
+        dialect = self.engine.dialect.name
+        if dialect not in ('mysql', 'postgresql'):
+            logger.info(f"{dialect} 无需迁移价格列类型")
+            return
+        
+        statements = []
+        for model, columns in (
+            (DailyPrice, ('open', 'high', 'low', 'close', 'pre_close')),
+            (MinutePrice, ('open', 'high', 'low', 'close')),
+        ):
+            table = model.__tablename__
+            for name in columns:
+                col = model.__table__.c[name]
+                if dialect == 'mysql':
+                    col_type = col.type.compile(dialect=self.engine.dialect)
+                    statements.append(
+                        f"ALTER TABLE {table} MODIFY COLUMN {name} {col_type} COMMENT '{col.comment}'"
+                    )
+                else:
+                    statements.append(f"ALTER TABLE {table} ALTER COLUMN {name} TYPE REAL")
+        
+        try:
+            with self.engine.begin() as conn:
+                for stmt in statements:
+                    conn.execute(text(stmt))
+            logger.info(f"价格列精度迁移完成，共{len(statements)}列")
+        except SQLAlchemyError as e:
+            logger.error(f"价格列精度迁移失败: {e}")
+            raise
+    
     def get_session(self) -> Session:
         """获取数据库会话"""
         return self.Session()
     
+    def get_scoped_session(self) -> Session:
+        """获取当前线程复用的数据库会话 (由remove_scoped_session释放)"""
+        return self.ScopedSession()
+    
+    def remove_scoped_session(self):
+        """关闭并移除当前线程的复用会话"""
+        self.ScopedSession.remove()
+    
+    def build_upsert(self, model, index_elements: List[str], update_columns: List[str]):
+        """
+        构建批量UPSERT语句，配合 session.execute(stmt, rows) 以executemany方式执行
+        
+        Args:
+            model: ORM模型类
+            index_elements: 唯一键列 (需存在对应唯一索引)
+            update_columns: 冲突时更新的列
+            
+        Returns:
+            INSERT ... ON DUPLICATE KEY UPDATE (MySQL) 或 INSERT ... ON CONFLICT DO UPDATE 语句
+        """
+        dialect = self.engine.dialect.name
+        table = model.__table__
+        
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table)
+            return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+        
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f"不支持的数据库UPSERT: {dialect}")
+        
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    
     # ==================== 股票基本信息操作 ====================
     
     def save_stock(self, code: str, name: str, exchange: str = None, **kwargs) -> Stock:
@@ -140,47 +297,32 @@ class DatabaseManager:
             stock_code: 股票代码
             data: 包含日线数据的DataFrame
         """
+        if data.empty:
+            return
+        
+        # 日期列向量化规整: 优先trade_date，缺失时取date
+        if 'trade_date' in data.columns and 'date' in data.columns:
+            dates = data['trade_date'].fillna(data['date'])
+        else:
+            dates = data['trade_date'] if 'trade_date' in data.columns else data['date']
+        
+        frame = data.reindex(columns=DAILY_PRICE_COLUMNS).assign(
+            stock_code=stock_code,
+            trade_date=pd.to_datetime(dates).dt.date
+        )
+        frame = frame.astype(object).where(frame.notna(), None)
+        
+        try:
+            stmt = self.build_upsert(DailyPrice, ['stock_code', 'trade_date'], DAILY_PRICE_COLUMNS)
+        except NotImplementedError:
+            stmt = None
+        
         session = self.get_session()
         try:
-            for _, row in data.iterrows():
-                trade_date = row.get('trade_date') or row.get('date')
-                if isinstance(trade_date, str):
-                    trade_date = datetime.strptime(trade_date, '%Y-%m-%d').date()
-                
-                # 检查是否存在
-                existing = session.query(DailyPrice).filter(
-                    DailyPrice.stock_code == stock_code,
-                    DailyPrice.trade_date == trade_date
-                ).first()
-                
-                if existing:
-                    # 更新
-                    existing.open = row.get('open')
-                    existing.high = row.get('high')
-                    existing.low = row.get('low')
-                    existing.close = row.get('close')
-                    existing.volume = row.get('volume')
-                    existing.amount = row.get('amount')
-                    existing.turnover = row.get('turnover')
-                    existing.pct_change = row.get('pct_change')
-                    existing.pre_close = row.get('pre_close')
-                else:
-                    # 新增
-                    price = DailyPrice(
-                        stock_code=stock_code,
-                        trade_date=trade_date,
-                        open=row.get('open'),
-                        high=row.get('high'),
-                        low=row.get('low'),
-                        close=row.get('close'),
-                        volume=row.get('volume'),
-                        amount=row.get('amount'),
-                        turnover=row.get('turnover'),
-                        pct_change=row.get('pct_change'),
-                        pre_close=row.get('pre_close')
-                    )
-                    session.add(price)
-            
+            if stmt is not None:
+                session.execute(stmt, frame.to_dict('records'))
+            else:
+                self._save_daily_prices_rows(session, stock_code, frame)
             session.commit()
             logger.info(f"保存{stock_code}日线数据 {len(data)}条")
         except SQLAlchemyError as e:
@@ -190,6 +332,38 @@ class DatabaseManager:
         finally:
             session.close()
     
+    @staticmethod
+    def _save_daily_prices_rows(session: Session, stock_code: str, frame: pd.DataFrame, flush_every: int = 500):
+        """
+        不支持UPSERT的数据库: 一次预取已存在的交易日，逐行更新或插入
+        
+        Args:
+            session: 数据库会话
+            stock_code: 股票代码
+            frame: 已规整的日线数据 (含trade_date及DAILY_PRICE_COLUMNS列)
+            flush_every: 每多少行flush一次
+        """
+        existing = {d for (d,) in session.query(DailyPrice.trade_date).filter(
+            DailyPrice.stock_code == stock_code,
+            DailyPrice.trade_date.in_(set(frame['trade_date']))
+        )}
+        
+        columns = ['trade_date'] + DAILY_PRICE_COLUMNS
+        for i, row in enumerate(frame[columns].itertuples(index=False, name=None), 1):
+            values = dict(zip(DAILY_PRICE_COLUMNS, row[1:]))
+            if row[0] in existing:
+                session.execute(
+                    update(DailyPrice).where(
+                        DailyPrice.stock_code == stock_code,
+                        DailyPrice.trade_date == row[0]
+                    ).values(**values)
+                )
+            else:
+                session.add(DailyPrice(stock_code=stock_code, trade_date=row[0], **values))
+                existing.add(row[0])
+            if i % flush_every == 0:
+                session.flush()
+    
     def get_daily_prices(
         self, 
         stock_code: str, 
@@ -207,42 +381,29 @@ class DatabaseManager:
         Returns:
             日线数据DataFrame
         """
-        session = self.get_session()
-        try:
-            query = session.query(DailyPrice).filter(DailyPrice.stock_code == stock_code)
-            
-            if start_date:
-                query = query.filter(DailyPrice.trade_date >= start_date)
-            if end_date:
-                query = query.filter(DailyPrice.trade_date <= end_date)
-            
-            query = query.order_by(DailyPrice.trade_date)
-            
-            records = query.all()
-            
-            if not records:
-                return pd.DataFrame()
-            
-            data = [{
-                'trade_date': r.trade_date,
-                'open': r.open,
-                'high': r.high,
-                'low': r.low,
-                'close': r.close,
-                'volume': r.volume,
-                'amount': r.amount,
-                'turnover': r.turnover,
-                'pct_change': r.pct_change,
-                'pre_close': r.pre_close
-            } for r in records]
-            
-            df = pd.DataFrame(data)
-            df['trade_date'] = pd.to_datetime(df['trade_date'])
-            df.set_index('trade_date', inplace=True)
-            
-            return df
-        finally:
-            session.close()
+        table = DailyPrice.__table__
+        stmt = select(table.c.trade_date, *(table.c[c] for c in DAILY_PRICE_COLUMNS)).where(
+            table.c.stock_code == stock_code
+        )
+        if start_date:
+            stmt = stmt.where(table.c.trade_date >= start_date)
+        if end_date:
+            stmt = stmt.where(table.c.trade_date <= end_date)
+        stmt = stmt.order_by(table.c.trade_date)
+        
+        # 直接由结果集构建DataFrame，跳过ORM对象与字典列表的中间转换
+        with self.engine.connect() as conn:
+            df = pd.read_sql(
+                stmt, conn,
+                index_col='trade_date',
+                parse_dates=['trade_date'],
+                dtype=_DAILY_PRICE_DTYPES
+            )
+        
+        if df.empty:
+            return pd.DataFrame()
+        df[_DAILY_PRICE_FLOAT_COLUMNS] = df[_DAILY_PRICE_FLOAT_COLUMNS].round(PRICE_DECIMALS)
+        return df
     
     # ==================== 技术指标操作 ====================
     
@@ -254,45 +415,37 @@ class DatabaseManager:
             stock_code: 股票代码
             data: 技术指标DataFrame
         """
+        if data.empty:
+            return
+        
+        trade_dates = pd.to_datetime(data.index).date
+        rows = data.reindex(columns=TECHNICAL_INDICATOR_COLUMNS)
+        rows = rows.astype(object).where(rows.notna(), None).assign(
+            stock_code=stock_code,
+            trade_date=trade_dates
+        ).to_dict('records')
+        
         session = self.get_session()
         try:
-            for idx, row in data.iterrows():
-                trade_date = idx if isinstance(idx, date) else idx.date()
-                
-                existing = session.query(TechnicalIndicator).filter(
-                    TechnicalIndicator.stock_code == stock_code,
-                    TechnicalIndicator.trade_date == trade_date
-                ).first()
-                
-                indicator_data = {
-                    'ma5': row.get('ma5'),
-                    'ma10': row.get('ma10'),
-                    'ma20': row.get('ma20'),
-                    'ma60': row.get('ma60'),
-                    'macd': row.get('macd'),
-                    'macd_signal': row.get('macd_signal'),
-                    'macd_hist': row.get('macd_hist'),
-                    'rsi_6': row.get('rsi_6'),
-                    'rsi_12': row.get('rsi_12'),
-                    'rsi_14': row.get('rsi_14'),
-                    'boll_upper': row.get('boll_upper'),
-                    'boll_middle': row.get('boll_middle'),
-                    'boll_lower': row.get('boll_lower'),
-                    'kdj_k': row.get('kdj_k'),
-                    'kdj_d': row.get('kdj_d'),
-                    'kdj_j': row.get('kdj_j')
-                }
-                
-                if existing:
-                    for key, value in indicator_data.items():
-                        setattr(existing, key, value)
+            # 一次查询已存在记录的主键，拆分为批量更新和批量插入
+            existing = dict(session.query(TechnicalIndicator.trade_date, TechnicalIndicator.id).filter(
+                TechnicalIndicator.stock_code == stock_code,
+                TechnicalIndicator.trade_date.in_(set(trade_dates))
+            ).all())
+            
+            new_rows, update_rows = [], []
+            for row in rows:
+                row_id = existing.get(row['trade_date'])
+                if row_id is None:
+                    new_rows.append(row)
                 else:
-                    indicator = TechnicalIndicator(
-                        stock_code=stock_code,
-                        trade_date=trade_date,
-                        **indicator_data
-                    )
-                    session.add(indicator)
+                    row['id'] = row_id
+                    update_rows.append(row)
+            
+            if new_rows:
+                session.bulk_insert_mappings(TechnicalIndicator, new_rows)
+            if update_rows:
+                session.bulk_update_mappings(TechnicalIndicator, update_rows)
             
             session.commit()
             logger.info(f"保存{stock_code}技术指标 {len(data)}条")
@@ -329,22 +482,48 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def execute_sql(self, sql: str) -> pd.DataFrame:
+    def execute_sql(
+        self,
+        sql: str,
+        chunksize: Optional[int] = None
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         执行原生SQL查询
         
         Args:
             sql: SQL语句
+            chunksize: 分块行数，指定时返回逐块产出DataFrame的迭代器 (服务端游标流式读取)
             
         Returns:
-            查询结果DataFrame
+            查询结果DataFrame (安装pyarrow时为Arrow列类型)，或分块迭代器
         """
+        if chunksize:
+            return self._iter_sql(sql, chunksize)
+        
         try:
-            return pd.read_sql(sql, self.engine)
+            with self.engine.connect() as conn:
+                return pd.read_sql_query(sql, conn, **self._read_sql_kwargs())
         except Exception as e:
             logger.error(f"SQL执行失败: {e}")
             raise
     
+    def _iter_sql(self, sql: str, chunksize: int) -> Iterator[pd.DataFrame]:
+        """分块流式执行SQL查询"""
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True)
+                yield from pd.read_sql_query(
+                    sql, conn, chunksize=chunksize, **self._read_sql_kwargs()
+                )
+        except Exception as e:
+            logger.error(f"SQL执行失败: {e}")
+            raise
+    
+    @staticmethod
+    def _read_sql_kwargs() -> Dict[str, Any]:
+        """read_sql参数: 有pyarrow时直接构建Arrow列，跳过object中间态"""
+        return {'dtype_backend': 'pyarrow'} if PYARROW_AVAILABLE else {}
+    
     def close(self):
         """关闭数据库连接"""
         if self.engine:
@@ -354,11 +533,14 @@ class DatabaseManager:
 
 # 创建全局数据库管理器实例
 db_manager = None
+_db_manager_lock = threading.Lock()
 
 
 def get_db_manager() -> DatabaseManager:
-    """获取数据库管理器实例"""
+    """获取数据库管理器实例 (线程安全，多线程并发首次调用也只创建一个引擎)"""
     global db_manager
     if db_manager is None:
-        db_manager = DatabaseManager()
+        with _db_manager_lock:
+            if db_manager is None:
+                db_manager = DatabaseManager()
     return db_manager
@@ -3,24 +3,260 @@
 AI智能分析服务
 使用Groq API（默认）进行股票综合分析
 """
-from dataclasses import dataclass, field
-from typing import Optional, Dict
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from functools import cached_property, lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Final, Optional, Dict, List, Tuple
 
-# 从配置文件读取Groq设置
+import numpy as np
+
+from src.utils.cache import SemanticCache, TTLCache
+
+# 尝试导入orjson (解析AI回复更快)，不可用时使用标准库json
 try:
-    from config.settings import Settings
-    GROQ_API_KEY = Settings.groq.api_key
-    GROQ_MODEL = Settings.groq.model
-    GROQ_MAX_TOKENS = Settings.groq.max_tokens
+    import orjson
+    ORJSON_AVAILABLE = True
+    _json_loads = orjson.loads
 except ImportError:
-    GROQ_API_KEY = ""
-    GROQ_MODEL = "llama-3.1-8b-instant"
-    GROQ_MAX_TOKENS = 1024
+    ORJSON_AVAILABLE = False
+    _json_loads = json.loads
+
+DEFAULT_GROQ_MODEL = "llama-3.1-8b-instant"
+DEFAULT_GROQ_MAX_TOKENS = 1024
+
+
+@lru_cache(maxsize=None)
+def _get_groq_settings() -> Tuple[str, str, int, bool]:
+    """读取Groq设置 (api_key, model, max_tokens, json_mode)，首次调用时读取一次"""
+    try:
+        from config.settings import Settings
+        return Settings.groq.api_key, Settings.groq.model, Settings.groq.max_tokens, Settings.groq.json_mode
+    except ImportError:
+        return "", DEFAULT_GROQ_MODEL, DEFAULT_GROQ_MAX_TOKENS, True
+
+
+def _json_end(text: str, state: list) -> int:
+    """
+    增量扫描JSON文本，返回顶层对象结束 '}' 在text中的位置，未结束返回-1
+    
+    state为跨片段保存的 [嵌套深度, 是否在字符串内, 是否转义]，初始为 [0, False, False]
+    """
+    depth, in_str, escaped = state
+    for i, ch in enumerate(text):
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                state[:] = [depth, in_str, escaped]
+                return i
+    state[:] = [depth, in_str, escaped]
+    return -1
+
+
+# 分析结果缓存: 相同上下文摘要在有效期内复用AI回复
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 60
+
+# 相似上下文缓存: 同一股票、同样信号组合下，盘面数值小幅波动时复用AI回复
+SEMANTIC_CACHE_SIZE = 1000
+SEMANTIC_CACHE_TTL = 300
+SEMANTIC_THRESHOLD = 0.92
+EMBED_DIM = 512
+
+# 计算上下文向量时忽略的逐笔变化字段 (精确摘要按渲染后的提示词计算，不受此影响)
+_DIGEST_EXCLUDE = ('volume', 'amount', 'bid_volumes', 'ask_volumes')
+
+# 相似匹配只在这些字段完全一致的上下文之间进行 (信号/形态变化必须重新分析)；
+# 价格、涨跌幅、RSI按区间分桶后参与分组，文本向量对数字不敏感，不能只靠相似度区分
+_SEMANTIC_GROUP_FIELDS = ('code', 'signals', 'patterns', 'ma_position', 'macd_signal', 'market_regime', 'user_shares',
+                          'price_bucket', 'change_bucket', 'rsi_bucket')
+
+# 分桶宽度: 价格按1%对数区间，涨跌幅按1个百分点，RSI按10
+PRICE_BUCKET_RATIO = 1.01
+CHANGE_BUCKET_WIDTH = 1.0
+RSI_BUCKET_WIDTH = 10.0
+
+
+def _bucket(value: float, width: float) -> Optional[int]:
+    """数值所在区间编号，非有限值返回None"""
+    if not np.isfinite(value):
+        return None
+    return int(np.floor(value / width))
+
+
+def _embed_text(text: str) -> np.ndarray:
+    """
+    文本向量: 字符二元组哈希到固定维度后归一化
+    
+    无需加载模型，相同文本在进程内得到相同向量
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    if len(codes) < 2:
+        return vec
+    buckets = (codes[:-1] * 1000003 + codes[1:]) % EMBED_DIM
+    vec += np.bincount(buckets, minlength=EMBED_DIM)
+    return vec / np.linalg.norm(vec)
+
+# 旧模型 (未启用JSON模式) 回复中提取JSON的正则
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_BARE_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# 解析以 { 开头、后面带多余文字的回复
+_JSON_DECODER = json.JSONDecoder()
+
+# 流式输出合并: 累计达到字符数或距上次输出超过秒数时才产出一次
+STREAM_FLUSH_CHARS = 64
+STREAM_FLUSH_INTERVAL = 0.05
+
+# 异步并发分析时同时进行的请求数上限
+ASYNC_CONCURRENCY = 4
+
+# 批量分析: 每次请求包含的股票数、并发请求数、单次请求的输出token上限
+BATCH_SIZE = 5
+BATCH_WORKERS = 4
+BATCH_MAX_TOKENS = 8192
+
+# 批量分析时附加在用户消息末尾的输出要求
+_BATCH_TEMPLATE = """以上共{n}只股票，请分别按系统要求的JSON格式给出分析。
+输出一个JSON对象: {{"results": [每只股票的分析对象, ...]}}，results数组共{n}个元素，顺序与上面股票顺序一致。"""
+
+
+# 输出格式要求 (普通字符串常量，不经format填充，无需转义花括号)
+_JSON_SCHEMA_INSTRUCTIONS: Final[str] = """## 请严格按以下JSON格式输出 (只输出JSON，不要其他文字):
+
+```json
+{
+  "verdict": "BUY或SELL或HOLD",
+  "confidence": 0到100的整数,
+  "core_logic": "一句话核心判断理由",
+  "today_action": "今日操作建议",
+  "tomorrow_predict": "明日走势预判",
+  "stop_loss": 止损价格数字,
+  "take_profit": 止盈价格数字,
+  "position_size": "轻仓30%或半仓50%或重仓70%",
+  "risk_warning": "主要风险提示"
+}
+```
+
+要求：verdict必须是BUY/SELL/HOLD之一，stop_loss和take_profit必须是具体数字。"""
+
+# 系统提示词: 角色、交易规则与输出格式，每次请求不变且放在最前，便于服务端前缀缓存
+_SYSTEM_PROMPT: Final[str] = """你是一位专业的A股短线交易员。请分析用户提供的数据并给出建议。
+
+**重要**: A股实行T+1，今天买入明天才能卖出。
+
+""" + _JSON_SCHEMA_INSTRUCTIONS
+
+# 系统消息对象只构建一次，各请求共用
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+
+# 用户消息模板: 只含逐只股票变化的数据 (模块加载时构建一次，调用时format_map填充)
+_USER_TEMPLATE = """## 1. 实时盘面
+- 股票: {name} ({code})
+- 现价: {price:.2f} ({change_pct:+.2f}%)
+- 最高/最低/昨收: {high}/{low}/{pre_close}
+- 成交: {volume_wan:.0f}万手 / {amount_yi:.1f}亿
+- 资金: {fund_flow}
+- 压力: {pressure}
+
+## 2. 技术信号
+- 触发信号: {signals_text}
+- 分时形态: {patterns_text}
+{tech_text}
+- 均线位置: {ma_position}
+- 近期趋势: {recent_trend}
+{hist_text}
+{level_text}
+{position_text}
+{l2_text}
+{news_text}
+{regime_text}"""
 
+_POSITION_TEMPLATE = """
+## 3. 用户持仓
+- 持仓成本: {user_cost:.2f}
+- 持仓数量: {user_shares}股
+- 当前盈亏: {pnl_pct:+.2f}%
+- 状态: {status}
+"""
 
-@dataclass
+_L2_TEMPLATE = """
+## 4. 五档盘口
+- 卖盘挂单: {ask_total}手 (卖1-5)
+- 买盘挂单: {bid_total}手 (买1-5)
+- 买卖比: {ratio:.2f} ({status})
+"""
+
+_NEWS_TEMPLATE = """
+## 5. 近期新闻
+{titles}
+"""
+
+
+class _StreamBuffer:
+    """
+    流式片段缓冲: 累计达到字符数或距上次输出超过间隔时合并产出一次，
+    减少生成器往返和界面重绘次数；JSON模式下顶层对象闭合后标记结束
+    """
+    
+    def __init__(self, json_mode: bool = False):
+        self.json_mode = json_mode
+        self.done = False
+        self.parts = []
+        self._buf = []
+        self._len = 0
+        self._last = time.monotonic()
+        self._json_state = [0, False, False]
+    
+    def push(self, content: Optional[str]) -> Optional[str]:
+        """加入一个片段，需要输出时返回合并后的文本"""
+        if not content:
+            return None
+        if self.json_mode:
+            end = _json_end(content, self._json_state)
+            if end >= 0:
+                self._buf.append(content[:end + 1])
+                self.done = True
+                return self.flush()
+        self._buf.append(content)
+        self._len += len(content)
+        now = time.monotonic()
+        if self._len >= STREAM_FLUSH_CHARS or now - self._last >= STREAM_FLUSH_INTERVAL:
+            self._last = now
+            return self.flush()
+        return None
+    
+    def flush(self) -> Optional[str]:
+        """输出缓冲中剩余的文本"""
+        if not self._buf:
+            return None
+        text = "".join(self._buf)
+        self.parts.append(text)
+        self._buf.clear()
+        self._len = 0
+        return text
+
+
+@dataclass(frozen=True)
 class StockContext:
-    """股票上下文数据"""
+    """股票上下文数据 (构建后只读)"""
     code: str
     name: str
     price: float
@@ -60,43 +296,132 @@ class AIAnalyzer:
     """Groq AI分析器"""
     
     def __init__(self):
-        self.client = None
-        self._init_client()
+        self._tpl = _USER_TEMPLATE
+        self._response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        self._warmup_executor = None
+        self._warmup_lock = threading.Lock()
+        self._semantic_cache = SemanticCache(
+            dim=EMBED_DIM,
+            maxsize=SEMANTIC_CACHE_SIZE,
+            ttl=SEMANTIC_CACHE_TTL,
+            threshold=SEMANTIC_THRESHOLD
+        )
     
-    def _init_client(self):
-        """初始化Groq客户端"""
-        if not GROQ_API_KEY:
+    @cached_property
+    def client(self):
+        """Groq客户端 (首次请求分析时才导入groq并初始化)"""
+        api_key = _get_groq_settings()[0]
+        if not api_key:
             print("警告: 未配置Groq API Key")
-            return
+            return None
             
         try:
             from groq import Groq
-            self.client = Groq(api_key=GROQ_API_KEY)
+            return Groq(api_key=api_key)
         except ImportError:
             print("请安装groq库: pip install groq")
         except Exception as e:
             print(f"Groq初始化失败: {e}")
+        return None
     
-    def analyze(self, context: StockContext) -> str:
-        """对股票进行综合AI分析"""
+    def analyze(self, context: StockContext, json_mode: bool = False) -> str:
+        """
+        对股票进行综合AI分析
+        
+        Args:
+            context: 股票上下文
+            json_mode: 要求服务端以JSON模式输出 (保证返回合法JSON)
+        """
         if not self.client:
             return "⚠️ AI服务未配置，请检查config/settings.py中的Groq API Key"
         
-        prompt = self._build_prompt(context)
+        keys = self._cache_keys(context, json_mode)
+        cached = self._cached_response(keys)
+        if cached is not None:
+            return cached
         
         try:
             response = self.client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=GROQ_MAX_TOKENS
+                messages=self._build_messages(context),
+                **self._request_options(json_mode)
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
             return f"⚠️ AI分析请求失败: {str(e)}"
+        
+        if content:
+            self._cache_response(keys, content)
+        return content
     
-    def analyze_stream(self, context: StockContext):
+    @staticmethod
+    def _request_options(json_mode: bool) -> Dict:
+        """请求参数: 模型、最大token数，JSON模式时附加response_format"""
+        _, model, max_tokens, _ = _get_groq_settings()
+        options = {'model': model, 'max_tokens': max_tokens}
+        if json_mode:
+            options['response_format'] = {"type": "json_object"}
+        return options
+    
+    def _cache_keys(self, ctx: StockContext, json_mode: bool = False) -> Tuple[str, str, np.ndarray]:
+        """
+        计算缓存键 (精确摘要, 相似匹配分组, 上下文向量)
+        
+        精确摘要取渲染后的用户消息，提示词不同的上下文不会共享精确缓存；
+        向量由价格取两位小数、涨跌幅取一位小数、信号/形态排序并忽略成交量等逐笔变化字段的上下文计算，
+        相似匹配分组额外包含价格/涨跌幅/RSI的区间；JSON模式与普通模式的回复分开缓存
         """
-        流式AI分析 - 返回生成器，逐字输出
+        prompt = f"{json_mode}\n{self._build_user_message(ctx)}"
+        digest = hashlib.blake2b(prompt.encode(), digest_size=8).hexdigest()
+        
+        data = asdict(ctx)
+        data['json_mode'] = json_mode
+        for key in _DIGEST_EXCLUDE:
+            data.pop(key, None)
+        data['price'] = round(ctx.price, 2)
+        data['change_pct'] = round(ctx.change_pct, 1)
+        data['signals'] = sorted(ctx.signals)
+        data['patterns'] = sorted(ctx.patterns)
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        
+        data['price_bucket'] = _bucket(np.log(ctx.price) if ctx.price > 0 else np.nan, np.log(PRICE_BUCKET_RATIO))
+        data['change_bucket'] = _bucket(ctx.change_pct, CHANGE_BUCKET_WIDTH)
+        data['rsi_bucket'] = _bucket(ctx.rsi_value, RSI_BUCKET_WIDTH)
+        group_raw = json.dumps([data[k] for k in _SEMANTIC_GROUP_FIELDS + ('json_mode',)], ensure_ascii=False, default=str)
+        group = hashlib.blake2b(group_raw.encode(), digest_size=8).hexdigest()
+        return digest, group, _embed_text(raw)
+    
+    def _cached_response(self, keys: Tuple[str, str, np.ndarray]) -> Optional[str]:
+        """先查精确缓存，未命中再查相似上下文缓存"""
+        digest, group, vector = keys
+        cached = self._response_cache.get(digest)
+        if cached is None:
+            cached = self._semantic_cache.get(group, vector)
+        return cached
+    
+    def _cache_response(self, keys: Tuple[str, str, np.ndarray], content: str):
+        """写入两级缓存"""
+        digest, group, vector = keys
+        self._response_cache.set(digest, content)
+        self._semantic_cache.set(group, vector, content)
+    
+    def stats(self) -> Dict:
+        """缓存命中统计 (精确/相似两级及总命中率)"""
+        exact = self._response_cache.stats()
+        semantic = self._semantic_cache.stats()
+        total = exact['hits'] + exact['misses']
+        hits = exact['hits'] + semantic['hits']
+        return {
+            'exact': exact,
+            'semantic': semantic,
+            'requests': total,
+            'hit_rate': hits / total if total else 0.0
+        }
+    
+    def analyze_stream(self, context: StockContext, structured: bool = False):
+        """
+        流式AI分析 - 返回生成器，按小段(约64字符或50ms)批量输出
+        
+        structured=True 且启用JSON模式时，顶层JSON对象闭合后立即结束，不再读取后续片段
         
         用法 (Streamlit):
             for chunk in ai_analyzer.analyze_stream(context):
@@ -106,64 +431,187 @@ class AIAnalyzer:
             yield "⚠️ AI服务未配置"
             return
         
-        prompt = self._build_prompt(context)
+        json_mode = structured and _get_groq_settings()[3]
+        keys = self._cache_keys(context, json_mode)
+        cached = self._cached_response(keys)
+        if cached is not None:
+            yield cached
+            return
         
+        buffer = _StreamBuffer(json_mode)
         try:
             stream = self.client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=GROQ_MAX_TOKENS,
-                stream=True  # 启用流式输出
+                messages=self._build_messages(context),
+                stream=True,  # 启用流式输出
+                **self._request_options(json_mode)
             )
             
             for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+                text = buffer.push(chunk.choices[0].delta.content)
+                if text:
+                    yield text
+                if buffer.done:
+                    close = getattr(stream, 'close', None)
+                    if close:
+                        close()
+                    break
+            text = buffer.flush()
+            if text:
+                yield text
+            
+            # 完整输出后才写入缓存
+            if buffer.parts:
+                self._cache_response(keys, "".join(buffer.parts))
                     
         except Exception as e:
             yield f"⚠️ AI分析请求失败: {str(e)}"
     
-    def _build_prompt(self, ctx: StockContext) -> str:
-        """构建分析提示词"""
+    @cached_property
+    def async_client(self):
+        """Groq异步客户端 (首次异步分析时才初始化)"""
+        api_key = _get_groq_settings()[0]
+        if not api_key:
+            print("警告: 未配置Groq API Key")
+            return None
+        
+        try:
+            from groq import AsyncGroq
+            return AsyncGroq(api_key=api_key)
+        except ImportError:
+            print("请安装groq库: pip install groq")
+        except Exception as e:
+            print(f"Groq初始化失败: {e}")
+        return None
+    
+    async def aanalyze(self, context: StockContext, json_mode: bool = False) -> str:
+        """异步综合AI分析 (与analyze共用缓存)"""
+        if not self.async_client:
+            return "⚠️ AI服务未配置，请检查config/settings.py中的Groq API Key"
+        
+        keys = self._cache_keys(context, json_mode)
+        cached = self._cached_response(keys)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                messages=self._build_messages(context),
+                **self._request_options(json_mode)
+            )
+            content = response.choices[0].message.content
+        except Exception as e:
+            return f"⚠️ AI分析请求失败: {str(e)}"
+        
+        if content:
+            self._cache_response(keys, content)
+        return content
+    
+    async def aanalyze_stream(self, context: StockContext, structured: bool = False):
+        """
+        异步流式AI分析 - 多只股票可在同一事件循环中同时流式输出
+        
+        用法:
+            async for chunk in ai_analyzer.aanalyze_stream(context):
+                ...
+        """
+        if not self.async_client:
+            yield "⚠️ AI服务未配置"
+            return
+        
+        json_mode = structured and _get_groq_settings()[3]
+        keys = self._cache_keys(context, json_mode)
+        cached = self._cached_response(keys)
+        if cached is not None:
+            yield cached
+            return
+        
+        buffer = _StreamBuffer(json_mode)
+        try:
+            stream = await self.async_client.chat.completions.create(
+                messages=self._build_messages(context),
+                stream=True,
+                **self._request_options(json_mode)
+            )
+            
+            async for chunk in stream:
+                text = buffer.push(chunk.choices[0].delta.content)
+                if text:
+                    yield text
+                if buffer.done:
+                    close = getattr(stream, 'close', None)
+                    if close:
+                        await close()
+                    break
+            text = buffer.flush()
+            if text:
+                yield text
+            
+            if buffer.parts:
+                self._cache_response(keys, "".join(buffer.parts))
+        
+        except Exception as e:
+            yield f"⚠️ AI分析请求失败: {str(e)}"
+    
+    async def aanalyze_many(self, contexts: List[StockContext], concurrency: int = ASYNC_CONCURRENCY) -> List[str]:
+        """
+        异步并发分析多只股票，按输入顺序返回
+        
+        Args:
+            contexts: 股票上下文列表
+            concurrency: 同时进行的请求数上限
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(ctx):
+            async with semaphore:
+                return await self.aanalyze(ctx)
+        
+        return await asyncio.gather(*(run(ctx) for ctx in contexts))
+    
+    def _build_messages(self, ctx: StockContext) -> list:
+        """构建对话消息: 固定的系统提示词在前，逐只股票的数据在后"""
+        return [
+            _SYSTEM_MESSAGE,
+            {"role": "user", "content": self._build_user_message(ctx)}
+        ]
+    
+    def _build_user_message(self, ctx: StockContext) -> str:
+        """构建用户消息 (分析数据部分)"""
         signals_text = "、".join(ctx.signals) if ctx.signals else "无"
         patterns_text = "、".join(ctx.patterns) if ctx.patterns else "无"
         
         # 格式化技术指标
-        tech_text = ""
-        if ctx.indicators:
-            tech_lines = [f"- {k}: {v}" for k, v in ctx.indicators.items()]
-            tech_text = "\n".join(tech_lines)
+        tech_text = "\n".join([f"- {k}: {v}" for k, v in ctx.indicators.items()]) if ctx.indicators else ""
         
         # 构建历史数据部分
-        hist_text = ""
+        hist_parts = []
         if ctx.historical_summary:
-            hist_text = f"- 历史趋势: {ctx.historical_summary}"
+            hist_parts.append(f"- 历史趋势: {ctx.historical_summary}")
         if ctx.macd_signal:
-            hist_text += f"\n- MACD: {ctx.macd_signal}"
+            hist_parts.append(f"\n- MACD: {ctx.macd_signal}")
         if ctx.rsi_value != 50.0:
             rsi_status = "超买" if ctx.rsi_value > 70 else "超卖" if ctx.rsi_value < 30 else "中性"
-            hist_text += f"\n- RSI(14): {ctx.rsi_value:.1f} ({rsi_status})"
+            hist_parts.append(f"\n- RSI(14): {ctx.rsi_value:.1f} ({rsi_status})")
         if ctx.volume_ratio != 1.0:
-            hist_text += f"\n- 量比: {ctx.volume_ratio:.2f}"
+            hist_parts.append(f"\n- 量比: {ctx.volume_ratio:.2f}")
         
         # 支撑压力位
-        level_text = ""
+        level_parts = []
         if ctx.support_level > 0:
-            level_text = f"\n- 支撑位: {ctx.support_level:.2f}"
+            level_parts.append(f"\n- 支撑位: {ctx.support_level:.2f}")
         if ctx.resistance_level > 0:
-            level_text += f"\n- 压力位: {ctx.resistance_level:.2f}"
+            level_parts.append(f"\n- 压力位: {ctx.resistance_level:.2f}")
         
         # 用户持仓信息
         position_text = ""
         if ctx.user_cost > 0:
             pnl_pct = (ctx.price / ctx.user_cost - 1) * 100
-            position_text = f"""
-## 3. 用户持仓
-- 持仓成本: {ctx.user_cost:.2f}
-- 持仓数量: {ctx.user_shares}股
-- 当前盈亏: {pnl_pct:+.2f}%
-- 状态: {'盈利中' if pnl_pct > 0 else '亏损中' if pnl_pct < 0 else '持平'}
-"""
+            position_text = _POSITION_TEMPLATE.format(
+                user_cost=ctx.user_cost,
+                user_shares=ctx.user_shares,
+                pnl_pct=pnl_pct,
+                status='盈利中' if pnl_pct > 0 else '亏损中' if pnl_pct < 0 else '持平'
+            )
         
         # 盘口数据
         l2_text = ""
@@ -171,95 +619,85 @@ class AIAnalyzer:
             bid_total = sum(ctx.bid_volumes)
             ask_total = sum(ctx.ask_volumes)
             ratio = bid_total / ask_total if ask_total > 0 else 1
-            l2_text = f"""
-## 4. 五档盘口
-- 卖盘挂单: {ask_total}手 (卖1-5)
-- 买盘挂单: {bid_total}手 (买1-5)
-- 买卖比: {ratio:.2f} ({'买盘强' if ratio > 1.2 else '卖盘强' if ratio < 0.8 else '均衡'})
-"""
+            l2_text = _L2_TEMPLATE.format(
+                ask_total=ask_total,
+                bid_total=bid_total,
+                ratio=ratio,
+                status='买盘强' if ratio > 1.2 else '卖盘强' if ratio < 0.8 else '均衡'
+            )
         
-        # 新闻标题
+        # 新闻标题 (最多3条)
         news_text = ""
         if ctx.news_titles:
-            titles = ctx.news_titles[:3]  # 最多3条
-            news_text = f"""
-## 5. 近期新闻
-{chr(10).join(['- ' + t for t in titles])}
-"""
+            news_text = _NEWS_TEMPLATE.format(titles="\n".join(['- ' + t for t in ctx.news_titles[:3]]))
         
         # 市场状态
         regime_text = f"\n## 6. 市场环境: {ctx.market_regime}" if ctx.market_regime != "中性" else ""
         
-        prompt = f"""你是一位专业的A股短线交易员。请分析以下数据并给出建议。
-
-**重要**: A股实行T+1，今天买入明天才能卖出。
-
-## 1. 实时盘面
-- 股票: {ctx.name} ({ctx.code})
-- 现价: {ctx.price:.2f} ({ctx.change_pct:+.2f}%)
-- 最高/最低/昨收: {ctx.high}/{ctx.low}/{ctx.pre_close}
-- 成交: {(ctx.volume/10000):.0f}万手 / {(ctx.amount/100000000):.1f}亿
-- 资金: {ctx.fund_flow}
-- 压力: {ctx.pressure}
-
-## 2. 技术信号
-- 触发信号: {signals_text}
-- 分时形态: {patterns_text}
-{tech_text}
-- 均线位置: {ctx.ma_position}
-- 近期趋势: {ctx.recent_trend}
-{hist_text}
-{level_text}
-{position_text}
-{l2_text}
-{news_text}
-{regime_text}
-
-## 请严格按以下JSON格式输出 (只输出JSON，不要其他文字):
-
-```json
-{{
-  "verdict": "BUY或SELL或HOLD",
-  "confidence": 0到100的整数,
-  "core_logic": "一句话核心判断理由",
-  "today_action": "今日操作建议",
-  "tomorrow_predict": "明日走势预判",
-  "stop_loss": 止损价格数字,
-  "take_profit": 止盈价格数字,
-  "position_size": "轻仓30%或半仓50%或重仓70%",
-  "risk_warning": "主要风险提示"
-}}
-```
-
-要求：verdict必须是BUY/SELL/HOLD之一，stop_loss和take_profit必须是具体数字。"""
-        
-        return prompt
+        return self._tpl.format_map({
+            'name': ctx.name,
+            'code': ctx.code,
+            'price': ctx.price,
+            'change_pct': ctx.change_pct,
+            'high': ctx.high,
+            'low': ctx.low,
+            'pre_close': ctx.pre_close,
+            'volume_wan': ctx.volume / 10000,
+            'amount_yi': ctx.amount / 100000000,
+            'fund_flow': ctx.fund_flow,
+            'pressure': ctx.pressure,
+            'signals_text': signals_text,
+            'patterns_text': patterns_text,
+            'tech_text': tech_text,
+            'ma_position': ctx.ma_position,
+            'recent_trend': ctx.recent_trend,
+            'hist_text': "".join(hist_parts),
+            'level_text': "".join(level_parts),
+            'position_text': position_text,
+            'l2_text': l2_text,
+            'news_text': news_text,
+            'regime_text': regime_text
+        })
     
-    def parse_ai_response(self, response: str) -> dict:
-        """解析AI的JSON响应"""
-        import json
-        import re
+    def parse_ai_response(self, response: str, json_mode: bool = False) -> dict:
+        """
+        解析AI的JSON响应
         
+        JSON模式下回复保证为合法JSON，只解析一次；非JSON模式请求的回复回退为正则提取
+        
+        Args:
+            response: AI回复文本
+            json_mode: 该回复对应的请求是否以JSON模式发出
+        """
         try:
-            return json.loads(response)
-        except json.JSONDecodeError:
+            return _json_loads(response)
+        except (TypeError, ValueError):
             pass
         
-        # 尝试提取JSON块
-        json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-        if json_match:
+        text = response.lstrip() if response else ""
+        if text.startswith('{'):
+            # 以对象开头时直接解析首个对象，忽略其后的多余文字，无需正则
             try:
-                return json.loads(json_match.group(1))
-            except json.JSONDecodeError:
+                return _JSON_DECODER.raw_decode(text)[0]
+            except ValueError:
                 pass
         
-        # 尝试找到 { 开头的JSON
-        json_match = re.search(r'\{.*\}', response, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group(0))
-            except json.JSONDecodeError:
-                pass
+        if text and not json_mode:
+            # 尝试提取JSON块
+            json_match = _JSON_BLOCK_RE.search(text)
+            if json_match:
+                try:
+                    return _json_loads(json_match.group(1))
+                except ValueError:
+                    pass
+            
+            # 尝试找到 { 开头的JSON
+            json_match = _JSON_BARE_RE.search(text)
+            if json_match:
+                try:
+                    return _json_loads(json_match.group(0))
+                except ValueError:
+                    pass
         
         # 解析失败，返回默认结构
         return {
@@ -277,8 +715,96 @@ class AIAnalyzer:
     
     def analyze_structured(self, context: StockContext) -> dict:
         """结构化分析 - 返回解析后的dict"""
-        raw_response = self.analyze(context)
-        return self.parse_ai_response(raw_response)
+        json_mode = _get_groq_settings()[3]
+        raw_response = self.analyze(context, json_mode=json_mode)
+        return self.parse_ai_response(raw_response, json_mode)
+    
+    def analyze_batch(self, contexts: List[StockContext], batch_size: int = BATCH_SIZE) -> List[dict]:
+        """
+        批量结构化分析 - 多只股票合并为一次请求，按输入顺序返回解析后的dict
+        
+        已缓存的股票不再请求；批量结果缺失或格式不符的股票单独重新分析
+        
+        Args:
+            contexts: 股票上下文列表
+            batch_size: 每次请求包含的股票数
+        """
+        json_mode = _get_groq_settings()[3]
+        if not self.client or not json_mode:
+            return [self.analyze_structured(ctx) for ctx in contexts]
+        
+        results: List[Optional[dict]] = [None] * len(contexts)
+        keys = [self._cache_keys(ctx, True) for ctx in contexts]
+        pending = []
+        for i, k in enumerate(keys):
+            cached = self._cached_response(k)
+            if cached is not None:
+                results[i] = self.parse_ai_response(cached, True)
+            else:
+                pending.append(i)
+        
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(batches))) as executor:
+                outputs = list(executor.map(
+                    lambda idx: self._request_batch([contexts[i] for i in idx]), batches
+                ))
+            for idx, items in zip(batches, outputs):
+                for i, item in zip(idx, items):
+                    if item is not None:
+                        self._cache_response(keys[i], json.dumps(item, ensure_ascii=False))
+                        results[i] = item
+        
+        # 批量结果缺失的股票单独分析
+        for i, item in enumerate(results):
+            if item is None:
+                results[i] = self.analyze_structured(contexts[i])
+        return results
+    
+    def warmup(self, contexts: List[StockContext], structured: bool = True) -> Future:
+        """
+        后台预先分析股票并写入缓存，之后对同样或相近上下文的分析直接命中缓存
+        
+        Args:
+            contexts: 股票上下文列表
+            structured: True时预热结构化分析 (analyze_batch)，
+                        False时预热文本分析 (与analyze/analyze_stream默认参数共用缓存)
+        
+        Returns:
+            预热任务的Future，结果为analyze_batch或逐只analyze的返回值
+        """
+        contexts = list(contexts)
+        with self._warmup_lock:
+            if self._warmup_executor is None:
+                self._warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai-warmup')
+        if structured:
+            return self._warmup_executor.submit(self.analyze_batch, contexts)
+        return self._warmup_executor.submit(lambda: [self.analyze(ctx) for ctx in contexts])
+    
+    def _request_batch(self, contexts: List[StockContext]) -> List[Optional[dict]]:
+        """一次请求分析多只股票，返回与输入对应的结果 (失败的位置为None)"""
+        blocks = [f"# 股票{i + 1}\n{self._build_user_message(ctx)}" for i, ctx in enumerate(contexts)]
+        blocks.append(_BATCH_TEMPLATE.format(n=len(contexts)))
+        
+        options = self._request_options(True)
+        options['max_tokens'] = min(options['max_tokens'] * len(contexts), BATCH_MAX_TOKENS)
+        try:
+            response = self.client.chat.completions.create(
+                messages=[
+                    _SYSTEM_MESSAGE,
+                    {"role": "user", "content": "\n\n".join(blocks)}
+                ],
+                **options
+            )
+            data = _json_loads(response.choices[0].message.content)
+        except Exception as e:
+            print(f"AI批量分析失败: {e}")
+            return [None] * len(contexts)
+        
+        items = data.get('results') if isinstance(data, dict) else data
+        if not isinstance(items, list) or len(items) != len(contexts):
+            return [None] * len(contexts)
+        return [item if isinstance(item, dict) else None for item in items]
 
 
 # 全局实例
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+回测撮合循环的Cython实现 (未安装numba时使用)
+
+与 backtest_engine._run_core 逻辑和返回值完全一致。编译:
+    cythonize -i src/strategy/backtesting/_backtest_c.pyx
+"""
+
+import numpy as np
+
+
+def run_core(const double[::1] closes, const double[::1] signals, double initial_capital,
+             double commission_rate, double slippage, long min_trade_unit):
+    """
+    逐bar撮合的状态机: 信号1且空仓时买入，信号-1且持仓时卖出
+
+    Returns:
+        (权益数组, 成交bar下标, 方向, 成交价, 股数, 成交额, 手续费, 盈亏, 成交笔数,
+         期末资金, 期末持仓, 持仓成本)
+    """
+    cdef Py_ssize_t n = closes.shape[0]
+    cdef Py_ssize_t i
+    cdef Py_ssize_t n_trades = 0
+    cdef double capital = initial_capital
+    cdef long position = 0
+    cdef long shares
+    cdef double holding_price = 0.0
+    cdef double price, signal, actual_price, cost, revenue, commission, profit
+
+    equities_arr = np.empty(n, np.float64)
+    trade_idx_arr = np.empty(n, np.int64)
+    trade_types_arr = np.empty(n, np.int8)
+    trade_prices_arr = np.empty(n, np.float64)
+    trade_shares_arr = np.empty(n, np.int64)
+    trade_amounts_arr = np.empty(n, np.float64)
+    trade_commissions_arr = np.empty(n, np.float64)
+    trade_profits_arr = np.zeros(n, np.float64)
+
+    cdef double[::1] equities = equities_arr
+    cdef long long[::1] trade_idx = trade_idx_arr
+    cdef signed char[::1] trade_types = trade_types_arr
+    cdef double[::1] trade_prices = trade_prices_arr
+    cdef long long[::1] trade_shares = trade_shares_arr
+    cdef double[::1] trade_amounts = trade_amounts_arr
+    cdef double[::1] trade_commissions = trade_commissions_arr
+    cdef double[::1] trade_profits = trade_profits_arr
+
+    for i in range(n):
+        price = closes[i]
+        signal = signals[i]
+
+        # 记录持仓市值
+        equities[i] = capital + position * price
+
+        if signal == 1 and position == 0:  # 买入
+            actual_price = price * (1 + slippage)
+            shares = <long>(capital * 0.95 / actual_price / min_trade_unit) * min_trade_unit
+            if shares > 0:
+                cost = shares * actual_price
+                commission = cost * commission_rate
+                capital -= (cost + commission)
+                position = shares
+                holding_price = actual_price
+
+                trade_idx[n_trades] = i
+                trade_types[n_trades] = 1
+                trade_prices[n_trades] = actual_price
+                trade_shares[n_trades] = shares
+                trade_amounts[n_trades] = cost
+                trade_commissions[n_trades] = commission
+                n_trades += 1
+        elif signal == -1 and position > 0:  # 卖出
+            actual_price = price * (1 - slippage)
+            revenue = position * actual_price
+            commission = revenue * commission_rate
+            profit = revenue - position * holding_price - commission
+            capital += (revenue - commission)
+
+            trade_idx[n_trades] = i
+            trade_types[n_trades] = -1
+            trade_prices[n_trades] = actual_price
+            trade_shares[n_trades] = position
+            trade_amounts[n_trades] = revenue
+            trade_commissions[n_trades] = commission
+            trade_profits[n_trades] = profit
+            n_trades += 1
+
+            position = 0
+            holding_price = 0.0
+
+    return (equities_arr, trade_idx_arr, trade_types_arr, trade_prices_arr, trade_shares_arr,
+            trade_amounts_arr, trade_commissions_arr, trade_profits_arr, n_trades,
+            capital, position, holding_price)
@@ -15,10 +15,110 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirna
 
 from config.settings import settings
 from src.utils.logger import get_logger
-from src.utils.helpers import calculate_sharpe_ratio, calculate_max_drawdown
+from src.utils.jit import njit, prange, NUMBA_AVAILABLE
 
 logger = get_logger(__name__)
 
+# 交易方向编码
+TRADE_BUY = 1
+TRADE_SELL = -1
+
+
+@njit(cache=True)
+def _run_core(closes, signals, initial_capital, commission_rate, slippage, min_trade_unit):
+    """
+    逐bar撮合的状态机: 信号1且空仓时买入，信号-1且持仓时卖出
+    
+    Returns:
+        (权益数组, 成交bar下标, 方向, 成交价, 股数, 成交额, 手续费, 盈亏, 成交笔数,
+         期末资金, 期末持仓, 持仓成本)
+    """
+    n = len(closes)
+    equities = np.empty(n, np.float64)
+    trade_idx = np.empty(n, np.int64)
+    trade_types = np.empty(n, np.int8)
+    trade_prices = np.empty(n, np.float64)
+    trade_shares = np.empty(n, np.int64)
+    trade_amounts = np.empty(n, np.float64)
+    trade_commissions = np.empty(n, np.float64)
+    trade_profits = np.zeros(n, np.float64)
+    n_trades = 0
+    
+    capital = initial_capital
+    position = 0
+    holding_price = 0.0
+    
+    for i in range(n):
+        price = closes[i]
+        signal = signals[i]
+        
+        # 记录持仓市值
+        equities[i] = capital + position * price
+        
+        if signal == 1 and position == 0:  # 买入
+            actual_price = price * (1 + slippage)
+            shares = int(capital * 0.95 / actual_price / min_trade_unit) * min_trade_unit
+            if shares > 0:
+                cost = shares * actual_price
+                commission = cost * commission_rate
+                capital -= (cost + commission)
+                position = shares
+                holding_price = actual_price
+                
+                trade_idx[n_trades] = i
+                trade_types[n_trades] = 1
+                trade_prices[n_trades] = actual_price
+                trade_shares[n_trades] = shares
+                trade_amounts[n_trades] = cost
+                trade_commissions[n_trades] = commission
+                n_trades += 1
+        elif signal == -1 and position > 0:  # 卖出
+            actual_price = price * (1 - slippage)
+            revenue = position * actual_price
+            commission = revenue * commission_rate
+            profit = revenue - position * holding_price - commission
+            capital += (revenue - commission)
+            
+            trade_idx[n_trades] = i
+            trade_types[n_trades] = -1
+            trade_prices[n_trades] = actual_price
+            trade_shares[n_trades] = position
+            trade_amounts[n_trades] = revenue
+            trade_commissions[n_trades] = commission
+            trade_profits[n_trades] = profit
+            n_trades += 1
+            
+            position = 0
+            holding_price = 0.0
+    
+    return (equities, trade_idx, trade_types, trade_prices, trade_shares, trade_amounts,
+            trade_commissions, trade_profits, n_trades, capital, position, holding_price)
+
+
+# 撮合循环实现: numba JIT > Cython扩展 (_backtest_c.pyx，需先编译) > 纯Python
+if NUMBA_AVAILABLE:
+    _run_backtest = _run_core
+    BACKTEST_BACKEND = 'numba'
+else:
+    try:
+        from src.strategy.backtesting._backtest_c import run_core as _run_backtest
+        BACKTEST_BACKEND = 'cython'
+    except ImportError:
+        _run_backtest = _run_core
+        BACKTEST_BACKEND = 'python'
+
+
+@njit(cache=True, parallel=True)
+def _sweep_core(closes, signal_sets, initial_capital, commission_rate, slippage, min_trade_unit):
+    """多组信号并行回测，返回每组的期末权益 (与run的final_capital口径一致，取最后一根K线的权益)"""
+    m = signal_sets.shape[0]
+    n = len(closes)
+    finals = np.empty(m, np.float64)
+    for k in prange(m):
+        result = _run_core(closes, signal_sets[k], initial_capital, commission_rate, slippage, min_trade_unit)
+        finals[k] = result[0][n - 1] if n > 0 else initial_capital
+    return finals
+
 
 class BacktestEngine:
     """回测引擎"""
@@ -58,87 +158,125 @@ class BacktestEngine:
         if 'signal' not in df.columns:
             raise ValueError("DataFrame必须包含signal列")
         
-        for idx in range(len(df)):
-            row = df.iloc[idx]
-            date = df.index[idx] if isinstance(df.index[idx], (datetime, pd.Timestamp)) else row.get('trade_date')
-            price = row['close']
-            signal = row['signal']
-            
-            # 记录持仓市值
-            equity = self.capital + self.position * price
-            self.equity_curve.append({'date': date, 'equity': equity, 'price': price})
-            
-            # 执行交易
-            if signal == 1 and self.position == 0:  # 买入
-                self._buy(date, price)
-            elif signal == -1 and self.position > 0:  # 卖出
-                self._sell(date, price)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        signals = df['signal'].to_numpy(dtype=np.float64)
+        dates = self._bar_dates(df)
+        
+        (equities, trade_idx, trade_types, trade_prices, trade_shares, trade_amounts,
+         trade_commissions, trade_profits, n_trades,
+         self.capital, self.position, self.holding_price) = _run_backtest(
+            closes, signals, float(self.initial_capital), float(self.commission_rate),
+            float(self.slippage), int(self.min_trade_unit)
+        )
+        
+        # 成交记录稀疏，循环结束后一次性还原为字典列表
+        for k in range(n_trades):
+            date = dates[trade_idx[k]]
+            trade = {
+                'date': date, 'type': 'BUY' if trade_types[k] == TRADE_BUY else 'SELL',
+                'price': float(trade_prices[k]), 'shares': int(trade_shares[k]),
+                'amount': float(trade_amounts[k]), 'commission': float(trade_commissions[k])
+            }
+            if trade_types[k] == TRADE_SELL:
+                trade['profit'] = float(trade_profits[k])
+                logger.debug(f"卖出: {date} {trade['shares']}股 @ {trade['price']:.2f} 盈亏:{trade['profit']:.2f}")
+            else:
+                logger.debug(f"买入: {date} {trade['shares']}股 @ {trade['price']:.2f}")
+            self.trades.append(trade)
+        
+        self.equity_curve = [
+            {'date': d, 'equity': e, 'price': p}
+            for d, e, p in zip(dates, equities.tolist(), closes.tolist())
+        ]
         
         # 计算回测结果
-        return self._calculate_results(df, strategy_name)
+        return self._calculate_results(df, strategy_name, equities)
     
-    def _buy(self, date, price):
-        """买入"""
-        actual_price = price * (1 + self.slippage)
-        shares = int(self.capital * 0.95 / actual_price / self.min_trade_unit) * self.min_trade_unit
-        
-        if shares > 0:
-            cost = shares * actual_price
-            commission = cost * self.commission_rate
-            
-            self.capital -= (cost + commission)
-            self.position = shares
-            self.holding_price = actual_price
+    def run_sweep(self, df: pd.DataFrame, signal_sets: np.ndarray) -> np.ndarray:
+        """
+        同一行情下批量回测多组信号 (参数寻优用，只返回期末权益)
+        
+        Args:
+            df: 包含close列的DataFrame
+            signal_sets: 形状为 (组数, len(df)) 的信号矩阵
             
-            self.trades.append({
-                'date': date, 'type': 'BUY', 'price': actual_price,
-                'shares': shares, 'amount': cost, 'commission': commission
-            })
-            logger.debug(f"买入: {date} {shares}股 @ {actual_price:.2f}")
-    
-    def _sell(self, date, price):
-        """卖出"""
-        actual_price = price * (1 - self.slippage)
-        revenue = self.position * actual_price
-        commission = revenue * self.commission_rate
-        profit = revenue - self.position * self.holding_price - commission
+        Returns:
+            每组信号的期末权益
+        """
+        closes = df['close'].to_numpy(dtype=np.float64)
+        signal_sets = np.ascontiguousarray(signal_sets, dtype=np.float64)
+        if signal_sets.ndim != 2 or signal_sets.shape[1] != len(closes):
+            raise ValueError("signal_sets形状必须为 (组数, len(df))")
         
-        self.capital += (revenue - commission)
+        return _sweep_core(
+            closes, signal_sets, float(self.initial_capital), float(self.commission_rate),
+            float(self.slippage), int(self.min_trade_unit)
+        )
+    
+    @staticmethod
+    def _max_drawdown(equities: np.ndarray) -> float:
+        """最大回撤 (正数)，忽略缺失值"""
+        equities = equities[~np.isnan(equities)]
+        if len(equities) < 2:
+            return 0
+        running_max = np.maximum.accumulate(equities)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(running_max != 0, (equities - running_max) / running_max, 0.0)
+        drawdown[~np.isfinite(drawdown)] = 0.0
+        return abs(float(drawdown.min()))
+    
+    @staticmethod
+    def _sharpe_ratio(equities: np.ndarray, risk_free_rate: float = 0.03, periods_per_year: int = 252) -> float:
+        """逐bar收益率的年化夏普比率，口径同 calculate_sharpe_ratio"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(equities) / equities[:-1]
+        returns = returns[~np.isnan(returns)]
+        if len(returns) < 2:
+            return 0.0
         
-        self.trades.append({
-            'date': date, 'type': 'SELL', 'price': actual_price,
-            'shares': self.position, 'amount': revenue, 'commission': commission, 'profit': profit
-        })
-        logger.debug(f"卖出: {date} {self.position}股 @ {actual_price:.2f} 盈亏:{profit:.2f}")
+        excess = returns - risk_free_rate / periods_per_year
+        std = excess.std(ddof=1)
+        if std == 0 or np.isnan(std):
+            return 0.0
+        return float(np.sqrt(periods_per_year) * excess.mean() / std)
+    
+    @staticmethod
+    def _bar_dates(df: pd.DataFrame) -> list:
+        """每根K线的日期: 优先取日期索引，否则取trade_date列"""
+        if isinstance(df.index, pd.DatetimeIndex):
+            return df.index.tolist()
         
-        self.position = 0
-        self.holding_price = 0
+        fallback = df['trade_date'].tolist() if 'trade_date' in df.columns else [None] * len(df)
+        return [
+            d if isinstance(d, (datetime, pd.Timestamp)) else f
+            for d, f in zip(df.index.tolist(), fallback)
+        ]
     
-    def _calculate_results(self, df: pd.DataFrame, strategy_name: str) -> Dict[str, Any]:
-        """计算回测结果"""
-        equity_df = pd.DataFrame(self.equity_curve)
+    def _calculate_results(self, df: pd.DataFrame, strategy_name: str, equities: np.ndarray) -> Dict[str, Any]:
+        """
+        计算回测结果 (直接基于权益数组，不构建中间DataFrame)
         
-        if equity_df.empty:
+        Args:
+            df: 回测数据
+            strategy_name: 策略名称
+            equities: 逐bar权益数组
+        """
+        if len(equities) == 0:
             return {'error': '回测数据不足'}
         
-        final_equity = equity_df['equity'].iloc[-1]
+        final_equity = float(equities[-1])
         total_return = (final_equity - self.initial_capital) / self.initial_capital
         
-        # 计算收益率序列
-        equity_df['returns'] = equity_df['equity'].pct_change()
-        
         # 年化收益率
-        days = len(equity_df)
+        days = len(equities)
         annualized_return = (1 + total_return) ** (252 / days) - 1 if days > 0 else 0
         
         # 最大回撤
-        dd_result = calculate_max_drawdown(equity_df['equity'])
-        max_drawdown = dd_result['max_drawdown']
+        max_drawdown = self._max_drawdown(equities)
         
         # 夏普比率 - 只有在有实际交易时才有意义
-        returns = equity_df['returns'].dropna()
-        if len(self.trades) > 0 and len(returns) > 1:
-            sharpe = calculate_sharpe_ratio(returns)
+        if len(self.trades) > 0 and len(equities) > 2:
+            sharpe = self._sharpe_ratio(equities)
         else:
             sharpe = 0.0
         
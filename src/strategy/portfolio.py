@@ -3,6 +3,7 @@
 投资组合管理模块
 """
 
+import hashlib
 from typing import List, Dict, Any
 import pandas as pd
 import numpy as np
@@ -11,51 +12,80 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from src.utils.cache import TTLCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 权重优化结果缓存: 按收益率数据指纹复用 (同一输入结果不变，不设过期)
+_WEIGHTS_CACHE = TTLCache(maxsize=16, ttl=float('inf'))
+
+# 最小方差求解时加在协方差对角线上的正则项
+_MIN_VAR_RIDGE = 1e-8
+
 
 class Portfolio:
     """投资组合管理"""
     
     def __init__(self, total_capital: float = 1000000):
         self.total_capital = total_capital
-        self.holdings = {}  # {stock_code: {'shares': n, 'cost': price}}
+        # 持仓按列存储: 代码列表 + 股数/成本数组，{代码: 下标} 定位
+        self._codes: List[str] = []
+        self._idx: Dict[str, int] = {}
+        self._shares = np.zeros(0, dtype=np.int64)
+        self._costs = np.zeros(0, dtype=np.float64)
+    
+    @property
+    def holdings(self) -> Dict[str, Dict[str, float]]:
+        """持仓快照 {stock_code: {'shares': n, 'cost': price}}"""
+        return {
+            code: {'shares': shares, 'cost': cost}
+            for code, shares, cost in zip(self._codes, self._shares.tolist(), self._costs.tolist())
+        }
     
     def add_position(self, code: str, shares: int, price: float):
         """添加持仓"""
-        if code in self.holdings:
-            old = self.holdings[code]
-            total_shares = old['shares'] + shares
-            avg_cost = (old['shares'] * old['cost'] + shares * price) / total_shares
-            self.holdings[code] = {'shares': total_shares, 'cost': avg_cost}
+        i = self._idx.get(code)
+        if i is not None:
+            old_shares = self._shares[i]
+            total_shares = old_shares + shares
+            self._costs[i] = (old_shares * self._costs[i] + shares * price) / total_shares
+            self._shares[i] = total_shares
         else:
-            self.holdings[code] = {'shares': shares, 'cost': price}
+            self._idx[code] = len(self._codes)
+            self._codes.append(code)
+            self._shares = np.append(self._shares, np.int64(shares))
+            self._costs = np.append(self._costs, np.float64(price))
     
     def remove_position(self, code: str, shares: int = None):
         """减少持仓"""
-        if code not in self.holdings:
+        i = self._idx.get(code)
+        if i is None:
             return
-        if shares is None or shares >= self.holdings[code]['shares']:
-            del self.holdings[code]
+        if shares is None or shares >= self._shares[i]:
+            # 删除后保持其余持仓的原有顺序
+            del self._codes[i]
+            self._shares = np.delete(self._shares, i)
+            self._costs = np.delete(self._costs, i)
+            self._idx = {c: k for k, c in enumerate(self._codes)}
         else:
-            self.holdings[code]['shares'] -= shares
+            self._shares[i] -= shares
+    
+    def _price_vector(self, prices: Dict[str, float]) -> np.ndarray:
+        """按持仓顺序取价格，无报价的记为0"""
+        return np.fromiter((prices.get(c, 0.0) for c in self._codes), dtype=np.float64, count=len(self._codes))
     
     def get_value(self, prices: Dict[str, float]) -> float:
         """计算持仓市值"""
-        value = 0
-        for code, holding in self.holdings.items():
-            if code in prices:
-                value += holding['shares'] * prices[code]
-        return value
+        return float(self._shares @ self._price_vector(prices))
     
     def get_weights(self, prices: Dict[str, float]) -> Dict[str, float]:
         """计算各持仓权重"""
-        total = self.get_value(prices)
+        values = self._shares * self._price_vector(prices)
+        total = values.sum()
         if total == 0:
             return {}
-        return {code: holding['shares'] * prices.get(code, 0) / total for code, holding in self.holdings.items()}
+        return dict(zip(self._codes, (values / total).tolist()))
     
     @staticmethod
     def optimize_weights(returns: pd.DataFrame, method: str = 'equal') -> Dict[str, float]:
@@ -73,39 +103,58 @@ class Portfolio:
             return {s: 1/n for s in stocks}
         
         elif method == 'min_var':
-            cov = returns.cov()
-            inv_cov = np.linalg.pinv(cov.values)
+            values = np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+            key = (method, tuple(stocks), values.shape, hashlib.blake2b(values.tobytes(), digest_size=16).digest())
+            cached = _WEIGHTS_CACHE.get(key)
+            if cached is not None:
+                return dict(cached)
+            
+            cov = returns.cov().values
             ones = np.ones(n)
-            weights = inv_cov.dot(ones) / ones.dot(inv_cov).dot(ones)
+            try:
+                # 解线性方程组代替求伪逆
+                inv_ones = np.linalg.solve(cov + _MIN_VAR_RIDGE * np.eye(n), ones)
+            except np.linalg.LinAlgError:
+                inv_ones = np.linalg.pinv(cov).dot(ones)
+            weights = inv_ones / ones.dot(inv_ones)
             weights = np.maximum(weights, 0)
             weights = weights / weights.sum()
-            return {stocks[i]: weights[i] for i in range(n)}
+            result = {stocks[i]: weights[i] for i in range(n)}
+            
+            _WEIGHTS_CACHE.set(key, result)
+            return dict(result)
         
         return {s: 1/n for s in stocks}
     
     def summary(self, prices: Dict[str, float]) -> Dict[str, Any]:
         """持仓汇总"""
-        holdings_detail = []
-        for code, holding in self.holdings.items():
-            price = prices.get(code, 0)
-            market_value = holding['shares'] * price
-            profit = (price - holding['cost']) * holding['shares']
-            profit_pct = (price / holding['cost'] - 1) if holding['cost'] > 0 else 0
-            
-            holdings_detail.append({
+        price_vec = self._price_vector(prices)
+        market_values = self._shares * price_vec
+        profits = (price_vec - self._costs) * self._shares
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_pcts = np.where(self._costs > 0, price_vec / self._costs - 1, 0.0)
+        
+        holdings_detail = [
+            {
                 'code': code,
-                'shares': holding['shares'],
-                'cost': holding['cost'],
+                'shares': shares,
+                'cost': cost,
                 'price': price,
                 'market_value': market_value,
                 'profit': profit,
                 'profit_pct': profit_pct
-            })
+            }
+            for code, shares, cost, price, market_value, profit, profit_pct in zip(
+                self._codes, self._shares.tolist(), self._costs.tolist(), price_vec.tolist(),
+                market_values.tolist(), profits.tolist(), profit_pcts.tolist()
+            )
+        ]
         
+        total = float(market_values.sum())
         return {
-            'total_value': self.get_value(prices),
+            'total_value': total,
             'holdings': holdings_detail,
-            'weights': self.get_weights(prices)
+            'weights': dict(zip(self._codes, (market_values / total).tolist())) if total != 0 else {}
         }
 
 
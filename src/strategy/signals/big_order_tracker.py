@@ -3,17 +3,73 @@
 大单追踪模块
 监控主力资金流向和大单交易
 """
+import asyncio
+import threading
+import time
 import pandas as pd
-from typing import Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
-from src.data.collectors.realtime_service import get_realtime_quote, RealtimeQuote
+from src.data.collectors.realtime_service import get_realtime_quote, get_realtime_quotes, RealtimeQuote
+from src.utils.cache import TTLCache
 
+# 资金流排行缓存 (排行约每分钟更新一次，流入/流出榜共用一次请求)
+RANK_CACHE_TTL = 30
+_RANK_CACHE = TTLCache(maxsize=4, ttl=RANK_CACHE_TTL)
 
-@dataclass  
+# 行情预取缓存 (秒级有效，界面聚焦股票时后台预取，点击分析时直接命中)
+QUOTE_CACHE_TTL = 3
+_QUOTE_CACHE = TTLCache(maxsize=512, ttl=QUOTE_CACHE_TTL)
+# 预取线程池在首次预取时创建，只导入模块的进程不启动线程
+_prewarm_executor: Optional[ThreadPoolExecutor] = None
+_prewarm_lock = threading.Lock()
+
+# 单只股票结果缓存: 有效期内直接复用；上游失败时退回到不超过STALE_TTL秒的旧结果
+RESULT_FRESH_TTL = 5.0
+RESULT_STALE_TTL = 60.0
+# 单只股票结果缓存的最大条目数 (按(类型, 代码)计，超出时淘汰最久未使用的)
+RESULT_CACHE_SIZE = 2048
+
+# 批量扫描的并发线程数 (逐只请求为网络I/O)
+SCAN_WORKERS = 10
+# 批量扫描每秒最多发起的请求数 (AKShare代理上游接口，避免被限流)
+SCAN_RATE_LIMIT = 10
+
+
+def _main_net_column(columns) -> Optional[str]:
+    """排行数据中的主力净流入列"""
+    for c in columns:
+        if '主力' in c and '净' in c:
+            return c
+    return None
+
+
+class _RateLimiter:
+    """按固定间隔放行请求 (线程安全)"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """阻塞到下一个可用时间片"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@dataclass
 class FundFlowData:
     """资金流向数据"""
+    __slots__ = ('code', 'name', 'price', 'change_pct', 'main_net_inflow', 'main_net_ratio',
+                 'super_big_net', 'big_net', 'mid_net', 'small_net', 'timestamp')
+    
     code: str
     name: str
     price: float
@@ -51,6 +107,9 @@ class FundFlowData:
 @dataclass
 class BuySellPressure:
     """买卖压力分析"""
+    __slots__ = ('code', 'name', 'bid_volume', 'ask_volume', 'bid_ratio', 'pressure',
+                 'pressure_score', 'timestamp')
+    
     code: str
     name: str
     bid_volume: int    # 买盘挂单量
@@ -77,9 +136,63 @@ class BigOrderTracker:
     """大单追踪器"""
     
     def __init__(self):
-        self.cache = {}
+        # (类型, 代码) -> (获取时间, 结果)；条目保留到可作为旧结果退回的期限为止
+        self.cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_STALE_TTL)
+        # 批量扫描时多线程并发读写，计数器由锁保护
+        self._stats_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._stale_hits = 0
+        self._col_cache: Dict[tuple, Dict[str, Optional[str]]] = {}
+        self._limiter = _RateLimiter(SCAN_RATE_LIMIT)
+    
+    def _cached(self, kind: str, code: str, fetch: Callable[[str], Any]) -> Any:
+        """
+        带缓存获取单只股票结果
+        
+        RESULT_FRESH_TTL秒内直接返回缓存；获取失败(返回None)时退回RESULT_STALE_TTL秒内的旧结果
+        """
+        key = (kind, code)
+        now = time.monotonic()
+        entry = self.cache.get(key)
+        if entry is not None and now - entry[0] < RESULT_FRESH_TTL:
+            with self._stats_lock:
+                self._cache_hits += 1
+            return entry[1]
+        
+        with self._stats_lock:
+            self._cache_misses += 1
+        data = fetch(code)
+        if data is not None:
+            self.cache.set(key, (time.monotonic(), data))
+            return data
+        
+        if entry is not None:
+            with self._stats_lock:
+                self._stale_hits += 1
+            return entry[1]
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """结果缓存命中统计"""
+        with self._stats_lock:
+            hits, misses, stale_hits = self._cache_hits, self._cache_misses, self._stale_hits
+        total = hits + misses
+        return {
+            'size': len(self.cache),
+            'hits': hits,
+            'misses': misses,
+            'stale_hits': stale_hits,
+            'hit_rate': hits / total if total else 0.0
+        }
     
     def get_fund_flow(self, code: str) -> Optional[FundFlowData]:
+        """
+        获取个股资金流向 (短时缓存，失败时返回近期结果)
+        """
+        return self._cached('fund_flow', code, self._fetch_fund_flow)
+    
+    def _fetch_fund_flow(self, code: str) -> Optional[FundFlowData]:
         """
         获取个股资金流向
         使用AKShare获取数据
@@ -97,24 +210,14 @@ class BigOrderTracker:
             if df is None or df.empty:
                 return None
             
-            # 获取最新一天数据
-            latest = df.iloc[-1]
-            
             # 获取实时行情
-            quote = get_realtime_quote(code)
-            
-            # 解析资金流向列
-            main_net = 0
-            super_big = 0
-            big_net = 0
+            quote = self._get_quote(code)
             
-            for col in df.columns:
-                if '主力' in col and '净' in col:
-                    main_net = float(latest[col]) if pd.notna(latest[col]) else 0
-                elif '超大单' in col and '净' in col:
-                    super_big = float(latest[col]) if pd.notna(latest[col]) else 0
-                elif '大单' in col and '净' in col and '超' not in col:
-                    big_net = float(latest[col]) if pd.notna(latest[col]) else 0
+            # 解析资金流向列 (取最新一天数据)
+            cols = self._fund_flow_columns(df.columns)
+            main_net = self._last_value(df, cols['main'])
+            super_big = self._last_value(df, cols['super_big'])
+            big_net = self._last_value(df, cols['big'])
             
             return FundFlowData(
                 code=code,
@@ -134,17 +237,78 @@ class BigOrderTracker:
             print(f"获取资金流向失败: {e}")
             return None
     
+    @staticmethod
+    def _get_quote(code: str) -> Optional[RealtimeQuote]:
+        """获取实时行情，优先使用预取缓存"""
+        quote = _QUOTE_CACHE.get(code)
+        if quote is None:
+            quote = get_realtime_quote(code)
+            if quote is not None:
+                _QUOTE_CACHE.set(code, quote)
+        return quote
+    
+    @staticmethod
+    def prewarm(codes: List[str]) -> Future:
+        """
+        后台批量预取行情到缓存 (界面可见股票变化时调用，不阻塞调用方)
+        
+        Returns:
+            预取任务的Future，结果为成功预取的股票数
+        """
+        global _prewarm_executor
+        
+        def task():
+            quotes = get_realtime_quotes(list(codes))
+            for code, quote in quotes.items():
+                _QUOTE_CACHE.set(code, quote)
+            return len(quotes)
+        
+        with _prewarm_lock:
+            if _prewarm_executor is None:
+                _prewarm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='quote-prewarm')
+        return _prewarm_executor.submit(task)
+    
+    def _fund_flow_columns(self, columns) -> Dict[str, Optional[str]]:
+        """定位主力/超大单/大单净流入列，按列名组合缓存 (AKShare返回的列名固定)"""
+        key = tuple(columns)
+        cols = self._col_cache.get(key)
+        if cols is None:
+            cols = {'main': None, 'super_big': None, 'big': None}
+            for col in key:
+                if '主力' in col and '净' in col:
+                    cols['main'] = col
+                elif '超大单' in col and '净' in col:
+                    cols['super_big'] = col
+                elif '大单' in col and '净' in col and '超' not in col:
+                    cols['big'] = col
+            self._col_cache[key] = cols
+        return cols
+    
+    @staticmethod
+    def _last_value(df: pd.DataFrame, col: Optional[str]) -> float:
+        """取列的最后一个值，列不存在或缺失时为0"""
+        if col is None:
+            return 0
+        v = df[col].to_numpy()[-1]
+        return 0 if pd.isna(v) else float(v)
+    
     def get_buy_sell_pressure(self, code: str) -> Optional[BuySellPressure]:
+        """
+        分析买卖压力 (短时缓存，失败时返回近期结果)
+        """
+        return self._cached('pressure', code, self._fetch_buy_sell_pressure)
+    
+    def _fetch_buy_sell_pressure(self, code: str) -> Optional[BuySellPressure]:
         """
         分析买卖压力
         通过实时行情的买卖盘挂单分析
         """
-        quote = get_realtime_quote(code)
+        quote = self._get_quote(code)
         if not quote:
             return None
         
-        bid_volume = sum(quote.bid_volumes)
-        ask_volume = sum(quote.ask_volumes)
+        bid_volume = quote.bid_total
+        ask_volume = quote.ask_total
         total = bid_volume + ask_volume
         
         if total == 0:
@@ -173,13 +337,21 @@ class BigOrderTracker:
             timestamp=datetime.now().strftime('%H:%M:%S')
         )
     
+    def _scan(self, fetch: Callable, codes: List[str]) -> list:
+        """并发逐只获取，按输入顺序返回非空结果"""
+        if not codes:
+            return []
+        
+        def task(code):
+            self._limiter.wait()
+            return fetch(code)
+        
+        with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(codes))) as executor:
+            return [data for data in executor.map(task, codes) if data]
+    
     def scan_fund_flow(self, codes: List[str]) -> List[FundFlowData]:
         """批量扫描资金流向"""
-        results = []
-        for code in codes:
-            data = self.get_fund_flow(code)
-            if data:
-                results.append(data)
+        results = self._scan(self.get_fund_flow, codes)
         
         # 按主力净流入排序
         results.sort(key=lambda x: x.main_net_inflow, reverse=True)
@@ -187,25 +359,50 @@ class BigOrderTracker:
     
     def scan_pressure(self, codes: List[str]) -> List[BuySellPressure]:
         """批量扫描买卖压力"""
-        results = []
-        for code in codes:
-            data = self.get_buy_sell_pressure(code)
-            if data:
-                results.append(data)
+        results = self._scan(self.get_buy_sell_pressure, codes)
         
         # 按压力评分排序
         results.sort(key=lambda x: x.pressure_score, reverse=True)
         return results
     
+    async def ascan_fund_flow(self, codes: List[str]) -> List[FundFlowData]:
+        """批量扫描资金流向 (供事件循环内调用，不阻塞循环)"""
+        return await asyncio.to_thread(self.scan_fund_flow, codes)
+    
+    async def ascan_pressure(self, codes: List[str]) -> List[BuySellPressure]:
+        """批量扫描买卖压力 (供事件循环内调用，不阻塞循环)"""
+        return await asyncio.to_thread(self.scan_pressure, codes)
+    
+    @staticmethod
+    def _fetch_rank_df() -> pd.DataFrame:
+        """
+        获取今日资金流排行 (流入/流出榜共用，短时缓存)
+        
+        主力净流入列在缓存前转为数值，返回的DataFrame只读
+        """
+        df = _RANK_CACHE.get('今日')
+        if df is not None:
+            return df
+        
+        import akshare as ak
+        df = ak.stock_individual_fund_flow_rank(indicator="今日")
+        if df is None or df.empty:
+            return pd.DataFrame()
+        
+        net_col = _main_net_column(df.columns)
+        if net_col:
+            df[net_col] = pd.to_numeric(df[net_col], errors='coerce')
+        _RANK_CACHE.set('今日', df)
+        return df
+    
     def get_top_inflow_stocks(self, limit: int = 20) -> pd.DataFrame:
         """
         获取主力资金流入前N名
         """
         try:
-            import akshare as ak
-            df = ak.stock_individual_fund_flow_rank(indicator="今日")
+            df = self._fetch_rank_df()
             
-            if df is None or df.empty:
+            if df.empty:
                 return pd.DataFrame()
             
             # 选择需要的列
@@ -230,21 +427,14 @@ class BigOrderTracker:
         获取主力资金流出前N名
         """
         try:
-            import akshare as ak
-            df = ak.stock_individual_fund_flow_rank(indicator="今日")
+            df = self._fetch_rank_df()
             
-            if df is None or df.empty:
+            if df.empty:
                 return pd.DataFrame()
             
-            # 找到主力净流入列并排序
-            net_col = None
-            for c in df.columns:
-                if '主力' in c and '净' in c:
-                    net_col = c
-                    break
-            
+            # 按主力净流入取最小的N只
+            net_col = _main_net_column(df.columns)
             if net_col:
-                df[net_col] = pd.to_numeric(df[net_col], errors='coerce')
                 df = df.nsmallest(limit, net_col)
             else:
                 df = df.tail(limit)
@@ -270,6 +460,11 @@ def get_fund_flow(code: str) -> Optional[FundFlowData]:
     return big_order_tracker.get_fund_flow(code)
 
 
+def prewarm_quotes(codes: List[str]) -> Future:
+    """便捷函数：后台预取行情"""
+    return big_order_tracker.prewarm(codes)
+
+
 if __name__ == '__main__':
     # 测试
     print("\n测试买卖压力分析:")
@@ -9,7 +9,7 @@
 import warnings
 warnings.filterwarnings('ignore')
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple
 from dataclasses import dataclass
 from enum import Enum
 import pandas as pd
@@ -20,6 +20,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from src.utils.logger import get_logger
+from src.utils.jit import njit
 
 logger = get_logger(__name__)
 
@@ -70,6 +71,156 @@ class ZhongShu:
     direction: Direction  # 中枢方向（由形成中枢的笔决定）
 
 
+class _BIArrays(NamedTuple):
+    """笔序列的列式(SoA)表示，供内部计算使用"""
+    start_dt: np.ndarray   # 起点分型时间 (object)
+    end_dt: np.ndarray     # 终点分型时间 (object)
+    direction: np.ndarray  # 1=上涨笔, -1=下跌笔 (int8)
+    high: np.ndarray
+    low: np.ndarray
+    power: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.high)
+    
+    @classmethod
+    def from_list(cls, bi_list: List[BI]) -> '_BIArrays':
+        return cls(
+            start_dt=np.array([bi.start_dt for bi in bi_list], dtype=object),
+            end_dt=np.array([bi.end_dt for bi in bi_list], dtype=object),
+            direction=np.array([1 if bi.direction == Direction.UP else -1 for bi in bi_list], dtype=np.int8),
+            high=np.array([bi.high for bi in bi_list], dtype=np.float64),
+            low=np.array([bi.low for bi in bi_list], dtype=np.float64),
+            power=np.array([bi.power for bi in bi_list], dtype=np.float64),
+        )
+    
+    def to_list(self) -> List[BI]:
+        return [
+            BI(start_dt=start_dt, end_dt=end_dt,
+               direction=Direction.UP if direction == 1 else Direction.DOWN,
+               high=high, low=low, power=power)
+            for start_dt, end_dt, direction, high, low, power in zip(
+                self.start_dt, self.end_dt, self.direction.tolist(),
+                self.high.tolist(), self.low.tolist(), self.power.tolist())
+        ]
+
+
+@njit(cache=True)
+def _process_include_nb(opens, highs, lows, closes):
+    """
+    K线包含处理的顺序扫描 (合并后的K线只改高低点，开收盘与量沿用该组第一根)
+    
+    Returns:
+        (合并后高点, 合并后低点, 每根合并K线对应的首根原始K线下标, 合并后K线数)
+    """
+    n = len(highs)
+    out_h = np.empty(n, np.float64)
+    out_l = np.empty(n, np.float64)
+    keep_idx = np.empty(n, np.int64)
+    out_n = 0
+    
+    # 最后一根与倒数第二根合并K线的高低点，作为循环状态维护而不回读输出数组
+    prev_high = 0.0
+    prev_low = 0.0
+    prev_prev_high = 0.0  # out_n >= 2 时有效
+    
+    for i in range(n):
+        curr_high = highs[i]
+        curr_low = lows[i]
+        
+        # 检查包含关系
+        if out_n > 0 and ((curr_high <= prev_high and curr_low >= prev_low) or
+                          (curr_high >= prev_high and curr_low <= prev_low)):
+            # 判断方向：比较前一根与更前一根的高低点
+            if out_n >= 2:
+                direction_up = prev_prev_high < prev_high
+            else:
+                direction_up = closes[i] > opens[i]
+            
+            # 与内置max/min相同的取值规则 (含NaN时的行为一致)
+            if direction_up:
+                # 上涨趋势：取高点最高、低点最高
+                prev_high = curr_high if curr_high > prev_high else prev_high
+                prev_low = curr_low if curr_low > prev_low else prev_low
+            else:
+                # 下跌趋势：取高点最低、低点最低
+                prev_high = curr_high if curr_high < prev_high else prev_high
+                prev_low = curr_low if curr_low < prev_low else prev_low
+            out_h[out_n - 1] = prev_high
+            out_l[out_n - 1] = prev_low
+            continue
+        
+        prev_prev_high = prev_high
+        prev_high = curr_high
+        prev_low = curr_low
+        out_h[out_n] = curr_high
+        out_l[out_n] = curr_low
+        keep_idx[out_n] = i
+        out_n += 1
+    
+    return out_h, out_l, keep_idx, out_n
+
+
+@njit(cache=True)
+def _find_zhongshu_nb(hi, lo):
+    """
+    在笔的高低点数组上贪心识别中枢
+    
+    取值规则与内置max/min一致 (保留先出现者，仅严格更大/更小时替换)
+    
+    Returns:
+        (起始笔下标, 结束笔下标, ZG, ZD, GG, DD, 中枢数)
+    """
+    n = len(hi)
+    start_idx = np.empty(n, np.int64)
+    end_idx = np.empty(n, np.int64)
+    zg_arr = np.empty(n, np.float64)
+    zd_arr = np.empty(n, np.float64)
+    gg_arr = np.empty(n, np.float64)
+    dd_arr = np.empty(n, np.float64)
+    count = 0
+    
+    i = 0
+    while i < n - 2:
+        # 中枢高点/低点
+        zg = hi[i + 2] if hi[i + 2] < hi[i + 1] else hi[i + 1]
+        zd = lo[i + 2] if lo[i + 2] > lo[i + 1] else lo[i + 1]
+        
+        # 中枢有效条件：ZG > ZD（存在重叠区间）
+        if zg > zd:
+            gg = hi[i]
+            dd = lo[i]
+            for k in range(i + 1, i + 3):
+                if hi[k] > gg:
+                    gg = hi[k]
+                if lo[k] < dd:
+                    dd = lo[k]
+            
+            # 尝试延伸中枢（后续笔的高低点与中枢有重叠则继续延伸）
+            j = i + 3
+            while j < n and lo[j] < zg and hi[j] > zd:
+                if hi[j] > gg:
+                    gg = hi[j]
+                if lo[j] < dd:
+                    dd = lo[j]
+                j += 1
+            
+            start_idx[count] = i
+            end_idx[count] = j - 1
+            zg_arr[count] = zg
+            zd_arr[count] = zd
+            gg_arr[count] = gg
+            dd_arr[count] = dd
+            count += 1
+            
+            # 跳过已处理的笔
+            i = j
+        else:
+            i += 1
+    
+    return start_idx, end_idx, zg_arr, zd_arr, gg_arr, dd_arr, count
+
+
 class ChanAnalyzer:
     """
     缠论分析器
@@ -93,62 +244,36 @@ class ChanAnalyzer:
         - 上涨趋势：取高点最高、低点最高
         - 下跌趋势：取高点最低、低点最低
         """
-        df = df.copy()
-        
         # 确保有必要的列
         if 'high' not in df.columns or 'low' not in df.columns:
-            return df
-        
-        # 判断趋势方向（通过前后K线高低点判断）
-        processed = []
-        
-        for i, row in df.iterrows():
-            if len(processed) == 0:
-                processed.append({
-                    'dt': i if isinstance(i, pd.Timestamp) else row.get('trade_date', i),
-                    'open': row['open'],
-                    'high': row['high'],
-                    'low': row['low'],
-                    'close': row['close'],
-                    'volume': row.get('volume', 0)
-                })
-                continue
-            
-            prev = processed[-1]
-            curr_high, curr_low = row['high'], row['low']
-            prev_high, prev_low = prev['high'], prev['low']
-            
-            # 检查包含关系
-            is_include = (curr_high <= prev_high and curr_low >= prev_low) or \
-                        (curr_high >= prev_high and curr_low <= prev_low)
-            
-            if is_include:
-                # 存在包含关系，合并K线
-                # 判断方向：比较前一根与更前一根的高低点
-                if len(processed) >= 2:
-                    direction_up = processed[-2]['high'] < prev_high
-                else:
-                    direction_up = row['close'] > row['open']
-                
-                if direction_up:
-                    # 上涨趋势：取高点最高、低点最高
-                    prev['high'] = max(prev_high, curr_high)
-                    prev['low'] = max(prev_low, curr_low)
-                else:
-                    # 下跌趋势：取高点最低、低点最低
-                    prev['high'] = min(prev_high, curr_high)
-                    prev['low'] = min(prev_low, curr_low)
-            else:
-                processed.append({
-                    'dt': i if isinstance(i, pd.Timestamp) else row.get('trade_date', i),
-                    'open': row['open'],
-                    'high': row['high'],
-                    'low': row['low'],
-                    'close': row['close'],
-                    'volume': row.get('volume', 0)
-                })
-        
-        return pd.DataFrame(processed).set_index('dt')
+            return df.copy()
+        
+        out_h, out_l, keep_idx, out_n = _process_include_nb(
+            df['open'].to_numpy(dtype=np.float64),
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+        )
+        keep_idx = keep_idx[:out_n]
+        
+        # 时间取索引，非时间索引时优先取trade_date列
+        if not isinstance(df.index, pd.DatetimeIndex) and 'trade_date' in df.columns:
+            dts = df['trade_date'].to_numpy()[keep_idx]
+        else:
+            dts = df.index.to_numpy()[keep_idx]
+        
+        if 'volume' in df.columns:
+            volume = df['volume'].to_numpy(dtype=np.float64)[keep_idx]
+        else:
+            volume = np.zeros(out_n)
+        
+        return pd.DataFrame({
+            'open': df['open'].to_numpy(dtype=np.float64)[keep_idx],
+            'high': out_h[:out_n],
+            'low': out_l[:out_n],
+            'close': df['close'].to_numpy(dtype=np.float64)[keep_idx],
+            'volume': volume,
+        }, index=pd.Index(dts, name='dt'))
     
     def find_fx(self, df: pd.DataFrame) -> List[FX]:
         """
@@ -162,24 +287,23 @@ class ChanAnalyzer:
         if len(df) < 3:
             return fx_list
         
-        for i in range(1, len(df) - 1):
-            k1 = df.iloc[i - 1]
-            k2 = df.iloc[i]
-            k3 = df.iloc[i + 1]
-            
-            dt = df.index[i]
-            
-            # 顶分型
-            if k2['high'] > k1['high'] and k2['high'] > k3['high']:
-                if k2['low'] > k1['low'] and k2['low'] > k3['low']:
-                    fx = FX(dt=dt, mark=Mark.D, high=k2['high'], low=k2['low'], fx=k2['high'])
-                    fx_list.append(fx)
-            
-            # 底分型
-            elif k2['low'] < k1['low'] and k2['low'] < k3['low']:
-                if k2['high'] < k1['high'] and k2['high'] < k3['high']:
-                    fx = FX(dt=dt, mark=Mark.G, high=k2['high'], low=k2['low'], fx=k2['low'])
-                    fx_list.append(fx)
+        h = df['high'].to_numpy(dtype=np.float64)
+        l = df['low'].to_numpy(dtype=np.float64)
+        mid_h, mid_l = h[1:-1], l[1:-1]
+        
+        # 顶分型: 中间K线高点、低点均高于两侧
+        top = (mid_h > h[:-2]) & (mid_h > h[2:]) & (mid_l > l[:-2]) & (mid_l > l[2:])
+        # 底分型: 中间K线高点、低点均低于两侧 (与顶分型互斥)
+        bot = (mid_l < l[:-2]) & (mid_l < l[2:]) & (mid_h < h[:-2]) & (mid_h < h[2:])
+        
+        # 只在命中的少量下标上构造FX对象
+        index = df.index
+        for i in (np.flatnonzero(top | bot) + 1).tolist():
+            high, low = float(h[i]), float(l[i])
+            if top[i - 1]:
+                fx_list.append(FX(dt=index[i], mark=Mark.D, high=high, low=low, fx=high))
+            else:
+                fx_list.append(FX(dt=index[i], mark=Mark.G, high=high, low=low, fx=low))
         
         return fx_list
     
@@ -191,13 +315,12 @@ class ChanAnalyzer:
         1. 顶分型与底分型之间至少有1根独立K线
         2. 顶底分型之间价格有重合（顶低于前底或底高于前顶则不成笔）
         """
-        bi_list = []
-        
-        if len(fx_list) < 2:
-            return bi_list
-        
+        return self._find_bi_arrays(fx_list).to_list()
+    
+    def _find_bi_arrays(self, fx_list: List[FX]) -> _BIArrays:
+        """划分笔，结果以列式数组返回"""
         # 过滤：相邻分型必须是顶底交替
-        valid_fx = [fx_list[0]]
+        valid_fx = fx_list[:1]
         for fx in fx_list[1:]:
             if fx.mark != valid_fx[-1].mark:
                 valid_fx.append(fx)
@@ -208,33 +331,27 @@ class ChanAnalyzer:
                 elif fx.mark == Mark.G and fx.fx < valid_fx[-1].fx:
                     valid_fx[-1] = fx
         
-        # 构建笔
-        for i in range(1, len(valid_fx)):
-            start_fx = valid_fx[i - 1]
-            end_fx = valid_fx[i]
-            
-            if start_fx.mark == Mark.G:  # 从底到顶，上涨笔
-                direction = Direction.UP
-                high = end_fx.high
-                low = start_fx.low
-            else:  # 从顶到底，下跌笔
-                direction = Direction.DOWN
-                high = start_fx.high
-                low = end_fx.low
-            
-            power = abs(high - low) / low if low > 0 else 0
-            
-            bi = BI(
-                start_dt=start_fx.dt,
-                end_dt=end_fx.dt,
-                direction=direction,
-                high=high,
-                low=low,
-                power=power
-            )
-            bi_list.append(bi)
-        
-        return bi_list
+        dts = np.empty(len(valid_fx), dtype=object)
+        dts[:] = [fx.dt for fx in valid_fx]
+        is_g = np.array([fx.mark == Mark.G for fx in valid_fx], dtype=bool)
+        fx_high = np.array([fx.high for fx in valid_fx], dtype=np.float64)
+        fx_low = np.array([fx.low for fx in valid_fx], dtype=np.float64)
+        
+        # 相邻两个分型构成一笔：从底到顶为上涨笔，从顶到底为下跌笔
+        up = is_g[:-1]
+        high = np.where(up, fx_high[1:], fx_high[:-1])
+        low = np.where(up, fx_low[:-1], fx_low[1:])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            power = np.where(low > 0, np.abs(high - low) / low, 0.0)
+        
+        return _BIArrays(
+            start_dt=dts[:-1],
+            end_dt=dts[1:],
+            direction=np.where(up, 1, -1).astype(np.int8),
+            high=high,
+            low=low,
+            power=power,
+        )
     
     def find_zhongshu(self, bi_list: List[BI]) -> List[ZhongShu]:
         """
@@ -245,64 +362,27 @@ class ChanAnalyzer:
         ZD = max(第二、三笔的低点)
         条件：ZG > ZD 才形成有效中枢
         """
-        zs_list = []
-        
-        if len(bi_list) < 3:
-            return zs_list
-        
-        i = 0
-        while i < len(bi_list) - 2:
-            bi1 = bi_list[i]
-            bi2 = bi_list[i + 1]
-            bi3 = bi_list[i + 2]
-            
-            # 计算中枢区间
-            # 方法1：取三笔的重叠区间
-            highs = [bi1.high, bi2.high, bi3.high]
-            lows = [bi1.low, bi2.low, bi3.low]
-            
-            zg = min(bi2.high, bi3.high)  # 中枢高点
-            zd = max(bi2.low, bi3.low)    # 中枢低点
-            
-            # 中枢有效条件：ZG > ZD（存在重叠区间）
-            if zg > zd:
-                # 尝试延伸中枢（后续笔是否仍在中枢区间内）
-                bi_count = 3
-                end_dt = bi3.end_dt
-                gg = max(highs)  # 区间最高
-                dd = min(lows)   # 区间最低
-                
-                j = i + 3
-                while j < len(bi_list):
-                    next_bi = bi_list[j]
-                    # 如果下一笔的高低点与中枢有重叠，继续延伸
-                    if next_bi.low < zg and next_bi.high > zd:
-                        bi_count += 1
-                        end_dt = next_bi.end_dt
-                        gg = max(gg, next_bi.high)
-                        dd = min(dd, next_bi.low)
-                        j += 1
-                    else:
-                        break
-                
-                zs = ZhongShu(
-                    start_dt=bi1.start_dt,
-                    end_dt=end_dt,
-                    zg=zg,
-                    zd=zd,
-                    gg=gg,
-                    dd=dd,
-                    bi_count=bi_count,
-                    direction=bi1.direction
-                )
-                zs_list.append(zs)
-                
-                # 跳过已处理的笔
-                i = j
-            else:
-                i += 1
-        
-        return zs_list
+        return self._find_zhongshu_arrays(_BIArrays.from_list(bi_list))
+    
+    def _find_zhongshu_arrays(self, bi: _BIArrays) -> List[ZhongShu]:
+        """在列式笔数组上识别中枢，只在最后构造ZhongShu对象"""
+        start_idx, end_idx, zg, zd, gg, dd, count = _find_zhongshu_nb(bi.high, bi.low)
+        
+        return [
+            ZhongShu(
+                start_dt=bi.start_dt[i],
+                end_dt=bi.end_dt[j],
+                zg=zg_,
+                zd=zd_,
+                gg=gg_,
+                dd=dd_,
+                bi_count=j - i + 1,
+                direction=Direction.UP if bi.direction[i] == 1 else Direction.DOWN
+            )
+            for i, j, zg_, zd_, gg_, dd_ in zip(
+                start_idx[:count].tolist(), end_idx[:count].tolist(),
+                zg[:count].tolist(), zd[:count].tolist(), gg[:count].tolist(), dd[:count].tolist())
+        ]
     
     def analyze(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -317,11 +397,12 @@ class ChanAnalyzer:
         # 识别分型
         fx_list = self.find_fx(processed_df)
         
-        # 划分笔
-        bi_list = self.find_bi(processed_df, fx_list)
+        # 划分笔 (内部以列式数组计算，对外输出BI列表)
+        bi_arrays = self._find_bi_arrays(fx_list)
+        bi_list = bi_arrays.to_list()
         
         # 识别中枢
-        zs_list = self.find_zhongshu(bi_list)
+        zs_list = self._find_zhongshu_arrays(bi_arrays)
         
         # 当前状态
         result = {
@@ -339,7 +420,42 @@ class ChanAnalyzer:
         
         return result
     
-    def get_bs_point(self, df: pd.DataFrame) -> Dict[str, Any]:
+    @staticmethod
+    def match_bs_point(fx: FX, bi: BI, zs: Optional[ZhongShu],
+                       latest_price: float) -> Tuple[int, str, str]:
+        """
+        根据最新分型、笔、中枢判断买卖点
+        
+        Returns:
+            (信号 1/-1/0, 信号类型, 操作建议)
+        """
+        # 一买信号：下跌笔 + 底分型
+        if bi.direction == Direction.DOWN and fx.mark == Mark.G:
+            return 1, '一买', 'buy'
+        
+        # 一卖信号：上涨笔 + 顶分型
+        if bi.direction == Direction.UP and fx.mark == Mark.D:
+            return -1, '一卖', 'sell'
+        
+        signal, signal_type, suggestion = 0, '', 'hold'
+        
+        # 二买/三买信号（需要有中枢）
+        if zs:
+            # 二买：回调到中枢下沿附近，出现底分型，且不创新低
+            if fx.mark == Mark.G and bi.direction == Direction.DOWN:
+                # 回调接近中枢下沿ZD
+                if fx.fx <= zs.zd * 1.02 and fx.fx > zs.dd:
+                    signal, signal_type, suggestion = 1, '二买', 'buy'
+            
+            # 三买：突破中枢上沿后回踩，不跌破中枢高点ZG
+            if fx.mark == Mark.G and bi.direction == Direction.DOWN:
+                # 回踩在中枢上沿ZG之上
+                if fx.fx >= zs.zg:
+                    signal, signal_type, suggestion = 1, '三买', 'buy'
+        
+        return signal, signal_type, suggestion
+    
+    def get_bs_point(self, df: pd.DataFrame, analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         获取买卖点信号
         
@@ -347,8 +463,13 @@ class ChanAnalyzer:
         一卖：上涨笔结束，出现顶分型
         二买：回调到中枢下沿附近不创新低
         三买：中枢上沿突破后回踩不跌破中枢高点
+        
+        Args:
+            df: K线数据
+            analysis: 已有的 analyze(df) 结果，传入时不再重复分析
         """
-        analysis = self.analyze(df)
+        if analysis is None:
+            analysis = self.analyze(df)
         
         result = {
             'signal': 0,  # 1=买, -1=卖, 0=无
@@ -382,42 +503,207 @@ class ChanAnalyzer:
                     'fx': fx.fx
                 }
                 
-                # 一买信号：下跌笔 + 底分型
-                if bi.direction == Direction.DOWN and fx.mark == Mark.G:
-                    result['signal'] = 1
-                    result['signal_type'] = '一买'
-                    result['suggestion'] = 'buy'
-                
-                # 一卖信号：上涨笔 + 顶分型
-                elif bi.direction == Direction.UP and fx.mark == Mark.D:
-                    result['signal'] = -1
-                    result['signal_type'] = '一卖'
-                    result['suggestion'] = 'sell'
-                
-                # 二买/三买信号（需要有中枢）
-                elif analysis.get('latest_zs'):
-                    zs = analysis['latest_zs']
-                    latest_price = df['close'].iloc[-1] if 'close' in df.columns else 0
-                    
-                    # 二买：回调到中枢下沿附近，出现底分型，且不创新低
-                    if fx.mark == Mark.G and bi.direction == Direction.DOWN:
-                        # 回调接近中枢下沿ZD
-                        if fx.fx <= zs.zd * 1.02 and fx.fx > zs.dd:
-                            result['signal'] = 1
-                            result['signal_type'] = '二买'
-                            result['suggestion'] = 'buy'
-                    
-                    # 三买：突破中枢上沿后回踩，不跌破中枢高点ZG
-                    if fx.mark == Mark.G and bi.direction == Direction.DOWN:
-                        # 回踩在中枢上沿ZG之上
-                        if fx.fx >= zs.zg:
-                            result['signal'] = 1
-                            result['signal_type'] = '三买'
-                            result['suggestion'] = 'buy'
+                latest_price = df['close'].iloc[-1] if 'close' in df.columns else 0
+                signal, signal_type, suggestion = self.match_bs_point(
+                    fx, bi, analysis.get('latest_zs'), latest_price)
+                if signal != 0:
+                    result['signal'] = signal
+                    result['signal_type'] = signal_type
+                    result['suggestion'] = suggestion
         
         return result
 
 
+def _make_bi(start_fx: FX, end_fx: FX) -> BI:
+    """由相邻的一对顶底分型构造笔 (与 ChanAnalyzer.find_bi 一致)"""
+    if start_fx.mark == Mark.G:  # 从底到顶，上涨笔
+        direction = Direction.UP
+        high = end_fx.high
+        low = start_fx.low
+    else:  # 从顶到底，下跌笔
+        direction = Direction.DOWN
+        high = start_fx.high
+        low = end_fx.low
+    
+    power = abs(high - low) / low if low > 0 else 0
+    return BI(start_dt=start_fx.dt, end_dt=end_fx.dt, direction=direction,
+              high=high, low=low, power=power)
+
+
+def _scan_zhongshu(bis: List[BI], i: int, cur: Optional[tuple],
+                   last: Optional[ZhongShu]) -> Tuple[int, Optional[tuple], Optional[ZhongShu]]:
+    """
+    从断点 (i, cur, last) 继续 ChanAnalyzer.find_zhongshu 的贪心扫描
+    
+    cur 为正在延伸的中枢 (start_dt, end_dt, zg, zd, gg, dd, bi_count, direction, j)，
+    last 为最近一个已完成的中枢。扫描只在需要读取 bis 末尾之后的笔时停下，
+    因此 bis 追加新笔后可从返回的断点继续，结果与整体重算一致。
+    """
+    n = len(bis)
+    while True:
+        if cur is not None:
+            start_dt, end_dt, zg, zd, gg, dd, bi_count, direction, j = cur
+            while j < n:
+                next_bi = bis[j]
+                if not (next_bi.low < zg and next_bi.high > zd):
+                    break
+                bi_count += 1
+                end_dt = next_bi.end_dt
+                gg = max(gg, next_bi.high)
+                dd = min(dd, next_bi.low)
+                j += 1
+            cur = (start_dt, end_dt, zg, zd, gg, dd, bi_count, direction, j)
+            if j >= n:
+                return i, cur, last
+            last = _zhongshu_from_state(cur)
+            cur, i = None, j
+            continue
+        
+        if i >= n - 2:
+            return i, None, last
+        
+        bi1, bi2, bi3 = bis[i], bis[i + 1], bis[i + 2]
+        zg = min(bi2.high, bi3.high)
+        zd = max(bi2.low, bi3.low)
+        if zg > zd:
+            cur = (bi1.start_dt, bi3.end_dt, zg, zd,
+                   max([bi1.high, bi2.high, bi3.high]), min([bi1.low, bi2.low, bi3.low]),
+                   3, bi1.direction, i + 3)
+        else:
+            i += 1
+
+
+def _zhongshu_from_state(state: tuple) -> ZhongShu:
+    start_dt, end_dt, zg, zd, gg, dd, bi_count, direction, _ = state
+    return ZhongShu(start_dt=start_dt, end_dt=end_dt, zg=zg, zd=zd, gg=gg, dd=dd,
+                    bi_count=bi_count, direction=direction)
+
+
+class _IncrementalChan:
+    """
+    逐根喂入K线、增量维护的缠论状态
+    
+    每次 update 之后，latest() 给出的最新分型/笔/中枢与对截至当前K线的
+    数据整体调用 ChanAnalyzer.analyze 的结果一致，但每根K线只做均摊O(1)的计算：
+    - 包含处理后只有最后一根K线可能继续被合并，之前的K线和以它们为中间K的分型都已确定
+    - 顶底交替过滤后只有最后一个分型可能被更极端的同类分型替换，之前的笔都已确定
+    - 中枢扫描在已确定的笔上推进并保存断点，每次只需在末尾的试探笔上续扫
+    """
+    
+    def __init__(self):
+        # 包含处理后的K线
+        self.dts: List[Any] = []
+        self.highs: List[float] = []
+        self.lows: List[float] = []
+        self.last_fx: Optional[FX] = None     # 最近一个已确认分型
+        self.valid_fx: List[FX] = []          # 顶底交替过滤后的已确认分型
+        self.stable_bi: List[BI] = []         # 由 valid_fx[:-1] 构成的笔
+        self._zs_state: tuple = (0, None, None)
+    
+    def update(self, dt: Any, open_: float, high: float, low: float, close: float):
+        """喂入一根原始K线"""
+        highs, lows = self.highs, self.lows
+        n = len(highs)
+        if n:
+            prev_high, prev_low = highs[-1], lows[-1]
+            if (high <= prev_high and low >= prev_low) or (high >= prev_high and low <= prev_low):
+                # 存在包含关系，合并到最后一根K线
+                if n >= 2:
+                    direction_up = highs[-2] < prev_high
+                else:
+                    direction_up = close > open_
+                if direction_up:
+                    highs[-1] = max(prev_high, high)
+                    lows[-1] = max(prev_low, low)
+                else:
+                    highs[-1] = min(prev_high, high)
+                    lows[-1] = min(prev_low, low)
+                return
+        
+        self.dts.append(dt)
+        highs.append(high)
+        lows.append(low)
+        # 倒数第二根K线已不会再被合并，以倒数第三根为中间K的分型随之确定
+        if n + 1 >= 4:
+            fx = self._fx_at(n - 2)
+            if fx is not None:
+                self._confirm_fx(fx)
+    
+    def _fx_at(self, i: int) -> Optional[FX]:
+        """以第i根(包含处理后)K线为中间K的分型"""
+        h, l = self.highs, self.lows
+        h1, h2, h3 = h[i - 1], h[i], h[i + 1]
+        l1, l2, l3 = l[i - 1], l[i], l[i + 1]
+        if h2 > h1 and h2 > h3:
+            if l2 > l1 and l2 > l3:
+                return FX(dt=self.dts[i], mark=Mark.D, high=h2, low=l2, fx=h2)
+        elif l2 < l1 and l2 < l3:
+            if h2 < h1 and h2 < h3:
+                return FX(dt=self.dts[i], mark=Mark.G, high=h2, low=l2, fx=l2)
+        return None
+    
+    @staticmethod
+    def _fold_fx(valid: List[FX], fx: FX) -> Tuple[bool, bool]:
+        """
+        按 find_bi 的顶底交替规则合并一个新分型
+        
+        Returns:
+            (是否追加, 是否替换最后一个)
+        """
+        if not valid or fx.mark != valid[-1].mark:
+            return True, False
+        if fx.mark == Mark.D and fx.fx > valid[-1].fx:
+            return False, True
+        if fx.mark == Mark.G and fx.fx < valid[-1].fx:
+            return False, True
+        return False, False
+    
+    def _confirm_fx(self, fx: FX):
+        self.last_fx = fx
+        valid = self.valid_fx
+        append, replace = self._fold_fx(valid, fx)
+        if append:
+            if len(valid) >= 2:
+                # 原最后一个分型不会再被替换，它结束的笔随之确定
+                self.stable_bi.append(_make_bi(valid[-2], valid[-1]))
+                self._zs_state = _scan_zhongshu(self.stable_bi, *self._zs_state)
+            valid.append(fx)
+        elif replace:
+            valid[-1] = fx
+    
+    def latest(self) -> Tuple[Optional[FX], Optional[BI], Optional[ZhongShu]]:
+        """当前的最新分型、笔、中枢"""
+        # 以最后一根K线为右侧K的试探分型
+        n = len(self.highs)
+        pending = self._fx_at(n - 2) if n >= 3 else None
+        latest_fx = pending or self.last_fx
+        
+        # 叠加试探分型后有效分型序列的末尾
+        valid = self.valid_fx
+        tail = valid[-2:]
+        if pending is not None:
+            append, replace = self._fold_fx(valid, pending)
+            if append:
+                tail = tail + [pending]
+            elif replace:
+                tail = tail[:-1] + [pending]
+        
+        tail_bi = [_make_bi(a, b) for a, b in zip(tail, tail[1:])]
+        latest_bi = tail_bi[-1] if tail_bi else None
+        
+        # 在已确定笔的中枢断点上续扫末尾的试探笔
+        bis = self.stable_bi
+        size = len(bis)
+        bis.extend(tail_bi)
+        try:
+            _, cur, last = _scan_zhongshu(bis, *self._zs_state)
+        finally:
+            del bis[size:]
+        latest_zs = _zhongshu_from_state(cur) if cur is not None else last
+        
+        return latest_fx, latest_bi, latest_zs
+
+
 class ChanSignalGenerator:
     """
     缠论信号生成器
@@ -429,6 +715,9 @@ class ChanSignalGenerator:
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         生成缠论交易信号
+        
+        每根K线只使用截至该K线的数据判断买卖点（无未来函数），
+        分析状态随K线增量推进，避免对每个窗口重新做完整分析
         """
         df = df.copy()
         df['signal'] = 0
@@ -441,23 +730,37 @@ class ChanSignalGenerator:
         if 'trade_date' in df.columns and not isinstance(df.index, pd.DatetimeIndex):
             df.set_index('trade_date', inplace=True)
         
-        # 滑动窗口分析
+        if not {'open', 'high', 'low', 'close'}.issubset(df.columns):
+            return df
+        
+        n = len(df)
+        signals = np.zeros(n, dtype=np.int8)
+        signal_types = np.empty(n, dtype=object)
+        signal_types[:] = ''
+        
+        opens = df['open'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        
+        # 前 window_size 根K线只积累状态，不出信号
         window_size = 30
-        for i in range(window_size, len(df)):
-            window = df.iloc[:i+1].copy()
+        state = _IncrementalChan()
+        for i, dt in enumerate(df.index):
+            state.update(dt, opens[i], highs[i], lows[i], closes[i])
+            if i < window_size:
+                continue
             
-            try:
-                result = self.analyzer.get_bs_point(window)
-                
-                if result['signal'] == 1:
-                    df.iloc[i, df.columns.get_loc('signal')] = 1
-                    df.iloc[i, df.columns.get_loc('signal_type')] = result['signal_type']
-                elif result['signal'] == -1:
-                    df.iloc[i, df.columns.get_loc('signal')] = -1
-                    df.iloc[i, df.columns.get_loc('signal_type')] = result['signal_type']
-            except Exception as e:
-                pass
+            fx, bi, zs = state.latest()
+            if fx is None or bi is None:
+                continue
+            signal, signal_type, _ = self.analyzer.match_bs_point(fx, bi, zs, closes[i])
+            if signal != 0:
+                signals[i] = signal
+                signal_types[i] = signal_type
         
+        df['signal'] = signals
+        df['signal_type'] = signal_types
         return df
 
 
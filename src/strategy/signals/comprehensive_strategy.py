@@ -13,6 +13,8 @@ warnings.filterwarnings('ignore')
 
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -22,9 +24,18 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from src.utils.logger import get_logger
+from src.utils.jit import njit
+from src.utils.cache import TTLCache
 
 logger = get_logger(__name__)
 
+# 尝试导入polars (长历史数据的综合信号加速)
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
 
 # ==================== CZSC 经典K线策略 ====================
 
@@ -45,35 +56,29 @@ class CZSCBarSignals:
         - 突破卖出价 = 昨低 - 2*(昨高 - 昨中)
         """
         df = df.copy()
-        df['r_signal'] = 0
-        df['r_type'] = ''
-        
-        for i in range(1, len(df)):
-            H = df.iloc[i-1]['high']
-            C = df.iloc[i-1]['close']
-            L = df.iloc[i-1]['low']
-            P = (H + C + L) / 3  # 昨中
-            
-            break_buy = H + 2 * P - 2 * L
-            see_sell = P + H - L
-            verse_sell = 2 * P - L
-            verse_buy = 2 * P - H
-            see_buy = P - (H - L)
-            break_sell = L - 2 * (H - P)
-            
-            curr = df.iloc[i]
-            if curr['close'] > break_buy:
-                df.iloc[i, df.columns.get_loc('r_signal')] = 1
-                df.iloc[i, df.columns.get_loc('r_type')] = '趋势做多'
-            elif curr['close'] < break_sell:
-                df.iloc[i, df.columns.get_loc('r_signal')] = -1
-                df.iloc[i, df.columns.get_loc('r_type')] = '趋势做空'
-            elif curr['high'] > see_sell and curr['close'] < verse_sell:
-                df.iloc[i, df.columns.get_loc('r_signal')] = -1
-                df.iloc[i, df.columns.get_loc('r_type')] = '反转做空'
-            elif curr['low'] < see_buy and curr['close'] > verse_buy:
-                df.iloc[i, df.columns.get_loc('r_signal')] = 1
-                df.iloc[i, df.columns.get_loc('r_type')] = '反转做多'
+        
+        H = df['high'].shift(1)
+        C = df['close'].shift(1)
+        L = df['low'].shift(1)
+        P = (H + C + L) / 3  # 昨中
+        
+        break_buy = H + 2 * P - 2 * L
+        see_sell = P + H - L
+        verse_sell = 2 * P - L
+        verse_buy = 2 * P - H
+        see_buy = P - (H - L)
+        break_sell = L - 2 * (H - P)
+        
+        close, high, low = df['close'], df['high'], df['low']
+        # 按优先级排列，np.select 取第一个成立的条件 (首行昨日价为NaN，条件均不成立)
+        conditions = [
+            close > break_buy,
+            close < break_sell,
+            (high > see_sell) & (close < verse_sell),
+            (low < see_buy) & (close > verse_buy),
+        ]
+        df['r_signal'] = np.select(conditions, [1, -1, -1, 1], default=0)
+        df['r_type'] = np.select(conditions, ['趋势做多', '趋势做空', '反转做空', '反转做多'], default='')
         
         return df
     
@@ -87,24 +92,20 @@ class CZSCBarSignals:
         Range = max(HH-LC, HC-LL)
         """
         df = df.copy()
-        df['dt_signal'] = 0
-        
-        for i in range(n, len(df)):
-            bars = df.iloc[i-n:i]
-            HH = bars['high'].max()
-            HC = bars['close'].max()
-            LC = bars['close'].min()
-            LL = bars['low'].min()
-            Range = max(HH - LC, HC - LL)
-            
-            curr = df.iloc[i]
-            buy_line = curr['open'] + Range * k1
-            sell_line = curr['open'] - Range * k2
-            
-            if curr['close'] > buy_line:
-                df.iloc[i, df.columns.get_loc('dt_signal')] = 1
-            elif curr['close'] < sell_line:
-                df.iloc[i, df.columns.get_loc('dt_signal')] = -1
+        
+        # 前n根K线(不含当根)的极值
+        HH = df['high'].rolling(n).max().shift(1)
+        HC = df['close'].rolling(n).max().shift(1)
+        LC = df['close'].rolling(n).min().shift(1)
+        LL = df['low'].rolling(n).min().shift(1)
+        Range = np.maximum(HH - LC, HC - LL)
+        
+        buy_line = df['open'] + Range * k1
+        sell_line = df['open'] - Range * k2
+        
+        # 前n根K线Range为NaN，不产生信号
+        close = df['close']
+        df['dt_signal'] = np.where(close > buy_line, 1, np.where(close < sell_line, -1, 0))
         
         return df
     
@@ -126,26 +127,23 @@ class CZSCBarSignals:
         
         df['pct_change'] = df['close'].pct_change()
         
-        for i in range(3, len(df)):
-            b4 = df.iloc[i-3]
-            b3 = df.iloc[i-2]
-            b2 = df.iloc[i-1]
-            b1 = df.iloc[i]
-            
-            # 前天涨停 (涨幅>7%且几乎无上影线)
-            first_zt = (b3['close'] / b4['close'] - 1) > 0.07 and b3['close'] == b3['high']
-            
-            # 昨天收阴，跌幅>5%
-            bar2_down = b2['close'] < b2['open'] and (b2['close'] / b3['close'] - 1) < -0.05
-            
-            # 今天涨停
-            last_zt = (b1['close'] / b2['close'] - 1) > 0.07
-            
-            # 今天收盘价高于昨天最高价
-            close_above = b1['close'] > b2['high']
-            
-            if first_zt and bar2_down and last_zt and close_above:
-                df.iloc[i, df.columns.get_loc('shuangfei')] = True
+        c, o, h = df['close'], df['open'], df['high']
+        c1, c2, c3 = c.shift(1), c.shift(2), c.shift(3)
+        
+        # 前天涨停 (涨幅>7%且几乎无上影线)
+        first_zt = (c2 / c3 - 1 > 0.07) & (c2 == h.shift(2))
+        
+        # 昨天收阴，跌幅>5%
+        bar2_down = (c1 < o.shift(1)) & (c1 / c2 - 1 < -0.05)
+        
+        # 今天涨停
+        last_zt = c / c1 - 1 > 0.07
+        
+        # 今天收盘价高于昨天最高价
+        close_above = c > h.shift(1)
+        
+        # 前3根K线移位后为NaN，比较结果均为False
+        df['shuangfei'] = first_zt & bar2_down & last_zt & close_above
         
         return df
     
@@ -165,22 +163,19 @@ class CZSCBarSignals:
         if len(df) < 3:
             return df
         
-        for i in range(2, len(df)):
-            b1 = df.iloc[i-2]
-            b2 = df.iloc[i-1]
-            b3 = df.iloc[i]
-            
-            # 昨天跌停
-            b2_limit_down = b2['low'] == b2['close'] and (b2['close'] / b1['close'] - 1) < -0.09
-            
-            # 今天阳线反包
-            b3_yang = b3['close'] > b3['open']
-            b3_solid = b3['close'] - b3['open']
-            b3_lower = b3['open'] - b3['low']
-            b3_no_lower = b3_lower < b3_solid * 0.1  # 无下影线
-            
-            if b2_limit_down and b3_yang and b3_no_lower and b3['close'] > b2['high']:
-                df.iloc[i, df.columns.get_loc('ld_reverse')] = True
+        c, o, h, l = df['close'], df['open'], df['high'], df['low']
+        c1 = c.shift(1)
+        
+        # 昨天跌停
+        b2_limit_down = (l.shift(1) == c1) & (c1 / c.shift(2) - 1 < -0.09)
+        
+        # 今天阳线反包
+        b3_yang = c > o
+        b3_solid = c - o
+        b3_lower = o - l
+        b3_no_lower = b3_lower < b3_solid * 0.1  # 无下影线
+        
+        df['ld_reverse'] = b2_limit_down & b3_yang & b3_no_lower & (c > h.shift(1))
         
         return df
     
@@ -193,20 +188,75 @@ class CZSCBarSignals:
         TNR越大趋势越明显，越小震荡越强
         """
         df = df.copy()
-        df['tnr'] = 0.0
         
-        for i in range(period, len(df)):
-            bars = df.iloc[i-period:i+1]
-            sum_abs = sum(abs(bars['close'].iloc[j] - bars['close'].iloc[j-1]) for j in range(1, len(bars)))
-            if sum_abs > 0:
-                tnr = abs(bars['close'].iloc[-1] - bars['close'].iloc[0]) / sum_abs
-                df.iloc[i, df.columns.get_loc('tnr')] = tnr
+        close = df['close'].to_numpy(dtype=np.float64)
+        tnr = np.zeros(len(close))
+        
+        if len(close) > period:
+            # 相邻差绝对值的前缀和，窗口 [i-period, i] 内的和 = S[i] - S[i-period]；
+            # 含缺失收盘价的窗口路径长度不完整，与rolling().sum()一致记为0
+            steps = np.abs(np.diff(close))
+            missing = np.isnan(steps)
+            S = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, steps))))
+            M = np.concatenate(([0], np.cumsum(missing)))
+            denom = S[period:] - S[:-period]
+            valid = (M[period:] - M[:-period]) == 0
+            num = np.abs(close[period:] - close[:-period])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tnr[period:] = np.where(valid & (denom > 0), num / denom, 0.0)
+        
+        df['tnr'] = np.nan_to_num(tnr, nan=0.0)
         
         return df
 
 
 # ==================== 技术面评分系统 ====================
 
+def cached_ewm(df: pd.DataFrame, span: int, column: str = 'close') -> pd.Series:
+    """
+    DataFrame某列的EWM均线 (ewm(span).mean())，相同数据重复请求时复用
+    
+    以 (列值内容摘要, span) 为键缓存，与DataFrame身份无关：
+    副本、重新加载的同一份K线均可命中，原地修改任意一行后摘要随之改变。
+    """
+    series = df[column]
+    values = series.to_numpy(dtype=np.float64)
+    key = (hashlib.blake2b(values.tobytes(), digest_size=16).digest(), span)
+    ewm = _EWM_CACHE.get(key)
+    if ewm is None:
+        ewm = pd.Series(values).ewm(span=span).mean().to_numpy()
+        _EWM_CACHE.set(key, ewm)
+    return pd.Series(ewm, index=series.index, name=series.name, copy=True)
+
+
+@njit(cache=True)
+def _wilder_rsi_last(closes, period):
+    """
+    Wilder平滑 (等价于 ewm(alpha=1/period, adjust=False)) 的RSI，只返回最后一个值
+    
+    平均跌幅为0时返回NaN，与 loss.replace(0, nan) 的处理一致
+    """
+    avg_gain = np.nan
+    avg_loss = np.nan
+    alpha = 1.0 / period
+    for i in range(1, len(closes)):
+        delta = closes[i] - closes[i - 1]
+        if np.isnan(delta):
+            continue
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if np.isnan(avg_gain):
+            avg_gain = gain
+            avg_loss = loss
+        else:
+            avg_gain += (gain - avg_gain) * alpha
+            avg_loss += (loss - avg_loss) * alpha
+    
+    if np.isnan(avg_loss) or avg_loss == 0:
+        return np.nan
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
 class TechnicalScorer:
     """技术面评分系统 (0-100)"""
     
@@ -242,20 +292,27 @@ class TechnicalScorer:
         
         self.weights = default_weights
     
+    @staticmethod
+    def _columns(df: pd.DataFrame, *names: str) -> List[np.ndarray]:
+        """取出若干列的float64数组"""
+        return [df[name].to_numpy(dtype=np.float64) for name in names]
+    
     def calculate_ma_score(self, df: pd.DataFrame) -> float:
         """均线系统评分"""
         if len(df) < 60:
             return 50.0
-        
+        return self._ma_score(*self._columns(df, 'close'))
+    
+    @staticmethod
+    def _ma_score(close: np.ndarray) -> float:
         score = 50.0
-        latest = df.iloc[-1]
-        close = latest['close']
+        latest_close = close[-1]
         
-        # 计算均线
-        ma5 = df['close'].rolling(5).mean().iloc[-1]
-        ma10 = df['close'].rolling(10).mean().iloc[-1]
-        ma20 = df['close'].rolling(20).mean().iloc[-1]
-        ma60 = df['close'].rolling(60).mean().iloc[-1]
+        # 计算均线 (只需最后一个值，直接对尾部求均值)
+        ma5 = close[-5:].mean()
+        ma10 = close[-10:].mean()
+        ma20 = close[-20:].mean()
+        ma60 = close[-60:].mean()
         
         # 多头排列加分
         if ma5 > ma10 > ma20 > ma60:
@@ -266,11 +323,11 @@ class TechnicalScorer:
             score += 10
         
         # 价格在均线上方加分
-        if close > ma5:
+        if latest_close > ma5:
             score += 5
-        if close > ma20:
+        if latest_close > ma20:
             score += 5
-        if close > ma60:
+        if latest_close > ma60:
             score += 10
         
         return min(100, max(0, score))
@@ -279,27 +336,30 @@ class TechnicalScorer:
         """MACD评分"""
         if len(df) < 35:
             return 50.0
-        
+        return self._macd_score(df)
+    
+    @staticmethod
+    def _macd_score(df: pd.DataFrame) -> float:
         score = 50.0
         
         # 计算MACD
-        exp12 = df['close'].ewm(span=12).mean()
-        exp26 = df['close'].ewm(span=26).mean()
-        dif = exp12 - exp26
-        dea = dif.ewm(span=9).mean()
+        exp12 = cached_ewm(df, 12)
+        exp26 = cached_ewm(df, 26)
+        dif = (exp12 - exp26).to_numpy()
+        dea = pd.Series(dif).ewm(span=9).mean().to_numpy()
         macd = (dif - dea) * 2
         
-        latest_dif = dif.iloc[-1]
-        latest_dea = dea.iloc[-1]
-        latest_macd = macd.iloc[-1]
-        prev_macd = macd.iloc[-2]
+        latest_dif = dif[-1]
+        latest_dea = dea[-1]
+        latest_macd = macd[-1]
+        prev_macd = macd[-2]
         
         # DIF在DEA上方
         if latest_dif > latest_dea:
             score += 15
         
         # 金叉
-        if dif.iloc[-2] < dea.iloc[-2] and latest_dif > latest_dea:
+        if dif[-2] < dea[-2] and latest_dif > latest_dea:
             score += 20
         
         # MACD柱放大
@@ -316,16 +376,14 @@ class TechnicalScorer:
         """RSI评分"""
         if len(df) < period + 1:
             return 50.0
+        return self._rsi_score(*self._columns(df, 'close'), period=period)
+    
+    @staticmethod
+    def _rsi_score(close: np.ndarray, period: int = 14) -> float:
+        # Wilder平滑RSI，直接在收盘价数组上递推出最后一个值
+        latest_rsi = _wilder_rsi_last(close, period)
         
-        delta = df['close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-        rs = gain / loss.replace(0, np.nan)
-        rsi = 100 - (100 / (1 + rs))
-        
-        latest_rsi = rsi.iloc[-1]
-        
-        if pd.isna(latest_rsi):
+        if np.isnan(latest_rsi):
             return 50.0
         
         # RSI评分逻辑
@@ -346,12 +404,14 @@ class TechnicalScorer:
         """量能评分"""
         if len(df) < 20:
             return 50.0
-        
+        return self._volume_score(*self._columns(df, 'close', 'volume'))
+    
+    @staticmethod
+    def _volume_score(close: np.ndarray, volume: np.ndarray) -> float:
         score = 50.0
         
-        vol_ma5 = df['volume'].rolling(5).mean().iloc[-1]
-        vol_ma20 = df['volume'].rolling(20).mean().iloc[-1]
-        latest_vol = df['volume'].iloc[-1]
+        vol_ma20 = volume[-20:].mean()
+        latest_vol = volume[-1]
         
         # 量比
         if vol_ma20 > 0:
@@ -365,8 +425,8 @@ class TechnicalScorer:
                 score -= 10  # 缩量
         
         # 价涨量增
-        price_up = df['close'].iloc[-1] > df['close'].iloc[-2]
-        vol_up = latest_vol > df['volume'].iloc[-2]
+        price_up = close[-1] > close[-2]
+        vol_up = latest_vol > volume[-2]
         
         if price_up and vol_up:
             score += 15
@@ -379,11 +439,14 @@ class TechnicalScorer:
         """趋势评分"""
         if len(df) < 20:
             return 50.0
-        
+        return self._trend_score(*self._columns(df, 'close', 'high'))
+    
+    @staticmethod
+    def _trend_score(close: np.ndarray, high: np.ndarray) -> float:
         score = 50.0
         
         # 20日涨幅
-        pct_20 = (df['close'].iloc[-1] / df['close'].iloc[-20] - 1) * 100
+        pct_20 = (close[-1] / close[-20] - 1) * 100
         
         if pct_20 > 20:
             score += 30
@@ -397,53 +460,62 @@ class TechnicalScorer:
             score -= 10
         
         # 新高
-        high_20 = df['high'].rolling(20).max().iloc[-1]
-        if df['close'].iloc[-1] >= high_20 * 0.98:
+        high_20 = high[-20:].max()
+        if close[-1] >= high_20 * 0.98:
             score += 15
         
         return min(100, max(0, score))
     
     def calculate_pattern_score(self, df: pd.DataFrame) -> float:
         """形态评分"""
-        score = 50.0
-        
         if len(df) < 5:
-            return score
+            return 50.0
+        return self._pattern_score(*self._columns(df, 'open', 'high', 'low', 'close'))
+    
+    @staticmethod
+    def _pattern_score(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> float:
+        score = 50.0
         
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
+        latest_open, latest_high, latest_low, latest_close = open_[-1], high[-1], low[-1], close[-1]
         
         # 阳线加分
-        if latest['close'] > latest['open']:
+        if latest_close > latest_open:
             score += 10
         
         # 突破前高
-        if latest['close'] > prev['high']:
+        if latest_close > high[-2]:
             score += 10
         
         # K线实体大
-        body = abs(latest['close'] - latest['open'])
-        total = latest['high'] - latest['low']
+        body = abs(latest_close - latest_open)
+        total = latest_high - latest_low
         if total > 0 and body / total > 0.7:
             score += 10
         
         # 收在高位
         if total > 0:
-            position = (latest['close'] - latest['low']) / total
+            position = (latest_close - latest_low) / total
             if position > 0.8:
                 score += 10
         
         return min(100, max(0, score))
     
     def calculate_total_score(self, df: pd.DataFrame) -> Dict[str, float]:
-        """计算综合评分"""
+        """
+        计算综合评分
+        
+        各列只转换一次为数组，各项评分共用，且只对所需的尾部窗口做归约
+        """
+        n = len(df)
+        open_, high, low, close, volume = self._columns(df, 'open', 'high', 'low', 'close', 'volume')
+        
         scores = {
-            'ma_score': self.calculate_ma_score(df),
-            'macd_score': self.calculate_macd_score(df),
-            'rsi_score': self.calculate_rsi_score(df),
-            'volume_score': self.calculate_volume_score(df),
-            'trend_score': self.calculate_trend_score(df),
-            'pattern_score': self.calculate_pattern_score(df),
+            'ma_score': self._ma_score(close) if n >= 60 else 50.0,
+            'macd_score': self._macd_score(df) if n >= 35 else 50.0,
+            'rsi_score': self._rsi_score(close) if n >= 15 else 50.0,
+            'volume_score': self._volume_score(close, volume) if n >= 20 else 50.0,
+            'trend_score': self._trend_score(close, high) if n >= 20 else 50.0,
+            'pattern_score': self._pattern_score(open_, high, low, close) if n >= 5 else 50.0,
         }
         
         total = sum(scores[k] * self.weights[k] for k in scores)
@@ -468,15 +540,132 @@ class TechnicalScorer:
 
 # ==================== 综合策略生成器 ====================
 
+class ComprehensiveSignalGeneratorPolars:
+    """
+    综合策略信号生成器 (Polars实现)
+    
+    与 ComprehensiveSignalGenerator 的形态信号和综合信号逐行一致，
+    全部以表达式在多线程的Polars引擎中计算，适合百万行级的长历史回测
+    """
+    
+    def generate_signals(self, df: 'pl.DataFrame', n: int = 5, k1: float = 0.5, k2: float = 0.5,
+                         period: int = 14) -> 'pl.DataFrame':
+        """
+        在包含 open/high/low/close 列的 pl.DataFrame 上追加信号列
+        
+        Args:
+            n, k1, k2: Dual Thrust 参数
+            period: TNR 周期
+        """
+        o, h, l, c = pl.col('open'), pl.col('high'), pl.col('low'), pl.col('close')
+        
+        # R-Breaker
+        H, C, L = h.shift(1), c.shift(1), l.shift(1)
+        P = (H + C + L) / 3
+        r_rules = [
+            (c > H + 2 * P - 2 * L, 1, '趋势做多'),
+            (c < L - 2 * (H - P), -1, '趋势做空'),
+            ((h > P + H - L) & (c < 2 * P - L), -1, '反转做空'),
+            ((l < P - (H - L)) & (c > 2 * P - H), 1, '反转做多'),
+        ]
+        r_signal = pl.when(r_rules[0][0]).then(r_rules[0][1])
+        r_type = pl.when(r_rules[0][0]).then(pl.lit(r_rules[0][2]))
+        for cond, value, label in r_rules[1:]:
+            r_signal = r_signal.when(cond).then(value)
+            r_type = r_type.when(cond).then(pl.lit(label))
+        
+        # Dual Thrust
+        rng = pl.max_horizontal(
+            h.rolling_max(n).shift(1) - c.rolling_min(n).shift(1),
+            c.rolling_max(n).shift(1) - l.rolling_min(n).shift(1),
+        )
+        dt_signal = pl.when(c > o + rng * k1).then(1).when(c < o - rng * k2).then(-1).otherwise(0)
+        
+        # 双飞涨停
+        c1, c2, c3 = c.shift(1), c.shift(2), c.shift(3)
+        shuangfei = ((c2 / c3 - 1 > 0.07) & (c2 == h.shift(2))
+                     & (c1 < o.shift(1)) & (c1 / c2 - 1 < -0.05)
+                     & (c / c1 - 1 > 0.07) & (c > h.shift(1)))
+        
+        # 跌停反转
+        ld_reverse = ((l.shift(1) == c1) & (c1 / c2 - 1 < -0.09)
+                      & (c > o) & (o - l < (c - o) * 0.1) & (c > h.shift(1)))
+        
+        # TNR: 相邻差绝对值前缀和的窗口差，含缺失收盘价的窗口记为0
+        steps = c.diff().abs().fill_nan(None)
+        S = steps.fill_null(0.0).cum_sum()
+        M = steps.is_null().cast(pl.Int32).cum_sum()
+        denom = S - S.shift(period)
+        valid = (M - M.shift(period)) == 0
+        tnr = pl.when(valid & (denom > 0)).then((c - c.shift(period)).abs() / denom).otherwise(0.0)
+        
+        columns = [
+            r_signal.otherwise(0).cast(pl.Int8).alias('r_signal'),
+            r_type.otherwise(pl.lit('')).alias('r_type'),
+            dt_signal.cast(pl.Int8).alias('dt_signal'),
+            shuangfei.fill_null(False).alias('shuangfei'),
+        ]
+        if df.height >= 4:
+            columns.append(c.pct_change().alias('pct_change'))
+        columns += [
+            ld_reverse.fill_null(False).alias('ld_reverse'),
+            tnr.fill_null(0.0).fill_nan(0.0).alias('tnr'),
+        ]
+        df = df.with_columns(columns)
+        
+        # 综合信号
+        triggers = [
+            (pl.col('r_signal') == 1, 'R-Breaker', 0.3),
+            (pl.col('dt_signal') == 1, '通道突破', 0.3),
+            (pl.col('shuangfei'), '双飞涨停', 0.5),
+            (pl.col('ld_reverse'), '跌停反转', 0.4),
+            (pl.col('tnr') > 0.5, '强趋势', 0.2),
+        ]
+        total_score = pl.sum_horizontal([pl.when(cond).then(weight).otherwise(0.0)
+                                         for cond, _, weight in triggers])
+        labels = pl.concat_str([pl.when(cond).then(pl.lit(label)) for cond, label, _ in triggers],
+                               separator='+', ignore_nulls=True)
+        hit = (pl.int_range(pl.len()) >= 5) & (total_score >= 0.3)
+        
+        return df.with_columns(
+            pl.when(hit).then(1).otherwise(0).cast(pl.Int8).alias('signal'),
+            pl.when(hit).then(labels).otherwise(pl.lit('')).alias('signal_type'),
+        )
+    
+    @staticmethod
+    def to_pandas(df: 'pl.DataFrame', index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """转换为与pandas实现相同列类型的DataFrame，供下游沿用"""
+        pdf = df.to_pandas()
+        if index is not None:
+            pdf.index = index
+        pdf['r_type'] = pdf['r_type'].astype(R_TYPE_DTYPE)
+        pdf['signal_type'] = pdf['signal_type'].astype('category')
+        return pdf
+
+
 class ComprehensiveSignalGenerator:
     """综合策略信号生成器"""
     
-    def __init__(self):
+    def __init__(self, backend: str = 'pandas'):
+        """
+        Args:
+            backend: 'pandas' 或 'polars'，polars未安装时退回pandas
+        """
         self.bar_signals = CZSCBarSignals()
         self.scorer = TechnicalScorer()
+        
+        self.polars = None
+        if backend == 'polars':
+            if POLARS_AVAILABLE:
+                self.polars = ComprehensiveSignalGeneratorPolars()
+            else:
+                logger.warning("polars未安装，综合信号使用pandas实现")
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
         """生成综合交易信号"""
+        if self.polars is not None:
+            return self._generate_signals_polars(df)
+        
         df = df.copy()
         
         # 应用各种策略
@@ -486,51 +675,77 @@ class ComprehensiveSignalGenerator:
         df = self.bar_signals.limit_down_reverse(df)
         df = self.bar_signals.tnr_trend(df)
         
-        # 综合信号
-        df['signal'] = 0
-        df['signal_type'] = ''
+        # 信号列取值很少，压缩为int8/分类类型
+        df['r_signal'] = df['r_signal'].astype(np.int8)
+        df['dt_signal'] = df['dt_signal'].astype(np.int8)
+        df['r_type'] = df['r_type'].astype(R_TYPE_DTYPE)
+        
+        # 综合信号: 各触发列一次取出为数组，逐行只做标量比较
+        n = len(df)
+        sig_arr = np.zeros(n, dtype=np.int8)
+        type_arr = np.empty(n, dtype=object)
+        type_arr[:] = ''
         
-        for i in range(5, len(df)):
+        r_signal = df['r_signal'].to_numpy()
+        dt_signal = df['dt_signal'].to_numpy()
+        shuangfei = df['shuangfei'].to_numpy()
+        ld_reverse = df['ld_reverse'].to_numpy()
+        tnr = df['tnr'].to_numpy()
+        
+        for i in range(5, n):
             signals = []
             
             # R-Breaker信号
-            if df.iloc[i]['r_signal'] == 1:
+            if r_signal[i] == 1:
                 signals.append(('R-Breaker', 0.3))
             
             # Dual Thrust信号
-            if df.iloc[i]['dt_signal'] == 1:
+            if dt_signal[i] == 1:
                 signals.append(('通道突破', 0.3))
             
             # 双飞涨停
-            if df.iloc[i]['shuangfei']:
+            if shuangfei[i]:
                 signals.append(('双飞涨停', 0.5))
             
             # 跌停反转
-            if df.iloc[i]['ld_reverse']:
+            if ld_reverse[i]:
                 signals.append(('跌停反转', 0.4))
             
             # TNR趋势
-            if df.iloc[i]['tnr'] > 0.5:
+            if tnr[i] > 0.5:
                 signals.append(('强趋势', 0.2))
             
             if signals:
                 total_score = sum(s[1] for s in signals)
                 if total_score >= 0.3:
-                    df.iloc[i, df.columns.get_loc('signal')] = 1
-                    df.iloc[i, df.columns.get_loc('signal_type')] = '+'.join([s[0] for s in signals])
+                    sig_arr[i] = 1
+                    type_arr[i] = '+'.join([s[0] for s in signals])
+        
+        df['signal'] = sig_arr
+        df['signal_type'] = pd.Categorical(type_arr)
         
         return df
     
+    def _generate_signals_polars(self, df: pd.DataFrame) -> pd.DataFrame:
+        """用Polars计算信号列，再拼回原DataFrame (保留索引和其他列)"""
+        cols = ['open', 'high', 'low', 'close']
+        result = self.polars.generate_signals(pl.from_pandas(df[cols].astype(np.float64)))
+        signals = self.polars.to_pandas(result.drop(cols), index=df.index)
+        
+        df = df.copy()
+        df[list(signals.columns)] = signals
+        return df
+    
     def analyze(self, df: pd.DataFrame) -> Dict[str, Any]:
         """综合分析"""
-        # 生成信号
-        df = self.generate_signals(df)
-        
-        # 技术评分
+        # 技术评分 (只读取OHLCV列，直接使用调用方的DataFrame)
         scores = self.scorer.calculate_total_score(df)
         
+        # 生成信号
+        signals = self.generate_signals(df)
+        
         # 最新状态
-        latest = df.iloc[-1]
+        latest = signals.iloc[-1]
         
         result = {
             'scores': scores,
@@ -544,6 +759,43 @@ class ComprehensiveSignalGenerator:
         
         return result
 
+    
+    def analyze_many(self, dfs: Dict[str, pd.DataFrame],
+                     max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量综合分析多只股票
+        
+        各股票的分析互不依赖，且主要耗时在释放GIL的numpy/pandas运算上，用线程池并发执行
+        
+        Args:
+            dfs: {股票代码: K线数据}
+            max_workers: 线程数，默认 min(股票数, CPU核数)
+            
+        Returns:
+            {股票代码: analyze结果}，分析失败的股票不在结果中
+        """
+        if not dfs:
+            return {}
+        
+        workers = max_workers or min(len(dfs), os.cpu_count() or 1)
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {code: executor.submit(self.analyze, df) for code, df in dfs.items()}
+            for code, future in futures.items():
+                try:
+                    results[code] = future.result()
+                except Exception as e:
+                    logger.warning(f"{code} 综合分析失败: {e}")
+        
+        return results
+
+
+# EWM均线缓存 (cached_ewm)
+_EWM_CACHE = TTLCache(maxsize=256, ttl=60)
+
+# R-Breaker 信号标签
+R_TYPE_DTYPE = pd.CategoricalDtype(['', '趋势做多', '趋势做空', '反转做空', '反转做多'])
+
 
 # 创建全局实例
 czsc_bar_signals = CZSCBarSignals()
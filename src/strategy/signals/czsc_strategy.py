@@ -3,6 +3,8 @@
 CZSC (缠中说禅) 策略集成模块
 """
 
+import hashlib
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -10,6 +12,7 @@ from typing import List, Dict, Any, Optional
 import pandas as pd
 import numpy as np
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 import sys
 import os
@@ -58,6 +61,9 @@ class CZSCStrategy:
     
     def __init__(self):
         self.czsc_available = CZSC_AVAILABLE
+        # get_bs_signals结果缓存 (LRU): (周期, K线数, K线内容哈希) -> 结果
+        self._bs_cache: OrderedDict = OrderedDict()
+        self._bs_cache_lock = threading.Lock()
     
     def df_to_raw_bars(self, df: pd.DataFrame, freq: str = 'D') -> List:
         """
@@ -79,26 +85,28 @@ class CZSCStrategy:
             '1': Freq.F1,
         }
         
-        bars = []
-        for idx, row in df.iterrows():
-            dt = idx if isinstance(idx, pd.Timestamp) else row.get('trade_date')
-            if not isinstance(dt, pd.Timestamp):
-                dt = pd.Timestamp(dt)
-            
-            bar = RawBar(
-                symbol="",
-                dt=dt,
-                open=float(row.get('open', 0)),
-                high=float(row.get('high', 0)),
-                low=float(row.get('low', 0)),
-                close=float(row.get('close', 0)),
-                vol=float(row.get('volume', 0)),
-                amount=float(row.get('amount', 0)),
-                freq=freq_map.get(freq, Freq.D)
-            )
-            bars.append(bar)
-        
-        return bars
+        n = len(df)
+        
+        # 时间取索引，非时间索引时取trade_date列
+        if isinstance(df.index, pd.DatetimeIndex):
+            dts = df.index
+        elif 'trade_date' in df.columns:
+            dts = pd.DatetimeIndex(pd.to_datetime(df['trade_date']))
+        else:
+            dts = pd.DatetimeIndex(pd.to_datetime(df.index))
+        
+        def column(name: str) -> list:
+            if name in df.columns:
+                return df[name].to_numpy(dtype=np.float64).tolist()
+            return [0.0] * n
+        
+        bar_freq = freq_map.get(freq, Freq.D)
+        return [
+            RawBar(symbol="", dt=dt, open=o, high=h, low=l, close=c, vol=v, amount=a, freq=bar_freq)
+            for dt, o, h, l, c, v, a in zip(
+                dts, column('open'), column('high'), column('low'), column('close'),
+                column('volume'), column('amount'))
+        ]
     
     def analyze(self, df: pd.DataFrame, freq: str = 'D') -> Dict[str, Any]:
         """
@@ -201,23 +209,51 @@ class CZSCStrategy:
         except:
             return {}
     
-    def get_bs_signals(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def get_bs_signals(self, df: pd.DataFrame, freq: str = 'D') -> Dict[str, Any]:
         """
         获取买卖点信号
         
+        Args:
+            df: K线数据
+            freq: K线周期
+            
         Returns:
             买卖点信号字典
         """
         if not self.czsc_available:
             return {'error': 'CZSC库未安装'}
         
-        bars = self.df_to_raw_bars(df)
+        # 同一段K线重复调用时直接返回缓存结果，避免重建CZSC
+        key = self._bars_key(df, freq)
+        with self._bs_cache_lock:
+            cached = self._bs_cache.get(key)
+            if cached is not None:
+                self._bs_cache.move_to_end(key)
+                return dict(cached)
+        
+        bars = self.df_to_raw_bars(df, freq)
         if not bars:
             return {'error': '数据转换失败'}
         
-        c = CZSC(bars)
+        result = self._bs_result(CZSC(bars))
+        
+        with self._bs_cache_lock:
+            self._bs_cache[key] = result
+            if len(self._bs_cache) > BS_CACHE_MAXSIZE:
+                self._bs_cache.popitem(last=False)
         
-        # 分析最新状态
+        return dict(result)
+    
+    @staticmethod
+    def _bars_key(df: pd.DataFrame, freq: str) -> tuple:
+        """缓存键: 周期、K线数及索引和OHLCV内容的哈希 (内容相同的K线才共享结果)"""
+        columns = [c for c in ('trade_date', 'open', 'high', 'low', 'close', 'volume', 'amount') if c in df.columns]
+        row_hashes = pd.util.hash_pandas_object(df[columns], index=True).to_numpy()
+        return freq, len(df), hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _bs_result(c) -> Dict[str, Any]:
+        """根据CZSC对象的最新笔和分型给出买卖点信号"""
         result = {
             'latest_bi_direction': None,
             'latest_fx_mark': None,
@@ -271,26 +307,91 @@ class CZSCSignalGenerator:
         if len(df) < 30:
             return df
         
-        # 使用滑动窗口生成信号
-        for i in range(30, len(df)):
-            window = df.iloc[:i+1].copy()
-            
+        # RawBar只构造一次，CZSC对象逐根update增量推进，
+        # 第i根K线时的状态与用前i+1根K线新建的CZSC一致
+        bars = self.strategy.df_to_raw_bars(df)
+        signals = df['signal'].to_numpy(copy=True)
+        window_size = 30
+        c = None
+        for i in range(window_size, len(bars)):
             try:
-                result = self.strategy.get_bs_signals(window)
-                
-                if result.get('suggestion') == 'buy_warning':
-                    # 下降笔末端 + 底分型 = 买入信号
-                    if result.get('latest_fx_mark') == 'G':  # 底分型
-                        df.iloc[i, df.columns.get_loc('signal')] = 1
-                
-                elif result.get('suggestion') == 'sell_warning':
-                    # 上升笔末端 + 顶分型 = 卖出信号
-                    if result.get('latest_fx_mark') == 'D':  # 顶分型
-                        df.iloc[i, df.columns.get_loc('signal')] = -1
+                if c is None:
+                    c = CZSC(bars[:i+1])
+                else:
+                    c.update(bars[i])
             except Exception as e:
-                pass
+                # 状态可能已不完整，下一根K线时重建
+                c = None
+                continue
+            
+            result = self.strategy._bs_result(c)
+            
+            if result.get('suggestion') == 'buy_warning':
+                # 下降笔末端 + 底分型 = 买入信号
+                if result.get('latest_fx_mark') == 'G':  # 底分型
+                    signals[i] = 1
+            
+            elif result.get('suggestion') == 'sell_warning':
+                # 上升笔末端 + 顶分型 = 卖出信号
+                if result.get('latest_fx_mark') == 'D':  # 顶分型
+                    signals[i] = -1
         
+        df['signal'] = signals
         return df
+    
+    def generate_signals_batch(self, dfs: Dict[str, pd.DataFrame],
+                               max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        批量生成多只股票的CZSC信号
+        
+        CZSC分析是持有GIL的纯Python运算，用进程池并行；子进程只接收numpy数组，
+        只回传信号数组
+        
+        Args:
+            dfs: {股票代码: K线数据}
+            max_workers: 进程数，默认CPU核数
+            
+        Returns:
+            {股票代码: 添加signal列的DataFrame}
+        """
+        if not dfs:
+            return {}
+        
+        if not self.strategy.czsc_available or len(dfs) == 1:
+            return {code: self.generate_signals(df) for code, df in dfs.items()}
+        
+        items = [
+            (code, df.index.to_numpy(), tuple(df.columns), tuple(df[col].to_numpy() for col in df.columns))
+            for code, df in dfs.items()
+        ]
+        
+        results = {}
+        workers = max_workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for code, signals in executor.map(_generate_signals_worker, items, chunksize=8):
+                df = dfs[code].copy()
+                if signals is None:
+                    df['signal'] = 0
+                else:
+                    df['signal'] = signals
+                results[code] = df
+        
+        return results
+
+
+def _generate_signals_worker(item):
+    """进程池任务: 由numpy数组还原K线并生成信号，返回 (股票代码, 信号数组)"""
+    code, index, columns, values = item
+    try:
+        df = pd.DataFrame(dict(zip(columns, values)), index=index)
+        return code, CZSCSignalGenerator().generate_signals(df)['signal'].to_numpy()
+    except Exception as e:
+        logger.warning(f"{code} CZSC信号生成失败: {e}")
+        return code, None
+
+
+# get_bs_signals 缓存条数
+BS_CACHE_MAXSIZE = 128
 
 
 # 创建全局实例
@@ -10,6 +10,8 @@ from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
+from src.utils.jit import njit
+
 
 class IntradayPattern(Enum):
     """分时形态类型"""
@@ -51,6 +53,32 @@ class IntradaySignal:
         return self.match_quality >= threshold
 
 
+@njit(cache=True)
+def _find_wm_extrema(closes):
+    """
+    扫描收盘价的局部极值点 (严格高于/低于前后各两根)
+    
+    Returns:
+        (高点下标数组, 低点下标数组)
+    """
+    n = len(closes)
+    high_idx = np.empty(n, np.int64)
+    low_idx = np.empty(n, np.int64)
+    n_high = 0
+    n_low = 0
+    
+    for i in range(2, n - 2):
+        c = closes[i]
+        if c > closes[i-1] and c > closes[i+1] and c > closes[i-2] and c > closes[i+2]:
+            high_idx[n_high] = i
+            n_high += 1
+        if c < closes[i-1] and c < closes[i+1] and c < closes[i-2] and c < closes[i+2]:
+            low_idx[n_low] = i
+            n_low += 1
+    
+    return high_idx[:n_high], low_idx[:n_low]
+
+
 class IntradayPatternAnalyzer:
     """分时形态分析器"""
     
@@ -73,51 +101,49 @@ class IntradayPatternAnalyzer:
         
         signals = []
         
-        # 计算基础指标
-        df = df.copy()
-        df['avg_price'] = df['close'].expanding().mean()
-        df['pct_change'] = df['close'].pct_change() * 100
-        df['vol_ma'] = df['volume'].rolling(5, min_periods=1).mean()
+        # 一次性取出numpy数组，各检测函数直接按下标访问
+        opens = df['open'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        closes = df['close'].to_numpy(dtype=np.float64)
+        volumes = df['volume'].to_numpy(dtype=np.float64)
+        
+        # 分时均价 (expanding mean 的累加和形式)
+        avg_prices = np.cumsum(closes) / np.arange(1, len(closes) + 1)
         
-        current_price = df['close'].iloc[-1]
-        open_price = df['open'].iloc[0]
-        avg_price = df['avg_price'].iloc[-1]
-        high_price = df['high'].max()
-        low_price = df['low'].min()
+        current_price = closes[-1]
+        open_price = opens[0]
         
         if pre_close is None:
             pre_close = open_price
         
-        total_change = (current_price / pre_close - 1) * 100
-        
         # 1. 高开低走 / 低开高走
-        signal = self._check_open_pattern(df, open_price, current_price, pre_close)
+        signal = self._check_open_pattern(open_price, current_price, pre_close)
         if signal:
             signals.append(signal)
         
         # 2. 早盘急拉 / 尾盘拉升
-        signal = self._check_surge_pattern(df, pre_close)
+        signal = self._check_surge_pattern(highs, closes, pre_close)
         if signal:
             signals.append(signal)
         
         # 3. 均价突破
-        signal = self._check_ma_cross(df)
+        signal = self._check_ma_cross(closes, avg_prices)
         if signal:
             signals.append(signal)
         
         # 4. W底 / M顶
-        signal = self._check_wm_pattern(df)
+        signal = self._check_wm_pattern(closes)
         if signal:
             signals.append(signal)
         
         # 5. 量价关系
-        signal = self._check_volume_price(df)
+        signal = self._check_volume_price(closes, volumes)
         if signal:
             signals.append(signal)
         
         return signals
     
-    def _check_open_pattern(self, df, open_price, current, pre_close) -> Optional[IntradaySignal]:
+    def _check_open_pattern(self, open_price, current, pre_close) -> Optional[IntradaySignal]:
         """检测开盘形态"""
         open_change = (open_price / pre_close - 1) * 100
         current_change = (current / pre_close - 1) * 100
@@ -144,18 +170,18 @@ class IntradayPatternAnalyzer:
         
         return None
     
-    def _check_surge_pattern(self, df, pre_close) -> Optional[IntradaySignal]:
+    def _check_surge_pattern(self, highs, closes, pre_close) -> Optional[IntradaySignal]:
         """检测急拉形态"""
-        if len(df) < 6:
+        n = len(closes)
+        if n < 6:
             return None
         
         # 判断当前时段
         now = datetime.now()
         
         # 早盘急拉（前6根5分钟线，即前30分钟）
-        if len(df) >= 6:
-            early_df = df.head(6)
-            early_high = early_df['high'].max()
+        if n >= 6:
+            early_high = highs[:6].max()
             early_change = (early_high / pre_close - 1) * 100
             
             if early_change > 5:
@@ -172,10 +198,9 @@ class IntradayPatternAnalyzer:
                 )
         
         # 尾盘拉升（最后6根线）
-        if len(df) >= 12 and now.hour >= 14:
-            late_df = df.tail(6)
-            late_start = late_df['close'].iloc[0]
-            late_end = late_df['close'].iloc[-1]
+        if n >= 12 and now.hour >= 14:
+            late_start = closes[-6]
+            late_end = closes[-1]
             late_change = (late_end / late_start - 1) * 100
             
             if late_change > 2:
@@ -189,15 +214,15 @@ class IntradayPatternAnalyzer:
         
         return None
     
-    def _check_ma_cross(self, df) -> Optional[IntradaySignal]:
+    def _check_ma_cross(self, closes, avg_prices) -> Optional[IntradaySignal]:
         """检测均价突破"""
-        if len(df) < 3:
+        if len(closes) < 3:
             return None
         
-        current = df['close'].iloc[-1]
-        prev = df['close'].iloc[-2]
-        avg_now = df['avg_price'].iloc[-1]
-        avg_prev = df['avg_price'].iloc[-2]
+        current = closes[-1]
+        prev = closes[-2]
+        avg_now = avg_prices[-1]
+        avg_prev = avg_prices[-2]
         
         # 上穿均价
         if prev < avg_prev and current > avg_now:
@@ -221,29 +246,17 @@ class IntradayPatternAnalyzer:
         
         return None
     
-    def _check_wm_pattern(self, df) -> Optional[IntradaySignal]:
+    def _check_wm_pattern(self, closes) -> Optional[IntradaySignal]:
         """检测W底/M顶形态"""
-        if len(df) < 15:
+        if len(closes) < 15:
             return None
         
-        closes = df['close'].values
-        
         # 寻找极值点
-        highs = []
-        lows = []
-        
-        for i in range(2, len(closes) - 2):
-            if closes[i] > closes[i-1] and closes[i] > closes[i+1] and \
-               closes[i] > closes[i-2] and closes[i] > closes[i+2]:
-                highs.append((i, closes[i]))
-            if closes[i] < closes[i-1] and closes[i] < closes[i+1] and \
-               closes[i] < closes[i-2] and closes[i] < closes[i+2]:
-                lows.append((i, closes[i]))
+        high_idx, low_idx = _find_wm_extrema(closes)
         
         # W底：两个低点，第二个不低于第一个
-        if len(lows) >= 2:
-            last_two_lows = lows[-2:]
-            low1, low2 = last_two_lows[0][1], last_two_lows[1][1]
+        if len(low_idx) >= 2:
+            low1, low2 = closes[low_idx[-2]], closes[low_idx[-1]]
             
             if low2 >= low1 * 0.99:  # 允许1%误差
                 current = closes[-1]
@@ -269,9 +282,8 @@ class IntradayPatternAnalyzer:
                     )
         
         # M顶：两个高点，第二个不高于第一个
-        if len(highs) >= 2:
-            last_two_highs = highs[-2:]
-            high1, high2 = last_two_highs[0][1], last_two_highs[1][1]
+        if len(high_idx) >= 2:
+            high1, high2 = closes[high_idx[-2]], closes[high_idx[-1]]
             
             if high2 <= high1 * 1.01:
                 current = closes[-1]
@@ -296,19 +308,21 @@ class IntradayPatternAnalyzer:
         
         return None
     
-    def _check_volume_price(self, df) -> Optional[IntradaySignal]:
+    def _check_volume_price(self, closes, volumes) -> Optional[IntradaySignal]:
         """检测量价关系"""
-        if len(df) < 10:
+        if len(closes) < 10:
             return None
         
-        recent = df.tail(10)
+        # 最近10根: 前5根与后5根量能对比，后5根均量即5周期量均线
+        early_vol = volumes[-10:-5].mean()
+        vol_ma = volumes[-5:].mean()
         
-        price_trend = recent['close'].iloc[-1] - recent['close'].iloc[0]
-        vol_trend = recent['volume'].iloc[-5:].mean() - recent['volume'].iloc[:5].mean()
+        price_trend = closes[-1] - closes[-10]
+        vol_trend = vol_ma - early_vol
         
         # 量价齐升
         if price_trend > 0 and vol_trend > 0:
-            vol_ratio = recent['volume'].iloc[-1] / recent['vol_ma'].iloc[-1]
+            vol_ratio = volumes[-1] / vol_ma
             if vol_ratio > 1.5:
                 # 动态计算匹配度: 量比越大，匹配度越高
                 match_quality = min(1.0, 0.5 + (vol_ratio - 1.5) * 0.25)  # 量比3.5以上得满分
@@ -325,7 +339,7 @@ class IntradayPatternAnalyzer:
         # 量价背离（价涨量缩）
         if price_trend > 0 and vol_trend < 0:
             # 动态计算匹配度: 量能萎缩越严重，信号越强
-            vol_shrink_ratio = abs(vol_trend) / (recent['volume'].iloc[:5].mean() + 1)
+            vol_shrink_ratio = abs(vol_trend) / (early_vol + 1)
             match_quality = min(1.0, 0.4 + vol_shrink_ratio * 0.5)  # 基础0.4，量缩越多越高
             
             return IntradaySignal(
@@ -93,14 +93,16 @@ class LimitChaseStrategy:
         df['dist_to_limit'] = (df['limit_up_price'] - df['close']) / df['close']
         
         # 计算连板数
-        df['limit_streak'] = 0
+        is_limit_up = df['is_limit_up'].to_numpy()
+        limit_streak = np.zeros(len(df), dtype=np.int64)
         streak = 0
         for i in range(len(df)):
-            if df.iloc[i]['is_limit_up']:
+            if is_limit_up[i]:
                 streak += 1
             else:
                 streak = 0
-            df.iloc[i, df.columns.get_loc('limit_streak')] = streak
+            limit_streak[i] = streak
+        df['limit_streak'] = limit_streak
         
         # 是否为首板（连板数=1）
         df['is_first_limit'] = df['limit_streak'] == 1
@@ -188,8 +188,8 @@ class RealtimeStrategy:
         检测买卖压力信号
         通过买卖盘挂单量判断
         """
-        total_bid = sum(quote.bid_volumes)
-        total_ask = sum(quote.ask_volumes)
+        total_bid = quote.bid_total
+        total_ask = quote.ask_total
         
         if total_bid + total_ask == 0:
             return None
@@ -3,6 +3,7 @@
 Utils module
 """
 from .logger import logger, setup_logger, get_logger
+from .cache import TTLCache
 from .helpers import (
     ensure_dir,
     format_date,
@@ -21,6 +22,7 @@ __all__ = [
     'logger',
     'setup_logger', 
     'get_logger',
+    'TTLCache',
     'ensure_dir',
     'format_date',
     'parse_date',
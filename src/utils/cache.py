@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Stock Analysis System - In-Process Cache
+进程内缓存 (TTL缓存 / 向量相似度缓存)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+import numpy as np
+
+
+class TTLCache:
+    """带过期时间的LRU缓存 (线程安全)"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 过期时间(秒)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，不存在或已过期时返回default"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除并返回缓存条目"""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticCache:
+    """
+    向量相似度缓存 (线程安全)
+
+    条目按分组存放在定长环形缓冲区中，查询时对同组未过期条目做一次矩阵乘法，
+    余弦相似度超过阈值即视为命中。向量需预先归一化。
+    """
+
+    def __init__(self, dim: int, maxsize: int = 1000, ttl: float = 300, threshold: float = 0.92):
+        """
+        初始化缓存
+
+        Args:
+            dim: 向量维度
+            maxsize: 最大条目数，写满后覆盖最早写入的条目
+            ttl: 过期时间(秒)
+            threshold: 命中所需的最小余弦相似度
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = np.zeros((maxsize, dim), dtype=np.float32)
+        self._expires = np.zeros(maxsize, dtype=np.float64)
+        self._groups: list = [None] * maxsize
+        self._values: list = [None] * maxsize
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, group: Hashable, vector: np.ndarray, default: Any = None) -> Any:
+        """查找同组内最相似的未过期条目，相似度不足时返回default"""
+        now = time.monotonic()
+        with self._lock:
+            idx = np.flatnonzero(self._expires > now)
+            idx = [i for i in idx if self._groups[i] == group]
+            if idx:
+                sims = self._vectors[idx] @ vector
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self.hits += 1
+                    return self._values[idx[best]]
+            self.misses += 1
+            return default
+
+    def set(self, group: Hashable, vector: np.ndarray, value: Any):
+        """写入缓存"""
+        with self._lock:
+            i = self._next
+            self._vectors[i] = vector
+            self._expires[i] = time.monotonic() + self.ttl
+            self._groups[i] = group
+            self._values[i] = value
+            self._next = (i + 1) % self.maxsize
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._expires[:] = 0
+            self._groups = [None] * self.maxsize
+            self._values = [None] * self.maxsize
+            self._next = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        total = self.hits + self.misses
+        return {
+            'size': int((self._expires > time.monotonic()).sum()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Stock Analysis System - JIT Helpers
+Numba JIT编译辅助 (未安装numba时退化为普通Python函数)
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器，支持 @njit 和 @njit(...) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
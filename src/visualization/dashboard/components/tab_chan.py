@@ -40,7 +40,7 @@ def render_chan_tab(df: pd.DataFrame):
             st.metric("最新分型", "无")
     
     # 买卖点判断
-    bs = chan_analyzer.get_bs_point(df)
+    bs = chan_analyzer.get_bs_point(df, analysis=chan_result)
     
     if bs['signal'] == 1:
         st.success(f"🟢 **买入信号**: {bs['signal_type']}")
@@ -102,6 +102,9 @@ def render_watchlist_panel():
                 if selected:
                     # 提取代码
                     code = selected.split('(')[-1].rstrip(')')
+                    # 选中即后台预取行情，切换到该股票时直接命中缓存
+                    from src.strategy.signals.big_order_tracker import prewarm_quotes
+                    prewarm_quotes([code])
                     st.info(f"💡 在左侧边栏输入代码 {code} 并点击分析")
             else:
                 st.info("暂无自选股，使用 `portfolio_service.add_to_watchlist()` 添加")
@@ -125,6 +128,17 @@ def render_watchlist_panel():
                             st.error("添加失败")
     except Exception as e:
         st.warning(f"自选股功能暂不可用: {e}")
+    finally:
+        _release_portfolio_session()
+
+
+def _release_portfolio_session():
+    """释放本次渲染线程的持仓服务会话 (Streamlit每次重跑在新线程中执行)"""
+    try:
+        from src.data.services.portfolio_service import release_session
+        release_session()
+    except Exception:
+        pass
 
 
 def render_win_rate_stats():
@@ -19,12 +19,14 @@ def render_realtime_tab(df: pd.DataFrame, code: str, user_shares: int, user_cost
         from src.data.collectors.realtime_service import get_realtime_quote, get_intraday_data
         from src.strategy.signals.realtime_strategy import realtime_strategy
         from src.strategy.signals.intraday_pattern import analyze_intraday_patterns, intraday_analyzer
-        from src.strategy.signals.big_order_tracker import get_buy_sell_pressure
+        from src.strategy.signals.big_order_tracker import get_buy_sell_pressure, prewarm_quotes
     except ImportError as e:
         st.error(f"模块加载失败: {e}")
         return
 
     stock_code_clean = code.split('.')[-1] if '.' in code else code
+    # 聚焦股票时后台预取行情，下方买卖压力与AI分析直接命中缓存
+    prewarm_quotes([stock_code_clean])
     quote = get_realtime_quote(stock_code_clean)
     
     if not quote:
@@ -102,104 +104,25 @@ def _render_ai_analysis(code: str, quote, df: pd.DataFrame):
     if 'ai_analysis_code' not in st.session_state:
         st.session_state.ai_analysis_code = None
     
+    # 切换到新股票时后台预热AI分析，点击按钮时直接命中缓存
+    if st.session_state.get('ai_warmup_code') != code:
+        st.session_state.ai_warmup_code = code
+        try:
+            from src.strategy.ai_analyzer import ai_analyzer
+            ai_analyzer.warmup([_build_ai_context(code, quote, df)], structured=False)
+        except Exception as e:
+            st.caption(f"AI预热失败: {e}")
+    
     col1, col2 = st.columns([3, 1])
     
     with col2:
         if st.button("🧠 AI分析", use_container_width=True, type="primary"):
             with st.spinner("AI正在分析..."):
                 try:
-                    from src.strategy.ai_analyzer import analyze_stock
-                    from src.strategy.signals.intraday_pattern import analyze_intraday_patterns
-                    from src.strategy.signals.big_order_tracker import get_buy_sell_pressure
-                    from src.data.collectors.realtime_service import get_intraday_data
-                    
-                    # 准备数据
-                    intraday_df = get_intraday_data(code, datalen=48)
-                    patterns = []
-                    if not intraday_df.empty:
-                        pt_signals = analyze_intraday_patterns(intraday_df, quote.pre_close)
-                        patterns = [s.pattern.value for s in pt_signals]
-                    
-                    pressure = get_buy_sell_pressure(code)
-                    pressure_text = pressure.pressure if pressure else "均衡"
-                    
-                    # 获取信号
-                    signals = [item['类型'] for item in st.session_state.get('signal_timeline', [])[:5]]
-                    
-                    # 均线位置
-                    ma_pos = "无数据"
-                    if df is not None and 'ma5' in df.columns:
-                        ma5 = df['ma5'].iloc[-1]
-                        ma20 = df['ma20'].iloc[-1] if 'ma20' in df.columns else ma5
-                        if quote.price > ma5 > ma20:
-                            ma_pos = "多头排列，价格在均线上方"
-                        elif quote.price < ma5 < ma20:
-                            ma_pos = "空头排列，价格在均线下方"
-                        else:
-                            ma_pos = "均线交织"
-                    
-                    
-                    # 准备技术指标与趋势分析
-                    indicators = {}
-                    recent_trend = "无数据"
-                    
-                    if df is not None and not df.empty:
-                        # 1. 计算指标 (MACD, RSI, KDJ) - 假设df已包含或简单计算
-                        # 均线偏离度
-                        ma5 = df['ma5'].iloc[-1] if 'ma5' in df.columns else 0
-                        ma20 = df['ma20'].iloc[-1] if 'ma20' in df.columns else 0
-                        indicators["MA趋向"] = "多头排列" if ma5 > ma20 else ("空头排列" if ma5 < ma20 else "纠缠")
-                        
-                        # 量比分析
-                        vol_rss = df['volume'].rolling(5).mean()
-                        if len(vol_rss) > 0 and vol_rss.iloc[-1] > 0:
-                            vol_ratio = df['volume'].iloc[-1] / vol_rss.iloc[-1]
-                            indicators["量能状态"] = f"量比{vol_ratio:.2f} ({'放量' if vol_ratio > 1.5 else '缩量' if vol_ratio < 0.8 else '平量'})"
-                        
-                        # 近期涨跌
-                        if len(df) >= 3:
-                            pct_3d = (df['close'].iloc[-1] / df['close'].iloc[-3] - 1) * 100
-                            recent_trend = f"3日涨跌{pct_3d:+.2f}%"
-                            if abs(pct_3d) > 5:
-                                recent_trend += " (短期波动大)"
-                        
-                        # 简单MACD模拟 (如果有columns则用)
-                        if 'diff' in df.columns and 'dea' in df.columns:
-                            diff = df['diff'].iloc[-1]
-                            dea = df['dea'].iloc[-1]
-                            indicators["MACD"] = "金叉" if diff > dea else "死叉"
-                        
-                        # RSI (简化计算)
-                        if len(df) > 14:
-                            delta = df['close'].diff()
-                            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-                            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-                            rs = gain / loss
-                            rsi = 100 - (100 / (1 + rs)).iloc[-1]
-                            indicators["RSI(14)"] = f"{rsi:.1f} ({'超买' if rsi>80 else '超卖' if rsi<20 else '中性'})"
-
                     # 使用流式AI分析
-                    from src.strategy.ai_analyzer import ai_analyzer, StockContext
+                    from src.strategy.ai_analyzer import ai_analyzer
                     
-                    context = StockContext(
-                        code=code,
-                        name=quote.name,
-                        price=quote.price,
-                        change_pct=quote.change_pct,
-                        volume=quote.volume,
-                        amount=quote.amount,
-                        high=quote.high,
-                        low=quote.low,
-                        open_price=quote.open,
-                        pre_close=quote.pre_close,
-                        signals=signals,
-                        patterns=patterns,
-                        pressure=pressure_text,
-                        fund_flow="详见下方资金流向",
-                        ma_position=ma_pos,
-                        indicators=indicators,
-                        recent_trend=recent_trend
-                    )
+                    context = _build_ai_context(code, quote, df)
                     
                     # 流式输出显示
                     result_placeholder = st.empty()
@@ -227,6 +150,99 @@ def _render_ai_analysis(code: str, quote, df: pd.DataFrame):
             st.caption("点击按钮，让AI为您分析当前股票走势...")
 
 
+def _build_ai_context(code: str, quote, df: pd.DataFrame):
+    """汇总分时形态、买卖压力、信号流水和日线指标，构建AI分析上下文"""
+    from src.strategy.ai_analyzer import StockContext
+    from src.strategy.signals.intraday_pattern import analyze_intraday_patterns
+    from src.strategy.signals.big_order_tracker import get_buy_sell_pressure
+    from src.data.collectors.realtime_service import get_intraday_data
+    
+    # 准备数据
+    intraday_df = get_intraday_data(code, datalen=48)
+    patterns = []
+    if not intraday_df.empty:
+        pt_signals = analyze_intraday_patterns(intraday_df, quote.pre_close)
+        patterns = [s.pattern.value for s in pt_signals]
+    
+    pressure = get_buy_sell_pressure(code)
+    pressure_text = pressure.pressure if pressure else "均衡"
+    
+    # 获取信号
+    signals = [item['类型'] for item in st.session_state.get('signal_timeline', [])[:5]]
+    
+    # 均线位置
+    ma_pos = "无数据"
+    if df is not None and 'ma5' in df.columns:
+        ma5 = df['ma5'].iloc[-1]
+        ma20 = df['ma20'].iloc[-1] if 'ma20' in df.columns else ma5
+        if quote.price > ma5 > ma20:
+            ma_pos = "多头排列，价格在均线上方"
+        elif quote.price < ma5 < ma20:
+            ma_pos = "空头排列，价格在均线下方"
+        else:
+            ma_pos = "均线交织"
+
+    
+    # 准备技术指标与趋势分析
+    indicators = {}
+    recent_trend = "无数据"
+    
+    if df is not None and not df.empty:
+        # 1. 计算指标 (MACD, RSI, KDJ) - 假设df已包含或简单计算
+        # 均线偏离度
+        ma5 = df['ma5'].iloc[-1] if 'ma5' in df.columns else 0
+        ma20 = df['ma20'].iloc[-1] if 'ma20' in df.columns else 0
+        indicators["MA趋向"] = "多头排列" if ma5 > ma20 else ("空头排列" if ma5 < ma20 else "纠缠")
+
+        # 量比分析
+        vol_rss = df['volume'].rolling(5).mean()
+        if len(vol_rss) > 0 and vol_rss.iloc[-1] > 0:
+            vol_ratio = df['volume'].iloc[-1] / vol_rss.iloc[-1]
+            indicators["量能状态"] = f"量比{vol_ratio:.2f} ({'放量' if vol_ratio > 1.5 else '缩量' if vol_ratio < 0.8 else '平量'})"
+
+        # 近期涨跌
+        if len(df) >= 3:
+            pct_3d = (df['close'].iloc[-1] / df['close'].iloc[-3] - 1) * 100
+            recent_trend = f"3日涨跌{pct_3d:+.2f}%"
+            if abs(pct_3d) > 5:
+                recent_trend += " (短期波动大)"
+
+        # 简单MACD模拟 (如果有columns则用)
+        if 'diff' in df.columns and 'dea' in df.columns:
+            diff = df['diff'].iloc[-1]
+            dea = df['dea'].iloc[-1]
+            indicators["MACD"] = "金叉" if diff > dea else "死叉"
+
+        # RSI (简化计算)
+        if len(df) > 14:
+            delta = df['close'].diff()
+            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+            rs = gain / loss
+            rsi = 100 - (100 / (1 + rs)).iloc[-1]
+            indicators["RSI(14)"] = f"{rsi:.1f} ({'超买' if rsi>80 else '超卖' if rsi<20 else '中性'})"
+    
+    return StockContext(
+        code=code,
+        name=quote.name,
+        price=quote.price,
+        change_pct=quote.change_pct,
+        volume=quote.volume,
+        amount=quote.amount,
+        high=quote.high,
+        low=quote.low,
+        open_price=quote.open,
+        pre_close=quote.pre_close,
+        signals=signals,
+        patterns=patterns,
+        pressure=pressure_text,
+        fund_flow="详见下方资金流向",
+        ma_position=ma_pos,
+        indicators=indicators,
+        recent_trend=recent_trend
+    )
+
+
 def _init_signal_timeline(code: str):
     """初始化信号流水表"""
     if 'signal_timeline' not in st.session_state:
@@ -382,8 +398,8 @@ def _render_order_book(quote):
     )
     
     # 买卖力量
-    total_bid = sum(quote.bid_volumes)
-    total_ask = sum(quote.ask_volumes)
+    total_bid = quote.bid_total
+    total_ask = quote.ask_total
     total = total_bid + total_ask
     
     if total > 0:
@@ -571,7 +587,7 @@ def _render_analysis_history(code: str):
     try:
         from src.data.services.db_service import db_service
         
-        history = db_service.get_analysis_history(code, days=30)
+        history = db_service.get_analysis_history(code, days=30, include_response=False)
         
         if not history:
             st.info("暂无分析历史记录，进行AI分析后将自动保存")
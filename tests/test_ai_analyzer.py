@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+AI分析缓存测试
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.strategy.ai_analyzer import AIAnalyzer, StockContext
+
+
+def make_context(price, change_pct, rsi_value=50.0, **kwargs):
+    """同一股票、同样信号组合，仅盘面数值不同的上下文"""
+    pre_close = price / (1 + change_pct / 100)
+    fields = dict(
+        code='000592', name='平潭发展',
+        price=price, change_pct=change_pct,
+        volume=10000, amount=1e6,
+        high=price, low=price, open_price=pre_close, pre_close=pre_close,
+        signals=['放量'], patterns=[],
+        pressure='中性', fund_flow='流入', ma_position='均线上方',
+        rsi_value=rsi_value
+    )
+    return StockContext(**{**fields, **kwargs})
+
+
+class TestSemanticCache:
+    """相似上下文缓存测试类"""
+
+    @pytest.fixture
+    def analyzer(self):
+        return AIAnalyzer()
+
+    def test_small_move_hits(self, analyzer):
+        """同一区间内的小幅波动复用缓存"""
+        analyzer._cache_response(analyzer._cache_keys(make_context(10.02, 1.2, 55)), 'cached')
+
+        assert analyzer._cached_response(analyzer._cache_keys(make_context(10.03, 1.3, 56))) == 'cached'
+
+    @pytest.mark.parametrize('price, change_pct, rsi_value', [
+        (9.0, -9.0, 20.0),
+        (10.9, 9.9, 80.0),
+        (10.0, -9.0, 50.0),
+        (10.0, 1.0, 20.0),
+    ])
+    def test_different_situation_misses(self, analyzer, price, change_pct, rsi_value):
+        """价格、涨跌幅或RSI区间不同的上下文不共享缓存"""
+        analyzer._cache_response(analyzer._cache_keys(make_context(10.0, 1.0)), 'cached')
+
+        keys = analyzer._cache_keys(make_context(price, change_pct, rsi_value))
+        assert analyzer._cached_response(keys) is None
+
+
+class TestExactCache:
+    """精确摘要测试类"""
+
+    @pytest.fixture
+    def analyzer(self):
+        return AIAnalyzer()
+
+    @pytest.mark.parametrize('changes', [
+        dict(volume=20000),
+        dict(amount=5e8),
+        dict(bid_volumes=[900, 100], ask_volumes=[100, 100]),
+    ], ids=['volume', 'amount', 'order_book'])
+    def test_prompt_change_changes_digest(self, analyzer, changes):
+        """成交量、成交额或五档盘口变化使提示词不同时，精确摘要不同"""
+        base = make_context(10.0, 1.0, bid_volumes=[100, 100], ask_volumes=[900, 100])
+        changed = make_context(10.0, 1.0, **{'bid_volumes': [100, 100], 'ask_volumes': [900, 100], **changes})
+
+        assert analyzer._build_user_message(base) != analyzer._build_user_message(changed)
+        assert analyzer._cache_keys(base)[0] != analyzer._cache_keys(changed)[0]
+
+    def test_same_prompt_same_digest(self, analyzer):
+        """提示词相同的上下文精确摘要相同"""
+        assert analyzer._cache_keys(make_context(10.0, 1.0))[0] == analyzer._cache_keys(make_context(10.0, 1.0))[0]
+
+
+class TestParseResponse:
+    """AI回复解析测试类"""
+
+    FENCED = '分析如下:\n```json\n{"verdict": "BUY", "confidence": 80}\n```'
+
+    def test_fenced_reply_without_json_mode(self):
+        """非JSON模式请求的代码块回复按正则提取"""
+        assert AIAnalyzer().parse_ai_response(self.FENCED)['verdict'] == 'BUY'
+
+    def test_json_mode_skips_regex(self):
+        """JSON模式请求的回复解析失败时直接返回默认结构"""
+        assert AIAnalyzer().parse_ai_response(self.FENCED, json_mode=True)['verdict'] == 'HOLD'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+回测引擎测试
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.strategy.backtesting.backtest_engine import BacktestEngine
+
+ENGINE_PARAMS = dict(initial_capital=100000.0, commission_rate=0.0003, slippage=0.001, min_trade_unit=100)
+
+
+def reference_backtest(df: pd.DataFrame, initial_capital, commission_rate, slippage, min_trade_unit):
+    """逐bar撮合的参考实现，返回 (成交记录, 权益曲线)"""
+    capital, position, holding_price = initial_capital, 0, 0.0
+    trades, equity_curve = [], []
+    dates = BacktestEngine._bar_dates(df)
+
+    for date, price, signal in zip(dates, df['close'].tolist(), df['signal'].tolist()):
+        equity_curve.append({'date': date, 'equity': capital + position * price, 'price': price})
+
+        if signal == 1 and position == 0:
+            actual_price = price * (1 + slippage)
+            shares = int(capital * 0.95 / actual_price / min_trade_unit) * min_trade_unit
+            if shares > 0:
+                cost = shares * actual_price
+                commission = cost * commission_rate
+                capital -= (cost + commission)
+                position, holding_price = shares, actual_price
+                trades.append({'date': date, 'type': 'BUY', 'price': actual_price,
+                               'shares': shares, 'amount': cost, 'commission': commission})
+        elif signal == -1 and position > 0:
+            actual_price = price * (1 - slippage)
+            revenue = position * actual_price
+            commission = revenue * commission_rate
+            profit = revenue - position * holding_price - commission
+            capital += (revenue - commission)
+            trades.append({'date': date, 'type': 'SELL', 'price': actual_price, 'shares': position,
+                           'amount': revenue, 'commission': commission, 'profit': profit})
+            position, holding_price = 0, 0.0
+
+    return trades, equity_curve
+
+
+def make_data(n: int, seed: int, index: str) -> pd.DataFrame:
+    """随机行情与信号 (含NaN信号)"""
+    rng = np.random.default_rng(seed)
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, n))), 2)
+    signal = rng.choice([1.0, -1.0, 0.0, 0.0, np.nan], size=n)
+    df = pd.DataFrame({'close': close, 'signal': signal})
+
+    dates = pd.date_range('2023-01-01', periods=n)
+    if index == 'datetime':
+        df.index = dates
+    elif index == 'trade_date':
+        df['trade_date'] = [datetime(d.year, d.month, d.day) for d in dates]
+    return df
+
+
+class TestBacktestEngine:
+    """回测引擎测试类"""
+
+    @pytest.mark.parametrize('index', ['datetime', 'range', 'trade_date'])
+    @pytest.mark.parametrize('seed', range(3))
+    def test_matches_reference(self, index, seed):
+        """成交记录与权益曲线与逐bar参考实现一致"""
+        df = make_data(300, seed, index)
+
+        result = BacktestEngine(**ENGINE_PARAMS).run(df)
+
+        trades, equity_curve = reference_backtest(df, **ENGINE_PARAMS)
+        assert result['total_trades'] == len(trades) > 0
+        assert result['trades'] == pytest.approx(trades)
+        assert [e['date'] for e in result['equity_curve']] == [e['date'] for e in equity_curve]
+        np.testing.assert_allclose([e['equity'] for e in result['equity_curve']],
+                                   [e['equity'] for e in equity_curve], rtol=1e-12)
+
+    def test_nan_signals_do_not_trade(self):
+        """全部为NaN信号时不成交，权益保持不变"""
+        df = make_data(50, 0, 'datetime').assign(signal=np.nan)
+
+        result = BacktestEngine(**ENGINE_PARAMS).run(df)
+
+        assert result['trades'] == []
+        assert all(e['equity'] == ENGINE_PARAMS['initial_capital'] for e in result['equity_curve'])
+
+    def test_sweep_matches_run(self):
+        """批量回测的期末权益与逐组run一致"""
+        data = [make_data(200, seed, 'range') for seed in range(4)]
+        df = data[0]
+        signal_sets = np.stack([d['signal'].to_numpy() for d in data])
+
+        finals = BacktestEngine(**ENGINE_PARAMS).run_sweep(df, signal_sets)
+
+        expected = [BacktestEngine(**ENGINE_PARAMS).run(df.assign(signal=s))['final_capital'] for s in signal_sets]
+        np.testing.assert_allclose(finals, expected, rtol=1e-12)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+缠论策略测试
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.strategy.signals.chan_strategy import ChanAnalyzer, ChanSignalGenerator, _IncrementalChan
+
+
+def make_bars(n: int, seed: int, decimals: int = 1) -> pd.DataFrame:
+    """随机游走K线，价格取整位数越少包含关系和等高等低越多"""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    open_ = close + rng.standard_normal(n) * 0.3
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    return pd.DataFrame({
+        'open': np.round(open_, decimals),
+        'high': np.round(high, decimals),
+        'low': np.round(low, decimals),
+        'close': np.round(close, decimals),
+        'volume': 1.0
+    }, index=pd.date_range('2020-01-01', periods=n))
+
+
+def reference_signals(df: pd.DataFrame, window_size: int = 30):
+    """对每个前缀窗口从头调用 analyze/get_bs_point 的参考实现"""
+    analyzer = ChanAnalyzer()
+    signals, signal_types = [0] * len(df), [''] * len(df)
+    for i in range(window_size, len(df)):
+        result = analyzer.get_bs_point(df.iloc[:i + 1])
+        signals[i] = result['signal']
+        signal_types[i] = result['signal_type']
+    return signals, signal_types
+
+
+class TestIncrementalChan:
+    """增量缠论状态与整体重算的一致性测试类"""
+
+    @pytest.mark.parametrize('seed', range(4))
+    @pytest.mark.parametrize('decimals', [0, 1, 2])
+    def test_latest_matches_analyze(self, seed, decimals):
+        """每根K线后的最新分型/笔/中枢与对前缀整体analyze一致"""
+        df = make_bars(200, seed, decimals)
+        analyzer = ChanAnalyzer()
+        state = _IncrementalChan()
+
+        for i, row in enumerate(df.itertuples()):
+            state.update(row.Index, row.open, row.high, row.low, row.close)
+            analysis = analyzer.analyze(df.iloc[:i + 1])
+
+            assert state.latest() == (analysis['latest_fx'], analysis['latest_bi'], analysis['latest_zs'])
+
+    @pytest.mark.parametrize('df', [
+        make_bars(40, 0).assign(high=101.0, low=99.0),                   # 全部包含 (横盘)
+        make_bars(40, 1).assign(high=lambda d: 100.0 + np.arange(40),
+                                low=lambda d: 99.0 + np.arange(40)),     # 单边上涨，无分型
+        make_bars(3, 2),
+        make_bars(1, 3),
+    ], ids=['all_included', 'monotonic', 'three_bars', 'one_bar'])
+    def test_edge_cases(self, df):
+        """包含、无分型和极短数据时与analyze一致"""
+        state = _IncrementalChan()
+        for row in df.itertuples():
+            state.update(row.Index, row.open, row.high, row.low, row.close)
+
+        analysis = ChanAnalyzer().analyze(df)
+        assert state.latest() == (analysis['latest_fx'], analysis['latest_bi'], analysis['latest_zs'])
+
+
+class TestChanSignalGenerator:
+    """缠论信号生成器测试类"""
+
+    @pytest.mark.parametrize('seed', range(3))
+    @pytest.mark.parametrize('decimals', [0, 2])
+    def test_matches_reference(self, seed, decimals):
+        """增量生成的信号与逐窗口get_bs_point一致"""
+        df = make_bars(150, seed, decimals)
+
+        result = ChanSignalGenerator().generate_signals(df)
+
+        signals, signal_types = reference_signals(df)
+        assert result['signal'].tolist() == signals
+        assert result['signal_type'].tolist() == signal_types
+
+    def test_trade_date_column(self):
+        """非时间索引时以trade_date列为索引，信号不变"""
+        df = make_bars(120, 7)
+        expected = ChanSignalGenerator().generate_signals(df)
+
+        result = ChanSignalGenerator().generate_signals(
+            df.rename_axis('trade_date').reset_index()
+        )
+
+        assert result['signal'].tolist() == expected['signal'].tolist()
+        assert result.index.equals(expected.index)
+
+    def test_short_data(self):
+        """数据不足10根时不产生信号"""
+        result = ChanSignalGenerator().generate_signals(make_bars(9, 0))
+
+        assert (result['signal'] == 0).all()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+综合策略信号测试
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.strategy.signals.comprehensive_strategy import CZSCBarSignals, cached_ewm
+
+
+def reference_tnr(close: pd.Series, period: int) -> pd.Series:
+    """TNR的rolling参考实现"""
+    denom = close.diff().abs().rolling(period).sum()
+    num = close.diff(period).abs()
+    return (num / denom).where(denom > 0, 0.0).fillna(0.0)
+
+
+class TestTNRTrend:
+    """TNR趋势噪音指标测试类"""
+
+    @pytest.fixture
+    def sample_data(self):
+        """生成测试数据 (含缺失收盘价)"""
+        np.random.seed(42)
+        close = 100 + np.cumsum(np.random.randn(80))
+        close[[10, 40, 41, 79]] = np.nan
+        return pd.DataFrame({'close': close}, index=pd.date_range('2023-01-01', periods=80))
+
+    @pytest.mark.parametrize('period', [5, 14])
+    def test_matches_reference(self, sample_data, period):
+        """与rolling实现一致，含缺失值的窗口为0"""
+        result = CZSCBarSignals.tnr_trend(sample_data, period=period)
+
+        expected = reference_tnr(sample_data['close'], period)
+        np.testing.assert_allclose(result['tnr'].to_numpy(), expected.to_numpy(), atol=1e-12)
+
+    def test_missing_close_window_is_zero(self, sample_data):
+        """含缺失收盘价的窗口不会得出大于1的TNR"""
+        result = CZSCBarSignals.tnr_trend(sample_data, period=5)
+
+        assert (result['tnr'].iloc[10:16] == 0).all()
+        assert result['tnr'].between(0, 1).all()
+
+    @pytest.mark.parametrize('nan_to_null', [True, False])
+    def test_polars_matches_pandas(self, sample_data, nan_to_null):
+        """Polars实现对缺失收盘价(null或NaN)的处理与pandas实现一致"""
+        pl = pytest.importorskip('polars')
+        from src.strategy.signals.comprehensive_strategy import ComprehensiveSignalGeneratorPolars
+
+        df = sample_data.assign(open=sample_data['close'], high=sample_data['close'], low=sample_data['close'])
+        result = ComprehensiveSignalGeneratorPolars().generate_signals(
+            pl.from_pandas(df, nan_to_null=nan_to_null), period=5)
+
+        expected = CZSCBarSignals.tnr_trend(sample_data, period=5)
+        np.testing.assert_allclose(result['tnr'].to_numpy(), expected['tnr'].to_numpy(), atol=1e-12)
+
+
+class TestCachedEWM:
+    """EWM均线缓存测试类"""
+
+    @pytest.fixture
+    def sample_data(self):
+        """生成测试数据"""
+        np.random.seed(7)
+        close = 100 + np.cumsum(np.random.randn(60))
+        return pd.DataFrame({'close': close}, index=pd.date_range('2023-01-01', periods=60))
+
+    def test_matches_pandas(self, sample_data):
+        """结果与ewm(span).mean()一致，保留调用方索引"""
+        expected = sample_data['close'].ewm(span=12).mean()
+
+        pd.testing.assert_series_equal(cached_ewm(sample_data, 12), expected)
+        pd.testing.assert_series_equal(cached_ewm(sample_data.copy(), 12), expected)
+
+    def test_inplace_edit_not_stale(self, sample_data):
+        """原地修改中间行后不返回旧结果"""
+        cached_ewm(sample_data, 26)
+        sample_data.iloc[30, 0] += 5.0
+
+        expected = sample_data['close'].ewm(span=26).mean()
+        pd.testing.assert_series_equal(cached_ewm(sample_data, 26), expected)
+
+    def test_result_mutation_does_not_leak(self, sample_data):
+        """修改返回的序列不影响缓存"""
+        first = cached_ewm(sample_data, 9)
+        first.iloc[:] = 0.0
+
+        expected = sample_data['close'].ewm(span=9).mean()
+        pd.testing.assert_series_equal(cached_ewm(sample_data, 9), expected)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
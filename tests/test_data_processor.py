@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+数据处理器测试
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.processors.data_processor import DataProcessor
+
+
+def reference_handle_outliers(df: pd.DataFrame, method: str, threshold: float = 3.0) -> pd.DataFrame:
+    """逐列处理异常值的参考实现 (删除时后一列的上下界按已筛选的行计算)"""
+    df = df.copy()
+    for col in df.select_dtypes(include=[np.number]).columns:
+        mean, std = df[col].mean(), df[col].std()
+        lower, upper = mean - threshold * std, mean + threshold * std
+        if method == 'clip':
+            df[col] = df[col].clip(lower=lower, upper=upper)
+        elif method == 'remove':
+            df = df[(df[col] >= lower) & (df[col] <= upper)]
+        elif method == 'replace':
+            df.loc[(df[col] < lower) | (df[col] > upper), col] = df[col].median()
+    return df
+
+
+class TestDataProcessor:
+    """数据处理器测试类"""
+
+    @pytest.fixture
+    def sample_data(self):
+        """生成测试数据 (含缺失值、异常值和重复行)"""
+        np.random.seed(42)
+        dates = pd.date_range(start='2023-01-01', periods=60)
+
+        close = 100 + np.cumsum(np.random.randn(60) * 2)
+        close[10] = np.nan
+        close[20] = 1000.0
+
+        df = pd.DataFrame({
+            'date': dates,
+            'open': close + np.random.randn(60) * 0.5,
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': np.random.randint(1000000, 10000000, 60).astype(float)
+        })
+        return pd.concat([df, df.iloc[[5]]], ignore_index=True)
+
+    @pytest.mark.parametrize('method, kwargs', [
+        ('clean_data', {}),
+        ('handle_outliers', {'method': 'clip'}),
+        ('handle_outliers', {'method': 'replace'}),
+        ('handle_outliers', {'method': 'remove'}),
+        ('resample_data', {'date_column': 'date'}),
+        ('normalize', {'method': 'minmax'}),
+        ('normalize', {'method': 'zscore'}),
+        ('rolling_zscore', {'window': 5}),
+        ('calculate_returns', {}),
+        ('add_time_features', {'date_column': 'date'}),
+    ])
+    def test_input_not_mutated(self, sample_data, method, kwargs):
+        """处理方法不修改传入的DataFrame"""
+        snapshot = sample_data.copy(deep=True)
+
+        result = getattr(DataProcessor, method)(sample_data, **kwargs)
+
+        assert result is not sample_data
+        pd.testing.assert_frame_equal(sample_data, snapshot)
+
+    def test_datetime_index_not_mutated(self, sample_data):
+        """重采样字符串索引时不替换传入数据的索引"""
+        df = sample_data.drop(columns='date').set_axis(
+            sample_data['date'].dt.strftime('%Y-%m-%d'), axis=0
+        )
+        snapshot = df.copy(deep=True)
+
+        DataProcessor.resample_data(df, freq='W')
+
+        pd.testing.assert_frame_equal(df, snapshot)
+
+    @pytest.mark.parametrize('window', [5, 20])
+    def test_rolling_zscore_kernel_matches_pandas(self, sample_data, monkeypatch, window):
+        """Numba核与pandas回退实现一致 (含缺失值)"""
+        processor_module = sys.modules[DataProcessor.__module__]
+        monkeypatch.setattr(processor_module, 'NUMBA_AVAILABLE', False)
+        expected = DataProcessor.rolling_zscore(sample_data, window=window)['close_zscore']
+
+        result = processor_module._rolling_zscore_nb(sample_data['close'].to_numpy(dtype=np.float64), window)
+
+        assert np.isnan(result[10:10 + window]).all()
+        np.testing.assert_allclose(result, expected.to_numpy(), rtol=1e-7, atol=1e-9, equal_nan=True)
+
+    @pytest.mark.parametrize('method', ['clip', 'remove', 'replace'])
+    def test_handle_outliers_matches_reference(self, sample_data, method):
+        """与逐列处理的参考实现一致 (含缺失值)"""
+        df = sample_data.drop(columns='date')
+
+        result = DataProcessor.handle_outliers(df, method=method)
+
+        pd.testing.assert_frame_equal(result, reference_handle_outliers(df, method))
+
+    def test_remove_outliers_is_sequential(self):
+        """删除异常值时后一列的上下界按前一列筛选后的行计算"""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame(rng.standard_t(2, size=(300, 3)), columns=['a', 'b', 'c'])
+
+        result = DataProcessor.handle_outliers(df, method='remove')
+
+        pd.testing.assert_frame_equal(result, reference_handle_outliers(df, 'remove'))
+
+    def test_calculate_returns_matches_reference(self, sample_data):
+        """三列收益率与逐列pandas表达式一致，缺失价格处保持NaN"""
+        close = sample_data['close']
+        ret = close / close.shift(1) - 1
+
+        result = DataProcessor.calculate_returns(sample_data)
+
+        pd.testing.assert_series_equal(result['return'], ret, check_names=False)
+        pd.testing.assert_series_equal(result['log_return'], np.log(close / close.shift(1)), check_names=False)
+        pd.testing.assert_series_equal(result['cum_return'], (1 + ret).cumprod() - 1, check_names=False)
+        assert result['cum_return'].iloc[[0, 10, 11]].isna().all()
+
+    @pytest.mark.parametrize('with_nat', [False, True])
+    def test_time_features_match_dt_accessors(self, sample_data, with_nat):
+        """时间特征与.dt访问器结果一致，NaT行的日历字段为NaN、标志位为0"""
+        df = sample_data.copy()
+        df['date'] = pd.date_range('2023-12-25', periods=len(df), freq='5D')
+        if with_nat:
+            df.loc[[3, 30], 'date'] = pd.NaT
+
+        result = DataProcessor.add_time_features(df, date_column='date')
+
+        dt = df['date'].dt
+        expected = pd.DataFrame({
+            'year': dt.year, 'month': dt.month, 'day': dt.day,
+            'weekday': dt.weekday, 'quarter': dt.quarter,
+            'is_month_start': dt.is_month_start.astype(int),
+            'is_month_end': dt.is_month_end.astype(int),
+            'is_quarter_start': dt.is_quarter_start.astype(int),
+            'is_quarter_end': dt.is_quarter_end.astype(int),
+        })
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+        indexed = DataProcessor.add_time_features(df.set_index('date'))
+        expected.index = indexed.index
+        pd.testing.assert_frame_equal(indexed[expected.columns], expected, check_dtype=False)
+
+    @pytest.mark.parametrize('freq', ['W', 'ME', 'QE'])
+    @pytest.mark.parametrize('as_column', [False, True])
+    def test_resample_duckdb_matches_pandas(self, monkeypatch, freq, as_column):
+        """DuckDB重采样与pandas resample一致 (含缺失值、停牌缺口和整段成交量缺失)"""
+        pytest.importorskip('duckdb')
+        processor_module = sys.modules[DataProcessor.__module__]
+
+        rng = np.random.default_rng(0)
+        dates = pd.date_range('2023-01-01', periods=400)
+        dates = dates[rng.random(400) > 0.3]
+        dates = dates[(dates < '2023-03-01') | (dates > '2023-04-20')]
+        df = pd.DataFrame(rng.random((len(dates), 6)), index=dates,
+                          columns=['open', 'high', 'low', 'close', 'volume', 'amount'])
+        df = df.mask(rng.random(df.shape) < 0.15)
+        df.iloc[:3] = np.nan
+        df.loc['2023-06-01':'2023-06-30', 'volume'] = np.nan
+        kwargs = {}
+        if as_column:
+            df = df.rename_axis('date').reset_index()
+            kwargs['date_column'] = 'date'
+
+        monkeypatch.setattr(processor_module, 'DUCKDB_AVAILABLE', True)
+        result = DataProcessor.resample_data(df, freq, **kwargs)
+        monkeypatch.setattr(processor_module, 'DUCKDB_AVAILABLE', False)
+        expected = DataProcessor.resample_data(df, freq, **kwargs)
+
+        pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    def test_resample_cache_round_trip(self, sample_data, monkeypatch, tmp_path):
+        """传入股票代码时重采样结果持久化，相同日线再次调用直接读取缓存"""
+        import src.data.services.db_service  # noqa: F401
+        from src.data.storage.db_manager import DatabaseManager
+        db_service = sys.modules['src.data.services.db_service'].db_service
+        manager = DatabaseManager(f"sqlite:///{tmp_path / 'cache.db'}")
+        manager.init_tables()
+        monkeypatch.setattr(db_service, 'db', manager)
+        db_service._mem.clear()
+
+        df = sample_data.drop_duplicates().set_index('date')
+        expected = DataProcessor.resample_data(df, 'W', stock_code='000592')
+        db_service._mem.clear()
+        monkeypatch.setattr(DataProcessor, '_resample_duckdb', staticmethod(lambda *args: pytest.fail('未命中缓存')))
+        monkeypatch.setattr(sys.modules[DataProcessor.__module__], 'DUCKDB_AVAILABLE', True)
+
+        result = DataProcessor.resample_data(df, 'W', stock_code='000592')
+
+        pd.testing.assert_frame_equal(result, expected, check_freq=False)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+数据库管理器测试
+"""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import inspect
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.storage.db_manager import DatabaseManager
+
+
+class TestSchemaUpgrade:
+    """已有数据库表结构升级测试类"""
+
+    def test_missing_columns_added_on_connect(self, tmp_path):
+        """连接旧版数据库时自动补齐DataCache新增列，无需执行initdb"""
+        path = tmp_path / 'old.db'
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE data_cache (id INTEGER PRIMARY KEY, cache_key VARCHAR(100), "
+                "cache_type VARCHAR(50), stock_code VARCHAR(20), data_json TEXT, "
+                "expires_at DATETIME, created_at DATETIME, updated_at DATETIME)"
+            )
+
+        manager = DatabaseManager(f"sqlite:///{path}")
+
+        columns = {c['name'] for c in inspect(manager.engine).get_columns('data_cache')}
+        assert {'data_blob', 'data_hash'} <= columns
+
+
+class TestExecuteSql:
+    """原始SQL执行测试类"""
+
+    def test_colon_literals_not_bound(self, tmp_path):
+        """字符串中的冒号不应被解析为绑定参数"""
+        manager = DatabaseManager(f"sqlite:///{tmp_path / 'raw.db'}")
+        sql = "SELECT 'open :30' AS t"
+
+        assert str(manager.execute_sql(sql)['t'].iloc[0]) == 'open :30'
+        chunks = list(manager.execute_sql(sql, chunksize=1))
+        assert str(chunks[0]['t'].iloc[0]) == 'open :30'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
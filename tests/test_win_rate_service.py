@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+胜率验证测试
+"""
+
+import pytest
+import numpy as np
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 导入服务模块会连接数据库
+pytest.importorskip('pymysql')
+
+from src.data.services.win_rate_service import (
+    PRICE_RATIO_TOLERANCE, VERDICT_BUY, VERDICT_HOLD, VERDICT_SELL, _classify_verdicts
+)
+
+
+class TestClassifyVerdicts:
+    """信号判定测试类"""
+
+    def test_single_precision_unchanged_price(self):
+        """单精度读回的未变动价格既不算上涨也不算下跌"""
+        analysis = np.array([10.23, 10.23, 10.23])
+        after = np.full(3, np.float32(10.23), dtype=np.float64)
+        verdicts = np.array([VERDICT_BUY, VERDICT_SELL, VERDICT_HOLD], dtype=np.int8)
+
+        correct, _ = _classify_verdicts(analysis, after, verdicts, PRICE_RATIO_TOLERANCE)
+
+        assert correct.tolist() == [False, False, True]
+
+    @pytest.mark.parametrize('after, expected', [(10.24, [True, False]), (10.22, [False, True])])
+    def test_one_tick_move(self, after, expected):
+        """一个最小价位的涨跌仍能判定"""
+        analysis = np.array([10.23, 10.23])
+        verdicts = np.array([VERDICT_BUY, VERDICT_SELL], dtype=np.int8)
+
+        correct, _ = _classify_verdicts(analysis, np.array([after, after]), verdicts, PRICE_RATIO_TOLERANCE)
+
+        assert correct.tolist() == expected
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])